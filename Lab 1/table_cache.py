@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from array import array
+
+MAGIC = b'FLTC'
+# Bump whenever the layout of an entry changes; older entries then stop matching and are rewritten
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sII')   # magic, format version, number of sections
+_SECTION = struct.Struct('<c7xQ')  # section type, payload length; payload is padded to 8 bytes
+
+
+class TableCache:
+    """
+    Content-addressed on-disk cache for converted grammars and compiled automata.
+
+    An entry is keyed by the SHA-256 of a canonical description of the input, the entry kind and
+    FORMAT_VERSION, so editing a grammar simply misses and a format change invalidates every older
+    entry. Entries are a short header followed by typed sections: 'i' (int32 array), 'B' (bytes) and
+    'S' (list of strings). Payloads are raw little-endian data aligned to 8 bytes, so the files can
+    also be memory-mapped; load() copies them into arrays. Unreadable entries count as misses.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries())}
+
+    def key(self, kind, canonical):
+        return hashlib.sha256(f'{kind}\0{FORMAT_VERSION}\0{canonical}'.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.bin')
+
+    def load(self, key):
+        try:
+            with open(self.path(key), 'rb') as file:
+                data = file.read()
+            sections = _decode(data)
+        except (OSError, ValueError, struct.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return sections
+
+    def store(self, key, sections):
+        data = _encode(sections)
+        # Write to a temporary file first so a concurrent reader never sees a partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def invalidate(self, key=None):
+        # Removes one entry, or every entry when no key is given
+        for name in [key + '.bin'] if key is not None else self._entries():
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _entries(self):
+        return [name for name in os.listdir(self.directory) if name.endswith('.bin')]
+
+
+def _encode(sections):
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections))]
+    for section in sections:
+        if isinstance(section, array):
+            kind = b'i'
+            payload = array('i', section) if section.typecode != 'i' else section
+            if payload.itemsize != 4:
+                raise ValueError("int32 arrays need a 4-byte 'i' typecode")
+            if struct.pack('=i', 1) != struct.pack('<i', 1):
+                payload = array('i', payload)
+                payload.byteswap()
+            payload = payload.tobytes()
+        elif isinstance(section, (bytes, bytearray)):
+            kind, payload = b'B', bytes(section)
+        else:
+            kind, payload = b'S', json.dumps(list(section), ensure_ascii=False).encode('utf-8')
+        parts.append(_SECTION.pack(kind, len(payload)))
+        parts.append(payload)
+        parts.append(b'\0' * (-len(payload) % 8))
+    return b''.join(parts)
+
+
+def _decode(data):
+    magic, version, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a table cache entry of this format version")
+    offset = _HEADER.size
+    sections = []
+    for _ in range(count):
+        kind, length = _SECTION.unpack_from(data, offset)
+        offset += _SECTION.size
+        payload = data[offset:offset + length]
+        if len(payload) != length:
+            raise ValueError("Truncated table cache entry")
+        offset += length + (-length % 8)
+        if kind == b'i':
+            values = array('i')
+            values.frombytes(payload)
+            if struct.pack('=i', 1) != struct.pack('<i', 1):
+                values.byteswap()
+            sections.append(values)
+        elif kind == b'B':
+            sections.append(payload)
+        elif kind == b'S':
+            sections.append(json.loads(payload.decode('utf-8')))
+        else:
+            raise ValueError(f"Unknown section type {kind!r}")
+    return sections
@@ -1,4 +1,8 @@
-from graphviz import Digraph
+from array import array
+
+import numpy as np
+
+PAD_BYTE = 0  # padding in batch matrices, never a symbol
 
 # Given FA for Variant 18
 Q = {'q0', 'q1', 'q2', 'q3'}  # States
@@ -36,35 +40,125 @@ def is_deterministic(delta):
 
 
 # Task c: Convert NFA to DFA
-def nfa_to_dfa(Q, sigma, delta, F):
-    dfa_states = []  # List of DFA states (each is a set of NFA states)
-    dfa_delta = {}  # DFA transition function
-    dfa_final = []  # DFA final states
-    initial_state = frozenset({'q0'})  # Start with the initial state of the NFA
-    dfa_states.append(initial_state)
+def epsilon_closures(states, delta, epsilon='ε'):
+    # Bitmask of the epsilon closure of every state (bit i stands for states[i])
+    bits = {state: 1 << i for i, state in enumerate(states)}
+    closures = []
+    for state in states:
+        mask = bits[state]
+        stack = [state]
+        while stack:
+            for next_state in delta.get((stack.pop(), epsilon), ()):
+                if not mask & bits[next_state]:
+                    mask |= bits[next_state]
+                    stack.append(next_state)
+        closures.append(mask)
+    return closures
 
-    # Process each DFA state
-    for state in dfa_states:
-        for symbol in sigma:
-            next_state = set()
-            for nfa_state in state:
-                if (nfa_state, symbol) in delta:
-                    next_state.update(delta[(nfa_state, symbol)])
-            if next_state:
-                next_state = frozenset(next_state)
-                if next_state not in dfa_states:
-                    dfa_states.append(next_state)
-                dfa_delta[(state, symbol)] = next_state
-
-    # Determine final states in DFA
-    for state in dfa_states:
-        if any(nfa_state in F for nfa_state in state):
-            dfa_final.append(state)
+
+def subset_construction(Q, sigma, delta, F, start='q0', epsilon='ε', cache=None):
+    """
+    Determinizes an NFA (optionally with epsilon moves) over bitmask state sets.
+
+    Returns (states, symbols, masks, table, accepting): `states` fixes the bit of every NFA state,
+    masks[i] is the NFA state set of DFA state i (0 is the start), table[i][k] is the DFA state
+    reached on symbols[k] or -1, and accepting[i] tells whether DFA state i is final.
+    With a TableCache the result is stored on disk and reused for the same NFA; states and
+    symbols must then be strings.
+    """
+    if cache is not None:
+        key = cache.key('subsets', repr((sorted(Q), sorted(sigma), sorted((state, symbol, sorted(targets))
+                                         for (state, symbol), targets in delta.items()),
+                                         sorted(F), start, epsilon)))
+        sections = cache.load(key)
+        if sections is not None:
+            return _unpack_subsets(*sections)
+        result = subset_construction(Q, sigma, delta, F, start, epsilon)
+        cache.store(key, _pack_subsets(*result))
+        return result
+
+    states = sorted(Q)
+    symbols = sorted(symbol for symbol in sigma if symbol != epsilon)
+    index = {state: i for i, state in enumerate(states)}
+    closures = epsilon_closures(states, delta, epsilon)
+    final_mask = 0
+    for state in F:
+        final_mask |= 1 << index[state]
+
+    # moves[k][i]: closed set reached from NFA state i on symbols[k]
+    moves = []
+    for symbol in symbols:
+        row = []
+        for state in states:
+            mask = 0
+            for next_state in delta.get((state, symbol), ()):
+                mask |= closures[index[next_state]]
+            row.append(mask)
+        moves.append(row)
+
+    start_mask = closures[index[start]]
+    masks = [start_mask]
+    ids = {start_mask: 0}
+    table = []
+    accepting = []
+    for current in masks:  # the list doubles as the worklist
+        row = []
+        for move in moves:
+            next_mask = 0
+            rest = current
+            while rest:
+                low = rest & -rest
+                next_mask |= move[low.bit_length() - 1]
+                rest ^= low
+            if not next_mask:
+                row.append(-1)
+                continue
+            next_id = ids.get(next_mask)
+            if next_id is None:
+                next_id = ids[next_mask] = len(masks)
+                masks.append(next_mask)
+            row.append(next_id)
+        table.append(row)
+        accepting.append(bool(current & final_mask))
+    return states, symbols, masks, table, accepting
+
+
+def _pack_subsets(states, symbols, masks, table, accepting):
+    # Masks become fixed-width little-endian byte strings, the table one flat int32 array
+    width = (len(states) + 7) // 8
+    packed_masks = b''.join(mask.to_bytes(width, 'little') for mask in masks)
+    return [states, symbols, packed_masks, array('i', [t for row in table for t in row]), bytes(accepting)]
+
+
+def _unpack_subsets(states, symbols, packed_masks, flat_table, accepting):
+    width = (len(states) + 7) // 8
+    masks = [int.from_bytes(packed_masks[i * width:(i + 1) * width], 'little') for i in range(len(accepting))]
+    columns = len(symbols)
+    table = [flat_table[i * columns:(i + 1) * columns].tolist() for i in range(len(accepting))]
+    return states, symbols, masks, table, [bool(final) for final in accepting]
+
+
+def nfa_to_dfa(Q, sigma, delta, F, start='q0', epsilon='ε', cache=None):
+    states, symbols, masks, table, accepting = subset_construction(Q, sigma, delta, F, start, epsilon, cache)
+
+    def members(mask):
+        return frozenset(states[i] for i in range(mask.bit_length()) if mask >> i & 1)
+
+    dfa_states = [members(mask) for mask in masks]  # List of DFA states (each is a set of NFA states)
+    dfa_delta = {}  # DFA transition function
+    for state, row in zip(dfa_states, table):
+        for symbol, next_id in zip(symbols, row):
+            if next_id >= 0:
+                dfa_delta[(state, symbol)] = dfa_states[next_id]
+    dfa_final = [state for state, final in zip(dfa_states, accepting) if final]  # DFA final states
 
     return dfa_states, dfa_delta, dfa_final
 
+
 # Task d: Represent FA Graphically
 def draw_fa(Q, sigma, delta, F):
+    from graphviz import Digraph  # only needed for drawing
+
     fa = Digraph()
     for state in Q:
         if state in F:
@@ -78,6 +172,182 @@ def draw_fa(Q, sigma, delta, F):
     print("FA graph saved as 'fa_graph.png'")
 
 
+# Task e: Test many strings at once against the DFA transition table
+def dfa_transition_table(dfa_states, dfa_delta, dfa_final, sigma):
+    # States are numbered by their position in dfa_states (0 is the start state); the extra
+    # last row is a dead state, the column before last catches symbols outside sigma and the
+    # last column keeps the current state for padding bytes
+    symbols = {symbol: column for column, symbol in enumerate(sorted(sigma))}
+    state_ids = {state: i for i, state in enumerate(dfa_states)}
+    dead = len(dfa_states)
+    width = len(symbols)
+    table = np.full((dead + 1, width + 2), dead, dtype=np.intp)
+    table[:, width + 1] = np.arange(dead + 1)
+    for (state, symbol), next_state in dfa_delta.items():
+        table[state_ids[state], symbols[symbol]] = state_ids[next_state]
+    columns = np.full(256, width, dtype=np.intp)
+    for symbol, column in symbols.items():
+        if len(symbol) != 1 or not 0 < ord(symbol) < 256:
+            raise ValueError(f"Batch matching needs single-byte symbols, got {symbol!r}")
+        columns[ord(symbol)] = column
+    columns[PAD_BYTE] = width + 1
+    accepting = np.zeros(dead + 1, dtype=bool)
+    for state in dfa_final:
+        accepting[state_ids[state]] = True
+    return table, columns, accepting
+
+
+def encode_batch(strings):
+    # Packs strings into a (len(strings), max_length) uint8 matrix padded with PAD_BYTE
+    width = max(map(len, strings), default=0)
+    try:
+        data = b''.join(s.encode('latin-1').ljust(width, b'\0') for s in strings)
+    except UnicodeEncodeError as e:
+        raise ValueError(f"Batch matching needs latin-1 strings: {e}") from None
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(strings), width)
+
+
+def run_batch(table, columns, accepting, matrix, lengths=None):
+    # Advances every row of a right-padded uint8 matrix through the table and returns the acceptance mask.
+    # Rows are sorted by length so that column j only touches the strings that are still running,
+    # and table entries hold next_state * row_width so each step is one add and one gather.
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    count, width = matrix.shape
+    if lengths is None:
+        lengths = (matrix != PAD_BYTE).sum(axis=1)
+    order = np.argsort(-lengths, kind='stable')
+    running = np.searchsorted(-lengths[order], -np.arange(width), side='left')
+    row_width = table.shape[1]
+    flat = (table * row_width).ravel()
+    matrix = matrix[order]
+    states = np.zeros(count, dtype=np.intp)
+    for j in range(width):
+        active = running[j]
+        states[:active] = flat[states[:active] + columns[matrix[:active, j]]]
+    mask = np.empty(count, dtype=bool)
+    mask[order] = accepting[states // row_width]
+    return mask
+
+
+def batch_in_language(dfa_table, strings):
+    # `strings` is a list of strings or a padded uint8 matrix; returns a boolean mask
+    if isinstance(strings, np.ndarray):
+        return run_batch(*dfa_table, strings)
+    lengths = np.fromiter(map(len, strings), dtype=np.intp, count=len(strings))
+    return run_batch(*dfa_table, encode_batch(strings), lengths)
+
+
+# Task f: Minimize a DFA (Hopcroft) and check two DFAs for equivalence
+def minimize_table(table, accepting):
+    # Hopcroft's partition refinement on a DFA given as rows of next-state ids (-1 for none),
+    # start state 0. Returns the rows and accepting flags of the minimal DFA, numbered in
+    # breadth-first order from the start and without a dead state.
+    width = len(table[0]) if table else 0
+    order = [0]  # states reachable from the start
+    seen = {0}
+    for state in order:
+        for next_state in table[state]:
+            if next_state >= 0 and next_state not in seen:
+                seen.add(next_state)
+                order.append(next_state)
+    renumber = {state: i for i, state in enumerate(order)}
+    dead = len(order)  # explicit dead state completes the DFA
+    rows = [[renumber[t] if t >= 0 else dead for t in table[state]] for state in order] + [[dead] * width]
+    final = [bool(accepting[state]) for state in order] + [False]
+
+    inverse = [[[] for _ in rows] for _ in range(width)]
+    for state, row in enumerate(rows):
+        for column, next_state in enumerate(row):
+            inverse[column][next_state].append(state)
+
+    blocks = [block for block in ({s for s in range(dead + 1) if final[s]},
+                                  {s for s in range(dead + 1) if not final[s]}) if block]
+    block_of = [0] * (dead + 1)
+    for b, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = b
+    smallest = min(range(len(blocks)), key=lambda b: len(blocks[b]))
+    pending = {(smallest, column) for column in range(width)}
+
+    while pending:
+        splitter, column = pending.pop()
+        touched = {}
+        for state in [s for t in blocks[splitter] for s in inverse[column][t]]:
+            touched.setdefault(block_of[state], []).append(state)
+        for b, moved in touched.items():
+            if len(moved) == len(blocks[b]):
+                continue
+            new_block = set(moved)
+            blocks[b] -= new_block
+            new = len(blocks)
+            blocks.append(new_block)
+            for state in new_block:
+                block_of[state] = new
+            for c in range(width):
+                if (b, c) in pending:
+                    pending.add((new, c))
+                else:
+                    pending.add((new if len(new_block) <= len(blocks[b]) else b, c))
+
+    dead_block = block_of[dead]
+    start_block = block_of[0]
+    if start_block == dead_block:
+        return [[-1] * width], [False]
+    ids = {start_block: 0}
+    blocks_in_order = [start_block]
+    min_table = []
+    for b in blocks_in_order:
+        representative = next(iter(blocks[b]))
+        row = []
+        for next_state in rows[representative]:
+            target = block_of[next_state]
+            if target == dead_block:
+                row.append(-1)
+                continue
+            if target not in ids:
+                ids[target] = len(blocks_in_order)
+                blocks_in_order.append(target)
+            row.append(ids[target])
+        min_table.append(row)
+    return min_table, [final[next(iter(blocks[b]))] for b in blocks_in_order]
+
+
+def tables_equivalent(table_a, accepting_a, table_b, accepting_b):
+    # Walks the product of two DFAs over the same symbol columns (start states 0, -1 for none)
+    # and reports whether any reachable pair disagrees on acceptance
+    width = len(table_a[0]) if table_a else 0
+    start = (0, 0)
+    seen = {start}
+    stack = [start]
+    while stack:
+        a, b = stack.pop()
+        if (a >= 0 and bool(accepting_a[a])) != (b >= 0 and bool(accepting_b[b])):
+            return False
+        for column in range(width):
+            pair = (table_a[a][column] if a >= 0 else -1, table_b[b][column] if b >= 0 else -1)
+            if pair != (-1, -1) and pair not in seen:
+                seen.add(pair)
+                stack.append(pair)
+    return True
+
+
+def minimize_dfa(symbols, table, accepting):
+    # Takes and returns a DFA as (symbols, table, accepting), e.g. the output of subset_construction
+    min_table, min_accepting = minimize_table(table, accepting)
+    return list(symbols), min_table, min_accepting
+
+
+def dfa_equivalent(dfa_a, dfa_b):
+    # Both DFAs are (symbols, table, accepting); their columns are aligned over the union of the alphabets
+    symbols = sorted(set(dfa_a[0]) | set(dfa_b[0]))
+
+    def aligned(dfa):
+        own, table, accepting = dfa
+        columns = [own.index(symbol) if symbol in own else None for symbol in symbols]
+        return [[row[c] if c is not None else -1 for c in columns] for row in table], accepting
+
+    return tables_equivalent(*aligned(dfa_a), *aligned(dfa_b))
+
 # Main Program
 if __name__ == "__main__":
     # Task a: Convert FA to Regular Grammar
@@ -103,3 +373,13 @@ if __name__ == "__main__":
     # Task d: Represent FA Graphically
     draw_fa(Q, sigma, delta, F)
 
+    # Task e: Batch membership testing
+    dfa_table = dfa_transition_table(dfa_states, dfa_delta, dfa_final, sigma)
+    test_strings = ["aba", "abab", "aabb", "aababaa", "ab"]
+    print("\nBatch membership:", dict(zip(test_strings, batch_in_language(dfa_table, test_strings).tolist())))
+
+    # Task f: Minimize the DFA
+    _, dfa_symbols, _, table, accepting = subset_construction(Q, sigma, delta, F)
+    minimal = minimize_dfa(dfa_symbols, table, accepting)
+    print(f"\nMinimal DFA: {len(minimal[1])} states (from {len(table)}),",
+          "equivalent:", dfa_equivalent((dfa_symbols, table, accepting), minimal))
@@ -1,4 +1,11 @@
 import random
+import sys
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+import numpy as np
 
 class Grammar:
     def __init__(self):
@@ -12,14 +19,98 @@ class Grammar:
         }
         self.start_symbol = 'S'
 
-    def generate_string(self):
-        string = self.start_symbol
-        while any(v in string for v in self.vn):
-            for v in string:
-                if v in self.vn:
-                    string = string.replace(v, random.choice(self.p[v]), 1)
-                    break
-        return string
+    def generate_string(self, length=None):
+        if length is not None:
+            return next(self.generate_many(1, length))
+        # Leftmost derivation with a stack of pending symbols instead of rewriting the whole string
+        output = []
+        stack = [self.start_symbol]
+        while stack:
+            symbol = stack.pop()
+            if symbol in self.vn:
+                stack.extend(reversed(random.choice(self.p[symbol])))
+            else:
+                output.append(symbol)
+        return ''.join(output)
+
+    def count_words(self, max_length):
+        """
+        Returns {non-terminal: [number of derivations of a length-n word, for n in 0..max_length]}.
+
+        Productions are strings of one-character symbols without ε or unit rules, so every symbol
+        covers at least one character and lengths can be filled in increasing order. For an
+        unambiguous grammar (like the variant's regular one) derivations and words coincide.
+        """
+        counts = {v: [0] * (max_length + 1) for v in self.vn}
+        for n in range(1, max_length + 1):
+            for v in self.vn:
+                counts[v][n] = sum(self._production_count(production, n, counts) for production in self.p[v])
+        return counts
+
+    def _production_count(self, production, n, counts):
+        # ways[m]: derivations of a length-m prefix from the symbols seen so far
+        ways = [1] + [0] * n
+        for symbol in production:
+            if symbol in self.vn:
+                row = counts[symbol]
+                ways = [sum(ways[m - k] * row[k] for k in range(1, m + 1)) for m in range(n + 1)]
+            else:
+                ways = [0] + ways[:-1]
+        return ways[n]
+
+    def generate_many(self, n, length, rng=None):
+        """
+        Yields `n` words of exactly `length` characters, drawn uniformly from the grammar's derivations.
+
+        Each (non-terminal, length) pair gets a cumulative-weight table of its expansions the first
+        time it is reached, so a draw is a bisect per non-terminal and one join at the end.
+        """
+        counts = self.count_words(length)
+        if not counts[self.start_symbol][length]:
+            raise ValueError(f"The grammar derives no words of length {length}")
+        randrange = (rng or random).randrange
+        vn = self.vn
+        tables = {}
+
+        for _ in range(n):
+            output = []
+            stack = [(self.start_symbol, length)]
+            while stack:
+                symbol, size = stack.pop()
+                if symbol not in vn:
+                    output.append(symbol)
+                    continue
+                table = tables.get((symbol, size))
+                if table is None:
+                    table = tables[(symbol, size)] = self._expansions(symbol, size, counts)
+                cumulative, options = table
+                stack.extend(options[bisect_right(cumulative, randrange(cumulative[-1]))])
+            yield ''.join(output)
+
+    def _expansions(self, v, size, counts):
+        # Every way to split `size` characters over the symbols of a production of `v`, weighted by its
+        # number of derivations; options are stored reversed, ready to push on the stack
+        weights, options = [], []
+
+        def split(production, i, remaining, weight, items):
+            if i == len(production):
+                if not remaining:
+                    weights.append(weight)
+                    options.append(items[::-1])
+                return
+            symbol = production[i]
+            rest = len(production) - i - 1
+            if symbol not in self.vn:
+                if remaining > rest:
+                    split(production, i + 1, remaining - 1, weight, items + [(symbol, 1)])
+                return
+            for k in range(1, remaining - rest + 1):
+                if counts[symbol][k]:
+                    split(production, i + 1, remaining - k, weight * counts[symbol][k], items + [(symbol, k)])
+
+        for production in self.p[v]:
+            split(production, 0, size, 1, [])
+        return list(accumulate(weights)), options
 
     def to_finite_automaton(self):
         q = self.vn | {'qf'}  # Set of states (non-terminals + final state)
@@ -77,8 +168,16 @@ class FiniteAutomaton:
         self.delta = delta  # Transition function
         self.q0 = q0    # Start state
         self.f = f      # Set of final states
+        self.lazy_dfa = None  # Set by use_lazy_dfa()
+
+    def use_lazy_dfa(self, max_states=4096, max_bytes=None, thrash_limit=None):
+        # Switches string_in_language to on-the-fly determinization with a bounded cache
+        self.lazy_dfa = LazyDFA(self, max_states, max_bytes, thrash_limit)
+        return self.lazy_dfa
 
     def string_in_language(self, input_string):
+        if self.lazy_dfa is not None:
+            return self.lazy_dfa.match(input_string)
         current_states = {self.q0}  # Start from the initial state
 
         for symbol in input_string:
@@ -92,18 +191,367 @@ class FiniteAutomaton:
 
         return bool(current_states & self.f)  # Check if any state is final
 
+    def canonical(self):
+        # Order-independent description of the automaton, used as its cache key
+        return repr((sorted(map(repr, self.q)), sorted(map(repr, self.sigma)),
+                     sorted((repr(state), repr(symbol), sorted(map(repr, targets)))
+                            for (state, symbol), targets in self.delta.items()),
+                     repr(self.q0), sorted(map(repr, self.f))))
+
+    def compile(self, cache=None):
+        # With a TableCache, a previously compiled table for the same automaton is loaded from disk
+        if cache is not None:
+            key = cache.key('dfa', self.canonical())
+            sections = cache.load(key)
+            if sections is not None:
+                symbols, table, accepting = sections
+                return CompiledAutomaton({symbol: column for column, symbol in enumerate(symbols)},
+                                         table, accepting)
+            compiled = self.compile()
+            cache.store(key, [list(compiled.symbols), compiled.table, compiled.accepting])
+            return compiled
+
+        # Subset construction: each reachable set of NFA states becomes one integer DFA state,
+        # numbered in discovery order so that rows can be appended to the table as we go
+        symbols = {symbol: column for column, symbol in enumerate(sorted(self.sigma))}
+        start = frozenset({self.q0})
+        subsets = [start]
+        state_ids = {start: 0}
+        table = array('i')
+        accepting = bytearray()
+
+        for current in subsets:
+            accepting.append(1 if current & self.f else 0)
+            for symbol in symbols:
+                next_states = set()
+                for state in current:
+                    next_states.update(self.delta.get((state, symbol), ()))
+                if not next_states:
+                    table.append(-1)
+                    continue
+                next_states = frozenset(next_states)
+                if next_states not in state_ids:
+                    state_ids[next_states] = len(subsets)
+                    subsets.append(next_states)
+                table.append(state_ids[next_states])
+
+        return CompiledAutomaton(symbols, table, bytes(accepting))
+
+
+class LazyDFA:
+    """
+    Determinizes a FiniteAutomaton on demand while strings are matched.
+
+    Subset states and their discovered transitions live in an LRU cache bounded by `max_states`
+    entries and, optionally, an estimated `max_bytes`. When a single string causes more than
+    `thrash_limit` evictions the cache is not helping, and the rest of that string is matched
+    by plain NFA simulation.
+    """
+
+    def __init__(self, automaton, max_states=4096, max_bytes=None, thrash_limit=None):
+        if max_states < 1:
+            raise ValueError("max_states must be at least 1")
+        self.automaton = automaton
+        self.max_states = max_states
+        self.max_bytes = max_bytes
+        self.thrash_limit = max_states if thrash_limit is None else thrash_limit
+        self.start = frozenset({automaton.q0})
+        self.final = frozenset(automaton.f)
+        self.cache = OrderedDict()  # subset -> {symbol: next subset}
+        self.sizes = {}  # subset -> estimated bytes of its cache entry
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    def stats(self):
+        return {'states': len(self.cache), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'fallbacks': self.fallbacks}
+
+    def _step(self, subset, symbol):
+        delta = self.automaton.delta
+        next_states = set()
+        for state in subset:
+            next_states.update(delta.get((state, symbol), ()))
+        return frozenset(next_states)
+
+    def _entry(self, subset):
+        transitions = self.cache.get(subset)
+        if transitions is None:
+            transitions = self.cache[subset] = {}
+            self._resize(subset, transitions)
+        else:
+            self.cache.move_to_end(subset)
+        return transitions
+
+    def _resize(self, subset, transitions):
+        size = sys.getsizeof(subset) + sys.getsizeof(transitions)
+        self.bytes += size - self.sizes.get(subset, 0)
+        self.sizes[subset] = size
+
+    def _evict(self, keep):
+        # Drops least recently used subsets until the cache fits; `keep` is the one in use
+        evicted = 0
+        while len(self.cache) > self.max_states or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            subset = next(iter(self.cache))
+            if subset == keep:
+                if len(self.cache) == 1:
+                    break
+                self.cache.move_to_end(subset)
+                continue
+            del self.cache[subset]
+            self.bytes -= self.sizes.pop(subset)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def match(self, input_string):
+        subset = self.start
+        evicted = 0
+        for position, symbol in enumerate(input_string):
+            transitions = self._entry(subset)
+            next_subset = transitions.get(symbol)
+            if next_subset is None:
+                self.misses += 1
+                next_subset = transitions[symbol] = self._step(subset, symbol)
+                self._resize(subset, transitions)
+                evicted += self._evict(subset)
+                if evicted > self.thrash_limit:
+                    self.fallbacks += 1
+                    return self._simulate(next_subset, input_string[position + 1:])
+            else:
+                self.hits += 1
+            if not next_subset:
+                return False
+            subset = next_subset
+        return bool(subset & self.final)
+
+    def _simulate(self, subset, rest):
+        for symbol in rest:
+            if not subset:
+                return False
+            subset = self._step(subset, symbol)
+        return bool(subset & self.final)
+
+
+class CompiledAutomaton:
+    """Deterministic automaton with integer states and a dense transition table (-1 means no transition)."""
+
+    def __init__(self, symbols, table, accepting):
+        self.symbols = symbols  # symbol -> column index
+        self.width = len(symbols)
+        self.table = table  # array('i') of num_states * width entries, row per state
+        self.accepting = accepting  # bytes, 1 for final states
+        self.num_states = len(accepting)
+        self._batch = None
+
+    def match(self, input_string):
+        table, width, symbols = self.table, self.width, self.symbols
+        state = 0  # state 0 is the start state
+        for symbol in input_string:
+            column = symbols.get(symbol)
+            if column is None:
+                return False
+            state = table[state * width + column]
+            if state < 0:
+                return False
+        return self.accepting[state] == 1
+
+    def match_many(self, strings):
+        match = self.match
+        return [match(s) for s in strings]
+
+    def minimize(self):
+        rows = [list(self.table[i * self.width:(i + 1) * self.width]) for i in range(self.num_states)]
+        min_table, min_accepting = minimize_table(rows, self.accepting)
+        table = array('i', [next_state for row in min_table for next_state in row])
+        return CompiledAutomaton(dict(self.symbols), table, bytes(min_accepting))
+
+    def equivalent_to(self, other):
+        # Compares languages over the union of both alphabets
+        symbols = sorted(set(self.symbols) | set(other.symbols))
+        return tables_equivalent(*self._aligned_rows(symbols), *other._aligned_rows(symbols))
+
+    def _aligned_rows(self, symbols):
+        columns = [self.symbols.get(symbol) for symbol in symbols]
+        rows = [[self.table[state * self.width + c] if c is not None else -1 for c in columns]
+                for state in range(self.num_states)]
+        return rows, self.accepting
+
+    def _batch_tables(self):
+        # NumPy copy of the table with a dead state (row num_states) and two extra columns:
+        # symbols outside the alphabet lead to the dead state, padding bytes keep the current state
+        if self._batch is None:
+            n, w = self.num_states, self.width
+            table = np.full((n + 1, w + 2), n, dtype=np.intp)
+            rows = np.array(self.table, dtype=np.intp).reshape(n, w)
+            table[:n, :w] = np.where(rows < 0, n, rows)
+            table[:, w + 1] = np.arange(n + 1)
+            columns = np.full(256, w, dtype=np.intp)
+            for symbol, column in self.symbols.items():
+                if len(symbol) != 1 or not 0 < ord(symbol) < 256:
+                    raise ValueError(f"Batch matching needs single-byte symbols, got {symbol!r}")
+                columns[ord(symbol)] = column
+            columns[PAD_BYTE] = w + 1
+            accepting = np.zeros(n + 1, dtype=bool)
+            accepting[:n] = np.frombuffer(self.accepting, dtype=np.uint8) == 1
+            self._batch = table, columns, accepting
+        return self._batch
+
+    def match_batch(self, strings):
+        """
+        Matches many strings at once and returns a boolean NumPy mask.
+
+        `strings` is a list of latin-1 strings or a 2D uint8 matrix of their bytes padded with PAD_BYTE.
+        All strings advance through the table together, one column of the matrix at a time.
+        """
+        if isinstance(strings, np.ndarray):
+            return run_batch(*self._batch_tables(), strings)
+        lengths = np.fromiter(map(len, strings), dtype=np.intp, count=len(strings))
+        return run_batch(*self._batch_tables(), encode_batch(strings), lengths)
+
+
+PAD_BYTE = 0  # padding in batch matrices, never a symbol
+
+
+def encode_batch(strings):
+    # Packs strings into a (len(strings), max_length) uint8 matrix padded with PAD_BYTE
+    width = max(map(len, strings), default=0)
+    try:
+        data = b''.join(s.encode('latin-1').ljust(width, b'\0') for s in strings)
+    except UnicodeEncodeError as e:
+        raise ValueError(f"Batch matching needs latin-1 strings: {e}") from None
+    return np.frombuffer(data, dtype=np.uint8).reshape(len(strings), width)
+
+
+def run_batch(table, columns, accepting, matrix, lengths=None):
+    # Advances every row of a right-padded uint8 matrix through the table and returns the acceptance mask.
+    # Rows are sorted by length so that column j only touches the strings that are still running,
+    # and table entries hold next_state * row_width so each step is one add and one gather.
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    count, width = matrix.shape
+    if lengths is None:
+        lengths = (matrix != PAD_BYTE).sum(axis=1)
+    order = np.argsort(-lengths, kind='stable')
+    running = np.searchsorted(-lengths[order], -np.arange(width), side='left')
+    row_width = table.shape[1]
+    flat = (table * row_width).ravel()
+    matrix = matrix[order]
+    states = np.zeros(count, dtype=np.intp)
+    for j in range(width):
+        active = running[j]
+        states[:active] = flat[states[:active] + columns[matrix[:active, j]]]
+    mask = np.empty(count, dtype=bool)
+    mask[order] = accepting[states // row_width]
+    return mask
+
+
+def minimize_table(table, accepting):
+    # Hopcroft's partition refinement on a DFA given as rows of next-state ids (-1 for none),
+    # start state 0. Returns the rows and accepting flags of the minimal DFA, numbered in
+    # breadth-first order from the start and without a dead state.
+    width = len(table[0]) if table else 0
+    order = [0]  # states reachable from the start
+    seen = {0}
+    for state in order:
+        for next_state in table[state]:
+            if next_state >= 0 and next_state not in seen:
+                seen.add(next_state)
+                order.append(next_state)
+    renumber = {state: i for i, state in enumerate(order)}
+    dead = len(order)  # explicit dead state completes the DFA
+    rows = [[renumber[t] if t >= 0 else dead for t in table[state]] for state in order] + [[dead] * width]
+    final = [bool(accepting[state]) for state in order] + [False]
+
+    inverse = [[[] for _ in rows] for _ in range(width)]
+    for state, row in enumerate(rows):
+        for column, next_state in enumerate(row):
+            inverse[column][next_state].append(state)
+
+    blocks = [block for block in ({s for s in range(dead + 1) if final[s]},
+                                  {s for s in range(dead + 1) if not final[s]}) if block]
+    block_of = [0] * (dead + 1)
+    for b, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = b
+    smallest = min(range(len(blocks)), key=lambda b: len(blocks[b]))
+    pending = {(smallest, column) for column in range(width)}
+
+    while pending:
+        splitter, column = pending.pop()
+        touched = {}
+        for state in [s for t in blocks[splitter] for s in inverse[column][t]]:
+            touched.setdefault(block_of[state], []).append(state)
+        for b, moved in touched.items():
+            if len(moved) == len(blocks[b]):
+                continue
+            new_block = set(moved)
+            blocks[b] -= new_block
+            new = len(blocks)
+            blocks.append(new_block)
+            for state in new_block:
+                block_of[state] = new
+            for c in range(width):
+                if (b, c) in pending:
+                    pending.add((new, c))
+                else:
+                    pending.add((new if len(new_block) <= len(blocks[b]) else b, c))
+
+    dead_block = block_of[dead]
+    start_block = block_of[0]
+    if start_block == dead_block:
+        return [[-1] * width], [False]
+    ids = {start_block: 0}
+    blocks_in_order = [start_block]
+    min_table = []
+    for b in blocks_in_order:
+        representative = next(iter(blocks[b]))
+        row = []
+        for next_state in rows[representative]:
+            target = block_of[next_state]
+            if target == dead_block:
+                row.append(-1)
+                continue
+            if target not in ids:
+                ids[target] = len(blocks_in_order)
+                blocks_in_order.append(target)
+            row.append(ids[target])
+        min_table.append(row)
+    return min_table, [final[next(iter(blocks[b]))] for b in blocks_in_order]
+
+
+def tables_equivalent(table_a, accepting_a, table_b, accepting_b):
+    # Walks the product of two DFAs over the same symbol columns (start states 0, -1 for none)
+    # and reports whether any reachable pair disagrees on acceptance
+    width = len(table_a[0]) if table_a else 0
+    start = (0, 0)
+    seen = {start}
+    stack = [start]
+    while stack:
+        a, b = stack.pop()
+        if (a >= 0 and bool(accepting_a[a])) != (b >= 0 and bool(accepting_b[b])):
+            return False
+        for column in range(width):
+            pair = (table_a[a][column] if a >= 0 else -1, table_b[b][column] if b >= 0 else -1)
+            if pair != (-1, -1) and pair not in seen:
+                seen.add(pair)
+                stack.append(pair)
+    return True
+
 # Main
-grammar = Grammar()
-finite_automaton = grammar.to_finite_automaton()
+if __name__ == "__main__":
+    grammar = Grammar()
+    finite_automaton = grammar.to_finite_automaton()
 
-print("Generated random strings:")
-for _ in range(5):
-    print(grammar.generate_string())
+    print("Generated random strings:")
+    for _ in range(5):
+        print(grammar.generate_string())
 
-print("\nChecking if strings belong to the language:")
-test_strings = ["aaa", "abaaa", "aa", "aabaababaaa", "ababaaab"]
-for s in test_strings:
-    print(f"String '{s}' is accepted: {finite_automaton.string_in_language(s)}")
+    print("\nChecking if strings belong to the language:")
+    test_strings = ["aaa", "abaaa", "aa", "aabaababaaa", "ababaaab"]
+    for s in test_strings:
+        print(f"String '{s}' is accepted: {finite_automaton.string_in_language(s)}")
 
-print("\nGrammar Classification:")
-print(grammar.classify_grammar())
\ No newline at end of file
+    print("\nGrammar Classification:")
+    print(grammar.classify_grammar())
\ No newline at end of file
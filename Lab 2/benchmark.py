@@ -0,0 +1,235 @@
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+automata = importlib.import_module('2_FiniteAutomata')
+grammars = importlib.import_module('2_RegularGrammars_Chomsky')
+Grammar = grammars.Grammar
+FiniteAutomaton = grammars.FiniteAutomaton
+TableCache = importlib.import_module('table_cache').TableCache
+
+
+def nth_from_end_nfa(n, sigma=('a', 'b')):
+    # Accepts strings whose n-th symbol from the end is 'a'; its DFA needs 2^n states
+    delta = {}
+    for symbol in sigma:
+        delta[('q0', symbol)] = {'q0'}
+    delta[('q0', 'a')].add('q1')
+    for i in range(1, n):
+        for symbol in sigma:
+            delta[(f'q{i}', symbol)] = {f'q{i + 1}'}
+    states = {f'q{i}' for i in range(n + 1)}
+    return FiniteAutomaton(states, set(sigma), delta, 'q0', {f'q{n}'})
+
+
+def random_strings(count, alphabet, max_length, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def _rate(label, count, run):
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:12.0f} strings/s")
+
+
+# --- Compiled DFA table vs. set-based NFA simulation ---
+
+def bench_compiled(count=200_000):
+    grammar = Grammar()
+    cases = [
+        ('Variant grammar', grammar.to_finite_automaton(),
+         [grammar.generate_string() for _ in range(count // 2)] + random_strings(count // 2, 'ab', 20)),
+        ('8th-from-end NFA', nth_from_end_nfa(8), random_strings(count, 'ab', 40, seed=1)),
+    ]
+    for name, automaton, strings in cases:
+        start = time.perf_counter()
+        compiled = automaton.compile()
+        print(f"{name}: {compiled.num_states} DFA states, compiled in {(time.perf_counter() - start) * 1e3:.2f} ms")
+        _rate('string_in_language', len(strings), lambda: [automaton.string_in_language(s) for s in strings])
+        _rate('compiled match', len(strings), lambda: [compiled.match(s) for s in strings])
+        _rate('compiled match_many', len(strings), lambda: compiled.match_many(strings))
+
+
+# --- Vectorized batch matching ---
+
+def bench_batch(max_batch=1_000_000):
+    grammar = Grammar()
+    compiled = grammar.to_finite_automaton().compile()
+    rng = random.Random(2)
+    pool = [grammar.generate_string() for _ in range(1000)] + random_strings(1000, 'ab', 20, seed=3)
+    print("Batch benchmark on the Variant grammar automaton")
+    print(f"{'batch size':>10} {'match loop':>14} {'match_batch':>14} {'pre-encoded':>14}")
+    batch_size = 1000
+    while batch_size <= max_batch:
+        strings = [rng.choice(pool) for _ in range(batch_size)]
+        matrix = grammars.encode_batch(strings)
+        rates = []
+        for run in (lambda: compiled.match_many(strings),
+                    lambda: compiled.match_batch(strings),
+                    lambda: compiled.match_batch(matrix)):
+            start = time.perf_counter()
+            run()
+            rates.append(batch_size / (time.perf_counter() - start))
+        print(f"{batch_size:>10} " + ' '.join(f"{rate:>14.0f}" for rate in rates))
+        batch_size *= 10
+
+
+# --- Subset construction scaling ---
+
+def _legacy_nfa_to_dfa(Q, sigma, delta, F):
+    # nfa_to_dfa as it was before the rework: list membership checks make it quadratic
+    dfa_states = [frozenset({'q0'})]
+    dfa_delta = {}
+    for state in dfa_states:
+        for symbol in sigma:
+            next_state = set()
+            for nfa_state in state:
+                if (nfa_state, symbol) in delta:
+                    next_state.update(delta[(nfa_state, symbol)])
+            if next_state:
+                next_state = frozenset(next_state)
+                if next_state not in dfa_states:
+                    dfa_states.append(next_state)
+                dfa_delta[(state, symbol)] = next_state
+    dfa_final = [state for state in dfa_states if any(nfa_state in F for nfa_state in state)]
+    return dfa_states, dfa_delta, dfa_final
+
+
+def bench_determinize(max_n=16, legacy_max_n=14):
+    print("Determinizing the n-th-symbol-from-the-end NFA (2^n DFA states)")
+    print(f"{'n':>3} {'DFA states':>11} {'legacy':>10} {'reworked':>10}")
+    for n in range(6, max_n + 1, 2):
+        nfa = nth_from_end_nfa(n)
+        args = (nfa.q, nfa.sigma, nfa.delta, nfa.f)
+        timings = []
+        for determinize, limit in ((_legacy_nfa_to_dfa, legacy_max_n), (automata.nfa_to_dfa, max_n)):
+            if n > limit:
+                timings.append('-')
+                continue
+            start = time.perf_counter()
+            dfa_states, _, _ = determinize(*args)
+            timings.append(f"{time.perf_counter() - start:.3f}s")
+        print(f"{n:>3} {len(dfa_states):>11} {timings[0]:>10} {timings[1]:>10}")
+
+
+# --- Hopcroft minimization ---
+
+def random_dfa(num_states, width, seed=0):
+    # Random complete DFA, all of whose states are reachable with high probability
+    rng = random.Random(seed)
+    table = [[rng.randrange(num_states) for _ in range(width)] for _ in range(num_states)]
+    accepting = [rng.random() < 0.5 for _ in range(num_states)]
+    return table, accepting
+
+
+def bench_minimize():
+    print("Minimizing random DFAs")
+    print(f"{'states':>8} {'symbols':>8} {'minimal':>8} {'time':>9}")
+    for num_states in (1_000, 10_000, 100_000):
+        for width in (2, 8):
+            table, accepting = random_dfa(num_states, width, seed=num_states + width)
+            start = time.perf_counter()
+            min_table, _ = automata.minimize_table(table, accepting)
+            elapsed = time.perf_counter() - start
+            print(f"{num_states:>8} {width:>8} {len(min_table):>8} {elapsed:>8.3f}s")
+
+    # Copies of one DFA whose transitions jump between copies collapse back to the original
+    base_table, accepting = random_dfa(1_000, 2, seed=9)
+    copies = 50
+    rng = random.Random(10)
+    table = [[rng.randrange(copies) * 1_000 + target for target in row] for _ in range(copies) for row in base_table]
+    start = time.perf_counter()
+    min_table, _ = automata.minimize_table(table, accepting * copies)
+    print(f"{copies} tangled copies: {len(table)} -> {len(min_table)} states in {time.perf_counter() - start:.3f}s")
+
+
+# --- Lazy vs. eager determinization ---
+
+def bench_lazy(count=2_000, length=64):
+    print(f"Lazy DFA on n-th-from-end NFAs, {count} random strings of length <= {length}")
+    strings = random_strings(count, 'ab', length, seed=6)
+    for n, eager in ((12, True), (16, True), (24, False)):
+        nfa = nth_from_end_nfa(n)
+        if eager:
+            start = time.perf_counter()
+            compiled = nfa.compile()
+            compiled.match_many(strings)
+            print(f"n={n:<3} eager: {compiled.num_states} states, {time.perf_counter() - start:.3f}s")
+        for max_states in (100_000, 1_000):
+            nfa.use_lazy_dfa(max_states=max_states)
+            start = time.perf_counter()
+            for s in strings:
+                nfa.string_in_language(s)
+            stats = nfa.lazy_dfa.stats()
+            print(f"n={n:<3} lazy (cap {max_states}): {time.perf_counter() - start:.3f}s, "
+                  f"{stats['states']} cached, {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['evictions']} evictions, {stats['fallbacks']} fallbacks, {stats['bytes'] / 2 ** 20:.1f} MiB")
+
+
+# --- Grammar string generation ---
+
+def _legacy_generate_string(grammar):
+    # Grammar.generate_string before the stack rewrite: str.replace on the leftmost non-terminal
+    string = grammar.start_symbol
+    while any(v in string for v in grammar.vn):
+        for v in string:
+            if v in grammar.vn:
+                string = string.replace(v, random.choice(grammar.p[v]), 1)
+                break
+    return string
+
+
+def bench_generate(count=1_000_000):
+    grammar = Grammar()
+    print(f"Generating {count} strings")
+    _rate('legacy generate_string', count, lambda: [_legacy_generate_string(grammar) for _ in range(count)])
+    _rate('generate_string', count, lambda: [grammar.generate_string() for _ in range(count)])
+    for length in (12, 40, 200):
+        start = time.perf_counter()
+        grammar.count_words(length)
+        print(f"count_words({length}) in {(time.perf_counter() - start) * 1e3:.1f} ms")
+        _rate(f'generate_many(length={length})', count, lambda: sum(1 for _ in grammar.generate_many(count, length)))
+
+
+# --- On-disk table cache ---
+
+def bench_cache(sizes=(10, 14, 16)):
+    # Cold runs compute and store the tables, warm runs read them back from the same directory
+    print("Compiling the n-th-symbol-from-the-end NFA through a TableCache")
+    print(f"{'n':>3} {'step':<20} {'cold':>10} {'warm':>10} {'entry size':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TableCache(directory)
+        for n in sizes:
+            nfa = nth_from_end_nfa(n)
+            args = (nfa.q, nfa.sigma, nfa.delta, nfa.f)
+            for step, run, key in (
+                    ('compile', lambda: nfa.compile(cache=cache), cache.key('dfa', nfa.canonical())),
+                    ('subset_construction', lambda: automata.subset_construction(*args, cache=cache), None)):
+                timings = []
+                for _ in ('cold', 'warm'):
+                    start = time.perf_counter()
+                    run()
+                    timings.append(time.perf_counter() - start)
+                size = f"{os.path.getsize(cache.path(key)) / 1024:.0f} KiB" if key else '-'
+                print(f"{n:>3} {step:<20} {timings[0] * 1e3:>8.1f}ms {timings[1] * 1e3:>8.1f}ms {size:>12}")
+        print(cache.stats())
+
+
+BENCHMARKS = {
+    'compiled': bench_compiled,
+    'batch': bench_batch,
+    'determinize': bench_determinize,
+    'minimize': bench_minimize,
+    'lazy': bench_lazy,
+    'generate': bench_generate,
+    'cache': bench_cache,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
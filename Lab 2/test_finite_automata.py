@@ -0,0 +1,251 @@
+import collections
+import importlib
+import itertools
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+automata = importlib.import_module('2_FiniteAutomata')
+grammars = importlib.import_module('2_RegularGrammars_Chomsky')
+table_cache = importlib.import_module('table_cache')
+
+
+def random_strings(count, alphabet, max_length, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def nth_from_end_nfa(n):
+    delta = {('q0', 'a'): {'q0', 'q1'}, ('q0', 'b'): {'q0'}}
+    for i in range(1, n):
+        delta[(f'q{i}', 'a')] = {f'q{i + 1}'}
+        delta[(f'q{i}', 'b')] = {f'q{i + 1}'}
+    return grammars.FiniteAutomaton({f'q{i}' for i in range(n + 1)}, {'a', 'b'}, delta, 'q0', {f'q{n}'})
+
+
+class TestCompiledAutomaton(unittest.TestCase):
+    def setUp(self):
+        self.grammar = grammars.Grammar()
+        self.automata = [self.grammar.to_finite_automaton(), nth_from_end_nfa(6)]
+        self.strings = random_strings(3000, 'abc', 16) + [self.grammar.generate_string() for _ in range(200)]
+
+    def test_match_agrees_with_string_in_language(self):
+        for automaton in self.automata:
+            compiled = automaton.compile()
+            expected = [automaton.string_in_language(s) for s in self.strings]
+            self.assertEqual([compiled.match(s) for s in self.strings], expected)
+            self.assertEqual(compiled.match_many(self.strings), expected)
+
+    def test_match_batch_agrees_with_string_in_language(self):
+        for automaton in self.automata:
+            compiled = automaton.compile()
+            expected = [automaton.string_in_language(s) for s in self.strings]
+            self.assertEqual(compiled.match_batch(self.strings).tolist(), expected)
+            matrix = grammars.encode_batch(self.strings)
+            self.assertEqual(compiled.match_batch(matrix).tolist(), expected)
+
+    def test_match_batch_edge_cases(self):
+        compiled = self.automata[0].compile()
+        self.assertEqual(compiled.match_batch([]).tolist(), [])
+        self.assertEqual(compiled.match_batch(['', 'aaa', 'aaé']).tolist(), [False, True, False])
+        with self.assertRaises(ValueError):
+            compiled.match_batch(['a€'])
+
+
+class TestNfaToDfa(unittest.TestCase):
+    def setUp(self):
+        self.nfa = grammars.FiniteAutomaton(automata.Q, automata.sigma, automata.delta, 'q0', automata.F)
+        self.dfa = automata.nfa_to_dfa(automata.Q, automata.sigma, automata.delta, automata.F)
+
+    def test_batch_in_language_agrees_with_nfa(self):
+        strings = random_strings(3000, 'abc', 12, seed=1)
+        table = automata.dfa_transition_table(*self.dfa, automata.sigma)
+        mask = automata.batch_in_language(table, strings)
+        self.assertIsInstance(mask, np.ndarray)
+        self.assertEqual(mask.tolist(), [self.nfa.string_in_language(s) for s in strings])
+
+
+    def test_variant_18_subsets(self):
+        dfa_states, dfa_delta, dfa_final = self.dfa
+        self.assertEqual(dfa_states[0], frozenset({'q0'}))
+        self.assertEqual(set(dfa_states), {frozenset({'q0'}), frozenset({'q0', 'q1'}), frozenset({'q2'}), frozenset({'q3'})})
+        self.assertEqual(dfa_final, [frozenset({'q3'})])
+        self.assertEqual(dfa_delta[(frozenset({'q0', 'q1'}), 'b')], frozenset({'q2'}))
+
+    def test_nth_from_end_has_exponential_dfa(self):
+        nfa = nth_from_end_nfa(7)
+        dfa_states, _, _ = automata.nfa_to_dfa(nfa.q, nfa.sigma, nfa.delta, nfa.f)
+        self.assertEqual(len(dfa_states), 2 ** 7)
+
+    def test_start_state_and_epsilon_moves(self):
+        # p -ε-> r -a-> s -ε-> p accepts a+ from p, and also the empty string from s
+        Q = {'p', 'r', 's'}
+        delta = {('p', 'ε'): {'r'}, ('r', 'a'): {'s'}, ('s', 'ε'): {'p'}}
+        dfa = automata.nfa_to_dfa(Q, {'a', 'ε'}, delta, {'s'}, start='p')
+        self.assertEqual(dfa[0][0], frozenset({'p', 'r'}))
+        table = automata.dfa_transition_table(*dfa, {'a'})
+        self.assertEqual(automata.batch_in_language(table, ['', 'a', 'aa', 'b']).tolist(), [False, True, True, False])
+        dfa = automata.nfa_to_dfa(Q, {'a'}, delta, {'s'}, start='s')
+        self.assertEqual(dfa[0][0], frozenset({'p', 'r', 's'}))
+        self.assertIn(dfa[0][0], dfa[2])
+
+
+class TestMinimization(unittest.TestCase):
+    def setUp(self):
+        _, symbols, _, table, accepting = automata.subset_construction(automata.Q, automata.sigma, automata.delta, automata.F)
+        self.variant_18 = (symbols, table, accepting)
+
+    def test_variant_18_is_already_minimal(self):
+        symbols, table, accepting = automata.minimize_dfa(*self.variant_18)
+        self.assertEqual(symbols, ['a', 'b', 'c'])
+        self.assertEqual(table, [[1, -1, -1], [1, 2, -1], [2, 3, -1], [3, -1, -1]])
+        self.assertEqual(accepting, [False, False, False, True])
+        self.assertTrue(automata.dfa_equivalent(self.variant_18, (symbols, table, accepting)))
+
+    def test_redundant_states_are_merged(self):
+        # Two copies of "ends in b" over {a, b}, plus an unreachable state
+        table = [[1, 2], [3, 4], [1, 2], [1, 2], [3, 4], [0, 0]]
+        accepting = [False, False, True, False, True, True]
+        symbols, min_table, min_accepting = automata.minimize_dfa(['a', 'b'], table, accepting)
+        self.assertEqual(min_table, [[0, 1], [0, 1]])
+        self.assertEqual(min_accepting, [False, True])
+        self.assertTrue(automata.dfa_equivalent((['a', 'b'], table, accepting), (symbols, min_table, min_accepting)))
+
+    def test_empty_language_and_inequivalence(self):
+        self.assertEqual(automata.minimize_dfa(['a'], [[0]], [False])[1:], ([[-1]], [False]))
+        self.assertFalse(automata.dfa_equivalent((['a'], [[0]], [True]), (['a'], [[-1]], [True])))
+        self.assertFalse(automata.dfa_equivalent((['a'], [[0]], [True]), (['b'], [[0]], [True])))
+
+    def test_compiled_automaton_minimize(self):
+        for automaton in (grammars.Grammar().to_finite_automaton(), nth_from_end_nfa(5)):
+            compiled = automaton.compile()
+            minimal = compiled.minimize()
+            self.assertTrue(compiled.equivalent_to(minimal))
+            self.assertLessEqual(minimal.num_states, compiled.num_states)
+            strings = random_strings(500, 'ab', 12, seed=4)
+            self.assertEqual(minimal.match_many(strings), compiled.match_many(strings))
+        self.assertEqual(nth_from_end_nfa(5).compile().minimize().num_states, 2 ** 5)
+
+
+class TestLazyDFA(unittest.TestCase):
+    def setUp(self):
+        self.strings = random_strings(2000, 'ab', 24, seed=5)
+        self.expected = [nth_from_end_nfa(8).string_in_language(s) for s in self.strings]
+
+    def test_large_cache_behaves_like_eager_dfa(self):
+        automaton = nth_from_end_nfa(8)
+        lazy = automaton.use_lazy_dfa(max_states=1000)
+        self.assertEqual([automaton.string_in_language(s) for s in self.strings], self.expected)
+        stats = lazy.stats()
+        self.assertLessEqual(stats['misses'], 2 * 2 ** 8)
+        self.assertEqual(stats['evictions'], 0)
+        self.assertGreater(stats['hits'], stats['misses'])
+
+    def test_bounded_cache_evicts_and_falls_back(self):
+        automaton = nth_from_end_nfa(8)
+        lazy = automaton.use_lazy_dfa(max_states=8, thrash_limit=4)
+        self.assertEqual([automaton.string_in_language(s) for s in self.strings], self.expected)
+        stats = lazy.stats()
+        self.assertLessEqual(stats['states'], 8)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertGreater(stats['fallbacks'], 0)
+
+    def test_memory_cap(self):
+        automaton = nth_from_end_nfa(8)
+        lazy = automaton.use_lazy_dfa(max_states=10 ** 6, max_bytes=4096)
+        self.assertEqual([automaton.string_in_language(s) for s in self.strings], self.expected)
+        self.assertLessEqual(lazy.bytes, 4096)
+        self.assertEqual(lazy.bytes, sum(lazy.sizes.values()))
+
+
+class TestUniformGeneration(unittest.TestCase):
+    def setUp(self):
+        self.grammar = grammars.Grammar()
+        self.compiled = self.grammar.to_finite_automaton().compile()
+
+    def test_counts_match_enumeration(self):
+        counts = self.grammar.count_words(12)[self.grammar.start_symbol]
+        for n in range(13):
+            words = (''.join(letters) for letters in itertools.product('ab', repeat=n))
+            self.assertEqual(counts[n], sum(self.compiled.match(word) for word in words))
+
+    def test_generate_many_covers_exact_length_uniformly(self):
+        expected = self.grammar.count_words(11)[self.grammar.start_symbol][11]
+        words = list(self.grammar.generate_many(6000, 11, rng=random.Random(3)))
+        self.assertTrue(all(len(word) == 11 and self.compiled.match(word) for word in words))
+        frequencies = collections.Counter(words)
+        self.assertEqual(len(frequencies), expected)
+        for frequency in frequencies.values():
+            self.assertLess(abs(frequency - len(words) / expected), len(words) / expected * 0.2)
+
+    def test_unreachable_length_raises(self):
+        # Every word of the variant grammar is at least three characters long
+        with self.assertRaises(ValueError):
+            next(self.grammar.generate_many(1, 2))
+
+    def test_generate_string(self):
+        for _ in range(100):
+            self.assertTrue(self.compiled.match(self.grammar.generate_string()))
+        self.assertEqual(len(self.grammar.generate_string(length=15)), 15)
+
+
+class TestTableCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = table_cache.TableCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compiled_automaton_round_trip(self):
+        nfa = nth_from_end_nfa(8)
+        cold = nfa.compile(cache=self.cache)
+        warm = nfa.compile(cache=self.cache)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'entries': 1})
+        self.assertEqual(warm.symbols, cold.symbols)
+        self.assertEqual(warm.table, cold.table)
+        self.assertEqual(warm.accepting, cold.accepting)
+        strings = random_strings(500, 'ab', 14)
+        self.assertEqual(warm.match_many(strings), [nfa.string_in_language(s) for s in strings])
+
+    def test_changed_automaton_misses(self):
+        nth_from_end_nfa(5).compile(cache=self.cache)
+        nfa = nth_from_end_nfa(5)
+        nfa.f = {'q4'}
+        self.assertEqual(nfa.compile(cache=self.cache).num_states, nfa.compile().num_states)
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 2, 'entries': 2})
+
+    def test_corrupt_or_outdated_entries_are_rebuilt(self):
+        nfa = nth_from_end_nfa(4)
+        expected = nfa.compile()
+        key = self.cache.key('dfa', nfa.canonical())
+        nfa.compile(cache=self.cache)
+        path = self.cache.path(key)
+        with open(path, 'r+b') as file:
+            file.truncate(os.path.getsize(path) // 2)
+        self.assertEqual(nfa.compile(cache=self.cache).table, expected.table)
+        with open(path, 'r+b') as file:
+            file.seek(4)
+            file.write((table_cache.FORMAT_VERSION + 1).to_bytes(4, 'little'))
+        self.assertEqual(nfa.compile(cache=self.cache).table, expected.table)
+        self.assertEqual(self.cache.stats()['hits'], 0)
+        self.assertEqual(nfa.compile(cache=self.cache).table, expected.table)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_subset_construction_round_trip(self):
+        nfa = nth_from_end_nfa(7)
+        args = (nfa.q, nfa.sigma, nfa.delta, nfa.f)
+        expected = automata.subset_construction(*args)
+        self.assertEqual(automata.subset_construction(*args, cache=self.cache), expected)
+        self.assertEqual(automata.subset_construction(*args, cache=self.cache), expected)
+        self.assertEqual(automata.nfa_to_dfa(*args, cache=self.cache), automata.nfa_to_dfa(*args))
+        self.assertEqual(self.cache.stats(), {'hits': 2, 'misses': 1, 'entries': 1})
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
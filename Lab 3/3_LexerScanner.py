@@ -1,7 +1,39 @@
 import re
 
+KEYWORDS = {"SELECT", "FROM", "WHERE", "ORDER_BY"}
+TOKEN_SPECIFICATION = [
+    ('NUMBER', r'\d+(\.\d*)?'),  # Integer or decimal number
+    ('ALL', r'\*'),  # All parameter
+    ('COMPARATOR', r'(==|>=|<=|<>|>|<)'),  # Comparator operators
+    ('COMMA', r','),  # Comma identifier
+    ('END', r';'),  # Statement terminator
+    ('ID', r'[a-zA-Z][a-zA-Z_$0-9]*'),  # Identifiers (fixed regex: `+` -> `*` to allow single-char IDs)
+    ('NEWLINE', r'\n'),  # Line endings
+    ('SKIP', r'[ \t]+'),  # Skip over spaces and tabs
+    ('MISMATCH', r'.'),  # Any other character
+]
+# Compiled once and shared by every Lexer instance
+TOKEN_REGEX = re.compile('|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in TOKEN_SPECIFICATION))
+
+
+def _number(value):
+    return 'NUMBER', float(value) if '.' in value else int(value)
+
+
+def _identifier(value):
+    return (value if value in KEYWORDS else 'ID'), value
+
+
+# Token kinds whose final kind or value depends on the matched text
+TOKEN_HANDLERS = {
+    'NUMBER': _number,
+    'ID': _identifier,
+}
+
 
 class Token:
+    __slots__ = ('kind', 'value', 'line', 'column')
+
     def __init__(self, kind, value, line, column):
         self.kind = kind
         self.value = value
@@ -18,32 +50,18 @@ class Lexer:
 
     def tokenize(self):
         code = self.code
-        keywords = {"SELECT", "FROM", "WHERE", "ORDER_BY"}
-        token_specification = [
-            ('NUMBER', r'\d+(\.\d*)?'),  # Integer or decimal number
-            ('ALL', r'\*'),  # All parameter
-            ('COMPARATOR', r'(==|>=|<=|<>|>|<)'),  # Comparator operators
-            ('COMMA', r','),  # Comma identifier
-            ('END', r';'),  # Statement terminator
-            ('ID', r'[a-zA-Z][a-zA-Z_$0-9]*'),  # Identifiers (fixed regex: `+` -> `*` to allow single-char IDs)
-            ('NEWLINE', r'\n'),  # Line endings
-            ('SKIP', r'[ \t]+'),  # Skip over spaces and tabs
-            ('MISMATCH', r'.'),  # Any other character
-        ]
-        tok_regex = '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in token_specification)
         line_num = 1
         line_start = 0
         tokens = []
 
-        for mo in re.finditer(tok_regex, code):
+        for mo in TOKEN_REGEX.finditer(code):
             kind = mo.lastgroup
+            handler = TOKEN_HANDLERS.get(kind)
             value = mo.group()
             column = mo.start() - line_start
 
-            if kind == 'NUMBER':
-                value = float(value) if '.' in value else int(value)
-            elif kind == 'ID' and value in keywords:
-                kind = value
+            if handler is not None:
+                kind, value = handler(value)
             elif kind == 'NEWLINE':
                 line_start = mo.end()
                 line_num += 1
@@ -1,108 +1,482 @@
 import random
 import re
-from itertools import product
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate, product
+
+class Symbol:
+    def __init__(self, char):
+        self.char = char
+
+    def to_regex(self):
+        return re.escape(self.char)
+
+
+class Concat:
+    def __init__(self, parts):
+        self.parts = parts
+
+    def to_regex(self):
+        return ''.join(part.to_regex() for part in self.parts)
+
+
+class Alternation:
+    def __init__(self, options):
+        self.options = options
+
+    def to_regex(self):
+        return '(' + '|'.join(option.to_regex() for option in self.options) + ')'
+
+
+class Repeat:
+    def __init__(self, node, low, high):
+        self.node = node
+        self.low = low
+        self.high = high  # None means unbounded
+
+    def to_regex(self):
+        inner = self.node.to_regex()
+        if isinstance(self.node, (Concat, Repeat)):
+            # Quantifiers bind to a single atom, and `x{3}?` would read as a lazy quantifier
+            inner = f'(?:{inner})'
+        quantifiers = {(0, 1): '?', (0, None): '*', (1, None): '+'}
+        return inner + quantifiers.get((self.low, self.high), f'{{{self.low}}}')
+
 
 class CustomRegexParser:
+    """
+    Recursive descent parser for the custom notation:
+
+        alternation := concat ('|' concat)*
+        concat      := postfix*
+        postfix     := atom ('?' | '*' | '+' | '²' | '³')*
+        atom        := '(' alternation ')' | character
+    """
+
     def __init__(self):
         self.superscript_map = {'²': 2, '³': 3}
 
     def parse(self, expression):
+        # Python `re` pattern equivalent to the expression, kept for display
+        return f'^{self.parse_tree(expression).to_regex()}$'
+
+    def parse_tree(self, expression):
+        self._expression = expression
+        self._pos = 0
+        tree = self._alternation()
+        if self._pos < len(expression):
+            raise ValueError(f"Unbalanced ')' at position {self._pos} in {expression!r}")
+        return tree
+
+    def _peek(self):
+        return self._expression[self._pos] if self._pos < len(self._expression) else None
+
+    def _alternation(self):
+        options = [self._concat()]
+        while self._peek() == '|':
+            self._pos += 1
+            options.append(self._concat())
+        return options[0] if len(options) == 1 else Alternation(options)
+
+    def _concat(self):
+        parts = []
+        while self._peek() not in (None, '|', ')'):
+            parts.append(self._postfix())
+        return parts[0] if len(parts) == 1 else Concat(parts)
+
+    def _postfix(self):
+        node = self._atom()
+        while True:
+            char = self._peek()
+            if char == '?':
+                node = Repeat(node, 0, 1)
+            elif char == '*':
+                node = Repeat(node, 0, None)
+            elif char == '+':
+                node = Repeat(node, 1, None)
+            elif char in self.superscript_map:
+                count = self.superscript_map[char]
+                node = Repeat(node, count, count)
+            else:
+                return node
+            self._pos += 1
+
+    def _atom(self):
+        char = self._peek()
+        self._pos += 1
+        if char == '(':
+            node = self._alternation()
+            if self._peek() != ')':
+                raise ValueError(f"Missing ')' in {self._expression!r}")
+            self._pos += 1
+            return Alternation([node]) if not isinstance(node, Alternation) else node
+        if char in '?*+' or char in self.superscript_map:
+            raise ValueError(f"Nothing to repeat at position {self._pos - 1} in {self._expression!r}")
+        return Symbol(char)
+
+
+class ThompsonNFA:
+    """Epsilon-NFA with integer states built from a parse tree by Thompson's construction."""
+
+    def __init__(self, tree):
+        self.moves = []  # state -> list of (symbol, next state)
+        self.epsilon = []  # state -> list of next states
+        self.start, self.accept = self._build(tree)
+
+    def _new_state(self):
+        self.moves.append([])
+        self.epsilon.append([])
+        return len(self.moves) - 1
+
+    def _build(self, node):
+        start = self._new_state()
+        if isinstance(node, Symbol):
+            end = self._new_state()
+            self.moves[start].append((node.char, end))
+        elif isinstance(node, Concat):
+            end = start
+            for part in node.parts:
+                part_start, part_end = self._build(part)
+                self.epsilon[end].append(part_start)
+                end = part_end
+        elif isinstance(node, Alternation):
+            end = self._new_state()
+            for option in node.options:
+                option_start, option_end = self._build(option)
+                self.epsilon[start].append(option_start)
+                self.epsilon[option_end].append(end)
+        else:
+            # Repeat: `low` mandatory copies, then either a loop or (high - low) optional copies
+            end = start
+            for _ in range(node.low):
+                copy_start, copy_end = self._build(node.node)
+                self.epsilon[end].append(copy_start)
+                end = copy_end
+            if node.high is None:
+                loop_start, loop_end = self._build(node.node)
+                self.epsilon[end].append(loop_start)
+                self.epsilon[loop_end].append(end)
+            else:
+                exit_state = self._new_state()
+                for _ in range(node.high - node.low):
+                    copy_start, copy_end = self._build(node.node)
+                    self.epsilon[end].append(copy_start)
+                    self.epsilon[end].append(exit_state)
+                    end = copy_end
+                self.epsilon[end].append(exit_state)
+                end = exit_state
+        return start, end
+
+    def closure(self, states):
+        stack = list(states)
+        closed = set(states)
+        while stack:
+            for next_state in self.epsilon[stack.pop()]:
+                if next_state not in closed:
+                    closed.add(next_state)
+                    stack.append(next_state)
+        return frozenset(closed)
+
+    def to_dfa(self):
+        # Subset construction; returns (symbols, rows, accepting) with rows[state][column] = next state or -1
+        symbols = sorted({symbol for moves in self.moves for symbol, _ in moves})
+        columns = {symbol: column for column, symbol in enumerate(symbols)}
+        start = self.closure([self.start])
+        subsets = [start]
+        ids = {start: 0}
+        rows = []
+        for current in subsets:
+            targets = [set() for _ in symbols]
+            for state in current:
+                for symbol, next_state in self.moves[state]:
+                    targets[columns[symbol]].add(next_state)
+            row = []
+            for target in targets:
+                if not target:
+                    row.append(-1)
+                    continue
+                subset = self.closure(target)
+                if subset not in ids:
+                    ids[subset] = len(subsets)
+                    subsets.append(subset)
+                row.append(ids[subset])
+            rows.append(row)
+        return symbols, rows, [self.accept in subset for subset in subsets]
+
+
+def minimize_table(table, accepting):
+    # Hopcroft's partition refinement on a DFA given as rows of next-state ids (-1 for none),
+    # start state 0. Returns the rows and accepting flags of the minimal DFA, numbered in
+    # breadth-first order from the start and without a dead state.
+    width = len(table[0]) if table else 0
+    order = [0]  # states reachable from the start
+    seen = {0}
+    for state in order:
+        for next_state in table[state]:
+            if next_state >= 0 and next_state not in seen:
+                seen.add(next_state)
+                order.append(next_state)
+    renumber = {state: i for i, state in enumerate(order)}
+    dead = len(order)  # explicit dead state completes the DFA
+    rows = [[renumber[t] if t >= 0 else dead for t in table[state]] for state in order] + [[dead] * width]
+    final = [bool(accepting[state]) for state in order] + [False]
+
+    inverse = [[[] for _ in rows] for _ in range(width)]
+    for state, row in enumerate(rows):
+        for column, next_state in enumerate(row):
+            inverse[column][next_state].append(state)
+
+    blocks = [block for block in ({s for s in range(dead + 1) if final[s]},
+                                  {s for s in range(dead + 1) if not final[s]}) if block]
+    block_of = [0] * (dead + 1)
+    for b, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = b
+    smallest = min(range(len(blocks)), key=lambda b: len(blocks[b]))
+    pending = {(smallest, column) for column in range(width)}
+
+    while pending:
+        splitter, column = pending.pop()
+        touched = {}
+        for state in [s for t in blocks[splitter] for s in inverse[column][t]]:
+            touched.setdefault(block_of[state], []).append(state)
+        for b, moved in touched.items():
+            if len(moved) == len(blocks[b]):
+                continue
+            new_block = set(moved)
+            blocks[b] -= new_block
+            new = len(blocks)
+            blocks.append(new_block)
+            for state in new_block:
+                block_of[state] = new
+            for c in range(width):
+                if (b, c) in pending:
+                    pending.add((new, c))
+                else:
+                    pending.add((new if len(new_block) <= len(blocks[b]) else b, c))
+
+    dead_block = block_of[dead]
+    start_block = block_of[0]
+    if start_block == dead_block:
+        return [[-1] * width], [False]
+    ids = {start_block: 0}
+    blocks_in_order = [start_block]
+    min_table = []
+    for b in blocks_in_order:
+        representative = next(iter(blocks[b]))
+        row = []
+        for next_state in rows[representative]:
+            target = block_of[next_state]
+            if target == dead_block:
+                row.append(-1)
+                continue
+            if target not in ids:
+                ids[target] = len(blocks_in_order)
+                blocks_in_order.append(target)
+            row.append(ids[target])
+        min_table.append(row)
+    return min_table, [final[next(iter(blocks[b]))] for b in blocks_in_order]
+
+
+class CompiledRegex:
+    """Minimal DFA for an expression; matching is one table lookup per character, with no backtracking."""
+
+    def __init__(self, expression, tree):
+        symbols, rows, accepting = ThompsonNFA(tree).to_dfa()
+        rows, accepting = minimize_table(rows, accepting)
+        self.expression = expression
+        # One dict per state keeps the hot loop to a single lookup per character
+        self.transitions = [{symbol: next_state for symbol, next_state in zip(symbols, row) if next_state >= 0}
+                            for row in rows]
+        self.accepting = accepting
+
+    @property
+    def num_states(self):
+        return len(self.transitions)
+
+    def match(self, string):
+        transitions = self.transitions
+        state = 0
+        for char in string:
+            state = transitions[state].get(char)
+            if state is None:
+                return False
+        return self.accepting[state]
+
+
+class RegexInterpreter:
+    def __init__(self, cache_size=128):
+        self.parser = CustomRegexParser()
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # expression -> CompiledRegex, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cache_stats(self):
+        return {'size': len(self.cache), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def compile(self, expression):
+        compiled = self.cache.get(expression)
+        if compiled is not None:
+            self.hits += 1
+            self.cache.move_to_end(expression)
+            return compiled
+        self.misses += 1
+        compiled = CompiledRegex(expression, self.parser.parse_tree(expression))
+        if self.cache_size > 0:
+            self.cache[expression] = compiled
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def interpret(self, string, expression):
+        return self.compile(expression).match(string)
+
+    def interpret_many(self, strings, expression):
+        match = self.compile(expression).match
+        return [match(string) for string in strings]
+
+
+class Generator:
+    def __init__(self, interpreter=None):
+        self.superscript_map = {'²': 2, '³': 3}
+        self.interpreter = interpreter or RegexInterpreter()
+
+    def generate_regex(self, expression, count=10):
+        # Random walk over the expression with `*` and `+` capped at 5 repetitions; stops as soon as
+        # `count` distinct samples are found, or after a bounded number of draws for small languages
+        samples = {}
+        for _ in range(count * 20):
+            samples[self._random_sample(expression)] = None
+            if len(samples) == count:
+                break
+        return list(samples)
+
+    def _random_sample(self, expression):
         result = ''
         i = 0
         while i < len(expression):
             char = expression[i]
 
-            if i + 1 < len(expression) and expression[i + 1] in self.superscript_map:
-                repeat = self.superscript_map[expression[i + 1]]
-                result += char * repeat
+            if i + 1 < len(expression) and expression[i + 1] in '?*+':
+                q = expression[i + 1]
+                if q == '?':
+                    result += random.choice([char, ''])
+                elif q == '*':
+                    result += char * random.randint(0, 5)
+                elif q == '+':
+                    result += char * random.randint(1, 5)
                 i += 2
+
+            elif i + 1 < len(expression) and expression[i + 1] in self.superscript_map:
+                result += char * self.superscript_map[expression[i + 1]]
+                i += 2
+
             elif char == '(':
                 end = expression.find(')', i)
-                group = expression[i:end + 1]
-                repeat = ''
+                group_content = expression[i + 1:end]
+                options = group_content.split('|')
+                chosen = random.choice(options)
                 if end + 1 < len(expression) and expression[end + 1] in self.superscript_map:
-                    repeat = '{' + str(self.superscript_map[expression[end + 1]]) + '}'
+                    repeat = self.superscript_map[expression[end + 1]]
+                    result += ''.join(random.choices(options, k=repeat))
                     i = end + 2
                 else:
+                    result += chosen
                     i = end + 1
-                result += group + repeat
-            elif i + 1 < len(expression) and expression[i + 1] in '?*+':
-                result += char + expression[i + 1]
-                i += 2
+
             else:
                 result += char
                 i += 1
-        return f'^{result}$'
-
-
-class RegexInterpreter:
-    def __init__(self):
-        self.parser = CustomRegexParser()
+        return result
 
-    def interpret(self, string, expression):
-        regex = self.parser.parse(expression)
-        return re.match(regex, string) is not None
+    def _counted(self, expression, max_length):
+        # counts[n][state] is the number of accepted words of length n readable from `state`
+        # of the minimal DFA; edges are each state's transitions in symbol order
+        compiled = self.interpreter.compile(expression)
+        edges = [sorted(transitions.items()) for transitions in compiled.transitions]
+        counts = [[1 if accept else 0 for accept in compiled.accepting]]
+        for _ in range(max_length):
+            previous = counts[-1]
+            counts.append([sum(previous[next_state] for _, next_state in row) for row in edges])
+        return edges, counts
 
+    def enumerate_words(self, expression, max_length):
+        """
+        Yields every word of the language up to `max_length` in length-lexicographic order.
 
-class Generator:
-    def __init__(self):
-        self.superscript_map = {'²': 2, '³': 3}
-
-    def generate_regex(self, expression, count=10):
-        samples = []
-        for _ in range(count * 3):
-            result = ''
-            i = 0
-            while i < len(expression):
-                char = expression[i]
-
-                if i + 1 < len(expression) and expression[i + 1] in '?*+':
-                    q = expression[i + 1]
-                    if q == '?':
-                        result += random.choice([char, ''])
-                    elif q == '*':
-                        result += char * random.randint(0, 5)
-                    elif q == '+':
-                        result += char * random.randint(1, 5)
-                    i += 2
-
-                elif i + 1 < len(expression) and expression[i + 1] in self.superscript_map:
-                    result += char * self.superscript_map[expression[i + 1]]
-                    i += 2
-
-                elif char == '(':
-                    end = expression.find(')', i)
-                    group_content = expression[i + 1:end]
-                    options = group_content.split('|')
-                    chosen = random.choice(options)
-                    if end + 1 < len(expression) and expression[end + 1] in self.superscript_map:
-                        repeat = self.superscript_map[expression[end + 1]]
-                        result += ''.join(random.choices(options, k=repeat))
-                        i = end + 2
-                    else:
-                        result += chosen
-                        i = end + 1
-
+        The walk runs over the minimal DFA, so each word appears once, and branches that cannot
+        complete a word of the current length are pruned. Memory stays O(max_length * states).
+        """
+        edges, counts = self._counted(expression, max_length)
+        if counts[0][0]:
+            yield ''
+        for length in range(1, max_length + 1):
+            if not counts[length][0]:
+                continue
+            prefix = []
+            iterators = [iter(edges[0])]
+            while iterators:
+                for symbol, next_state in iterators[-1]:
+                    remaining = length - len(prefix) - 1
+                    if not counts[remaining][next_state]:
+                        continue
+                    if remaining == 0:
+                        yield ''.join(prefix) + symbol
+                        continue
+                    prefix.append(symbol)
+                    iterators.append(iter(edges[next_state]))
+                    break
                 else:
-                    result += char
-                    i += 1
+                    iterators.pop()
+                    if prefix:
+                        prefix.pop()
+
+    def sample_words(self, expression, count, max_length, min_length=0, rng=None):
+        """
+        Yields `count` words drawn uniformly from all words whose length is in [min_length, max_length].
 
-            samples.append(result)
-        return list(set(samples))
+        The word counts per length and state make every draw succeed: the length is picked in
+        proportion to how many words have it, then each symbol in proportion to its completions.
+        """
+        randrange = (rng or random).randrange
+        edges, counts = self._counted(expression, max_length)
+        lengths = list(range(min_length, max_length + 1))
+        cumulative = list(accumulate(counts[length][0] for length in lengths))
+        if not cumulative or not cumulative[-1]:
+            raise ValueError(f"{expression!r} has no words of length {min_length}..{max_length}")
+        for _ in range(count):
+            length = lengths[bisect_right(cumulative, randrange(cumulative[-1]))]
+            state = 0
+            word = []
+            for remaining in range(length - 1, -1, -1):
+                pick = randrange(counts[remaining + 1][state])
+                for symbol, next_state in edges[state]:
+                    completions = counts[remaining][next_state]
+                    if pick < completions:
+                        word.append(symbol)
+                        state = next_state
+                        break
+                    pick -= completions
+            yield ''.join(word)
 
 
-regex_interpreter = RegexInterpreter()
-generator = Generator()
+# Main
+if __name__ == "__main__":
+    regex_interpreter = RegexInterpreter()
+    generator = Generator(regex_interpreter)
 
-def print_samples(expr, generator, interpreter):
-    print(f"\n[Expression: {expr}]")
-    print("Regex:", interpreter.parser.parse(expr))
-    samples = generator.generate_regex(expr, count=10)
-    for sample in samples[:10]:
-        ok = interpreter.interpret(sample, expr)
-        print(f"{sample} -> {'✔' if ok else '✘'}")
+    def print_samples(expr, generator, interpreter):
+        print(f"\n[Expression: {expr}]")
+        print("Regex:", interpreter.parser.parse(expr))
+        samples = generator.generate_regex(expr, count=10)
+        for sample in samples[:10]:
+            ok = interpreter.interpret(sample, expr)
+            print(f"{sample} -> {'✔' if ok else '✘'}")
 
-print_samples("A?B²(C|D)³E*F+", generator, regex_interpreter)
-print_samples("(X|Y|Z)³8+(9|o)", generator, regex_interpreter)
-print_samples("M?N²(0|P)³Q*R+", generator, regex_interpreter)
-print_samples("(H|i)(J|K)L*N?", generator, regex_interpreter)
+    print_samples("A?B²(C|D)³E*F+", generator, regex_interpreter)
+    print_samples("(X|Y|Z)³8+(9|o)", generator, regex_interpreter)
+    print_samples("M?N²(0|P)³Q*R+", generator, regex_interpreter)
+    print_samples("(H|i)(J|K)L*N?", generator, regex_interpreter)
@@ -0,0 +1,140 @@
+import importlib
+import re
+import sys
+import time
+
+regex = importlib.import_module('4_RegularExpression')
+
+EXPRESSIONS = ["A?B²(C|D)³E*F+", "(X|Y|Z)³8+(9|o)", "M?N²(0|P)³Q*R+", "(H|i)(J|K)L*N?"]
+
+
+def _legacy_parse(expression):
+    # CustomRegexParser.parse as it was before the parse tree: string rewriting into an `re` pattern
+    superscript_map = {'²': 2, '³': 3}
+    result = ''
+    i = 0
+    while i < len(expression):
+        char = expression[i]
+        if i + 1 < len(expression) and expression[i + 1] in superscript_map:
+            result += char * superscript_map[expression[i + 1]]
+            i += 2
+        elif char == '(':
+            end = expression.find(')', i)
+            group = expression[i:end + 1]
+            repeat = ''
+            if end + 1 < len(expression) and expression[end + 1] in superscript_map:
+                repeat = '{' + str(superscript_map[expression[end + 1]]) + '}'
+                i = end + 2
+            else:
+                i = end + 1
+            result += group + repeat
+        elif i + 1 < len(expression) and expression[i + 1] in '?*+':
+            result += char + expression[i + 1]
+            i += 2
+        else:
+            result += char
+            i += 1
+    return f'^{result}$'
+
+
+def _legacy_interpret(string, expression):
+    return re.match(_legacy_parse(expression), string) is not None
+
+
+# --- Compiled DFA vs. per-call rewrite + re.match ---
+
+def bench_compiled(count=100_000):
+    generator = regex.Generator()
+    samples = {expression: generator.generate_regex(expression, count=100) for expression in EXPRESSIONS}
+    interpreter = regex.RegexInterpreter()
+    print(f"Matching {count} samples per expression")
+    print(f"{'expression':<18} {'legacy re.match':>16} {'compiled DFA':>14}")
+    for expression, strings in samples.items():
+        batch = (strings * (count // len(strings) + 1))[:count]
+        rates = []
+        for interpret in (_legacy_interpret, interpreter.interpret):
+            start = time.perf_counter()
+            for string in batch:
+                interpret(string, expression)
+            rates.append(count / (time.perf_counter() - start))
+        print(f"{expression:<18} {rates[0]:>14.0f}/s {rates[1]:>12.0f}/s")
+
+    # Nested repetition makes the backtracking engine exponential on a near miss
+    expression = "(a|a)*b"
+    interpreter.compile(expression)
+    for n in (16, 20, 24):
+        string = 'a' * n + 'c'
+        timings = []
+        for interpret in (_legacy_interpret, interpreter.interpret):
+            start = time.perf_counter()
+            interpret(string, expression)
+            timings.append(time.perf_counter() - start)
+        print(f"{expression} on a^{n}c: re.match {timings[0]:.4f}s, compiled DFA {timings[1] * 1e6:.1f}us")
+
+
+# --- Compiled-pattern cache ---
+
+def bench_cache(calls=1_000_000, cold_calls=10_000):
+    expression = EXPRESSIONS[0]
+    strings = regex.Generator().generate_regex(expression, count=100)
+    batch = (strings * (calls // len(strings) + 1))[:calls]
+    print(f"Pattern cache on {expression}")
+    runs = [
+        ('cold (cache_size=0)', regex.RegexInterpreter(cache_size=0), batch[:cold_calls]),
+        ('warm interpret', regex.RegexInterpreter(), batch),
+    ]
+    for name, interpreter, workload in runs:
+        start = time.perf_counter()
+        for string in workload:
+            interpreter.interpret(string, expression)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<22} {len(workload):>8} calls {len(workload) / elapsed:>12.0f} calls/s  {interpreter.cache_stats()}")
+    interpreter = regex.RegexInterpreter()
+    start = time.perf_counter()
+    interpreter.interpret_many(batch, expression)
+    elapsed = time.perf_counter() - start
+    print(f"{'interpret_many':<22} {calls:>8} calls {calls / elapsed:>12.0f} calls/s  {interpreter.cache_stats()}")
+
+
+# --- Corpus generation: rejection-style sampling vs. DFA enumeration and counted sampling ---
+
+def bench_generate(count=200_000, max_length=16):
+    import tracemalloc
+    # generate_regex only understands flat groups, so the expression stays within its notation
+    expression = "(a|b|c|d)³(e|f|g)³x*y*"
+    generator = regex.Generator()
+    generator.interpreter.compile(expression)
+    print(f"Producing {count} words of {expression} (length <= {max_length})")
+
+    def consume(words):
+        produced = 0
+        for _ in words:
+            produced += 1
+            if produced == count:
+                break
+        return produced
+
+    runs = [
+        ('generate_regex', lambda: generator.generate_regex(expression, count=count // 10)),
+        ('enumerate_words', lambda: generator.enumerate_words(expression, max_length)),
+        ('sample_words', lambda: generator.sample_words(expression, count, max_length)),
+    ]
+    for name, make in runs:
+        tracemalloc.start()
+        start = time.perf_counter()
+        produced = consume(make())
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<16} {produced:>8} words {produced / elapsed:>10.0f} words/s  peak {peak / 1024:>8.0f} KiB")
+
+
+BENCHMARKS = {
+    'compiled': bench_compiled,
+    'cache': bench_cache,
+    'generate': bench_generate,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
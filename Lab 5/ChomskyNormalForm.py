@@ -1,233 +1,495 @@
+import json
+import time
+import tracemalloc
+from array import array
 from collections import deque
+from itertools import chain, product
+
+
+EPSILON = 'ε'
+
+
+class ConversionReport:
+    """
+    Per-pass profile of Grammar.to_cnf: wall time, traced memory and grammar size around every pass.
+
+    Pass it as `to_cnf(report=...)`; one report may collect several conversions, and `aggregate`
+    sums reports pass by pass. Memory is measured with tracemalloc, which slows the passes down;
+    use trace_memory=False for timings only.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.conversions = 0
+        self.passes = []
+
+    def record(self, name, run, grammar):
+        before = grammar.size_stats()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        run()
+        entry = {'pass': name, 'seconds': time.perf_counter() - start}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            entry['memory_delta'] = current - baseline
+            entry['memory_peak'] = peak - baseline
+        entry['before'] = before
+        entry['after'] = grammar.size_stats()
+        self.passes.append(entry)
+
+    @classmethod
+    def aggregate(cls, reports):
+        # Sums entries with the same pass name; sizes add up, so averages are over all conversions
+        reports = list(reports)
+        total = cls(trace_memory=all(report.trace_memory for report in reports))
+        by_name = {}
+        for report in reports:
+            total.conversions += report.conversions
+            for entry in report.passes:
+                merged = by_name.get(entry['pass'])
+                if merged is None:
+                    merged = by_name[entry['pass']] = {'pass': entry['pass'], 'seconds': 0.0}
+                    if total.trace_memory:
+                        merged['memory_delta'] = merged['memory_peak'] = 0
+                    merged['before'], merged['after'] = {}, {}
+                    total.passes.append(merged)
+                merged['seconds'] += entry['seconds']
+                if total.trace_memory:
+                    merged['memory_delta'] += entry['memory_delta']
+                    merged['memory_peak'] = max(merged['memory_peak'], entry['memory_peak'])
+                for side in ('before', 'after'):
+                    for key, value in entry[side].items():
+                        merged[side][key] = merged[side].get(key, 0) + value
+        return total
+
+    def to_dict(self):
+        passes = []
+        for entry in self.passes:
+            entry = dict(entry)
+            for side in ('before', 'after'):
+                stats = dict(entry[side])
+                stats['average_length'] = stats['symbols'] / stats['productions'] if stats['productions'] else 0.0
+                entry[side] = stats
+            passes.append(entry)
+        return {'conversions': self.conversions, 'passes': passes}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def format_table(self):
+        lines = [f"{'pass':<22} {'time':>10} {'mem delta':>11} {'mem peak':>10} {'NT':>15} {'productions':>19} {'avg len':>11}"]
+        for entry in self.to_dict()['passes']:
+            before, after = entry['before'], entry['after']
+            if self.trace_memory:
+                memory = f"{entry['memory_delta'] / 1024:>9.0f}K {entry['memory_peak'] / 1024:>9.0f}K"
+            else:
+                memory = f"{'-':>10} {'-':>10}"
+            lines.append(
+                f"{entry['pass']:<22} {entry['seconds'] * 1e3:>8.1f}ms {memory} "
+                f"{before['non_terminals']:>7}>{after['non_terminals']:<7} "
+                f"{before['productions']:>9}>{after['productions']:<9} "
+                f"{before['average_length']:>5.2f}>{after['average_length']:.2f}")
+        return '\n'.join(lines)
 
 
 class Grammar:
     def __init__(self, non_terminals, terminals, rules, start_symbol='S'):
-        self.non_terminals = non_terminals
-        self.terminals = terminals
-        self.rules = rules
+        # Symbols are interned as integer ids and productions are tuples of ids, with ε as the empty tuple.
+        # A production may be given as a string of one-character symbols or as a sequence of symbol names.
+        self.symbols = []
+        self.ids = {}
+        self._non_terminals = [self._intern(nt) for nt in non_terminals]
+        self._terminals = [self._intern(terminal) for terminal in terminals]
+        self._rules = {self._intern(nt): [self._production(prod) for prod in prods] for nt, prods in rules.items()}
         self.start_symbol = start_symbol
+        self._start = self._intern(start_symbol)
         self._new_nt_counter = 0
 
+    def _intern(self, name):
+        symbol = self.ids.get(name)
+        if symbol is None:
+            symbol = self.ids[name] = len(self.symbols)
+            self.symbols.append(name)
+        return symbol
+
+    def _production(self, prod):
+        if prod == EPSILON:
+            return ()
+        return tuple(self._intern(symbol) for symbol in prod)
+
+    @property
+    def non_terminals(self):
+        return [self.symbols[nt] for nt in self._non_terminals]
+
+    @property
+    def terminals(self):
+        return [self.symbols[terminal] for terminal in self._terminals]
+
+    @property
+    def rules(self):
+        # Productions as tuples of symbol names; ε is the empty tuple
+        names = self.symbols
+        return {names[nt]: [tuple(names[symbol] for symbol in prod) for prod in prods]
+                for nt, prods in self._rules.items()}
+
+    def size_stats(self):
+        return {
+            'non_terminals': len(self._rules),
+            'productions': sum(len(prods) for prods in self._rules.values()),
+            'symbols': sum(len(prod) for prods in self._rules.values() for prod in prods),
+        }
+
+    def format_production(self, prod):
+        if not prod:
+            return EPSILON
+        names = [self.symbols[symbol] for symbol in prod]
+        return ''.join(names) if all(len(name) == 1 for name in names) else ' '.join(names)
+
     def print_rules(self, title=None):
         def custom_sort(nt):
-            if nt == 'S':
+            if nt == self._start:
                 return (0, '')
-            elif nt[0].isalpha():
-                return (1, nt)
+            elif self.symbols[nt][0].isalpha():
+                return (1, self.symbols[nt])
             else:
-                return (2, nt)
+                return (2, self.symbols[nt])
 
         if title:
             print(f"\n{'=' * 50}")
             print(f"{title:^50}")
             print(f"{'=' * 50}")
 
-        ordered = sorted(self.rules.keys(), key=custom_sort)
-        max_nt_len = max(len(nt) for nt in ordered) if ordered else 0
+        ordered = sorted(self._rules.keys(), key=custom_sort)
+        max_nt_len = max(len(self.symbols[nt]) for nt in ordered) if ordered else 0
 
         for non_terminal in ordered:
-            productions = sorted(self.rules[non_terminal])
+            productions = sorted(self.format_production(prod) for prod in self._rules[non_terminal])
             arrow = "→"
-            print(f"{non_terminal:<{max_nt_len}} {arrow} {' | '.join(productions)}")
+            print(f"{self.symbols[non_terminal]:<{max_nt_len}} {arrow} {' | '.join(productions)}")
 
     def is_cnf(self):
-        for non_terminal in self.rules:
-            for production in self.rules[non_terminal]:
-                if len(production) == 0 or len(production) > 2:
+        terminals = set(self._terminals)
+        non_terminals = set(self._non_terminals)
+        for non_terminal in self._rules:
+            for production in self._rules[non_terminal]:
+                if len(production) == 0 and non_terminal != self._start or len(production) > 2:
                     return False
-                if len(production) == 1 and production not in self.terminals and production != 'ε':
+                if len(production) == 1 and production[0] not in terminals:
                     return False
-                if len(production) == 2 and any(symbol in self.terminals for symbol in production):
+                if len(production) == 2 and not all(symbol in non_terminals for symbol in production):
                     return False
         return True
 
     def eliminate_epsilon_productions(self):
-        nullable = set()
-        for nt in self.non_terminals:
-            if 'ε' in self.rules.get(nt, []):
-                nullable.add(nt)
-
-        changed = True
-        while changed:
-            changed = False
-            for nt in self.non_terminals:
-                for prod in self.rules.get(nt, []):
-                    if all(symbol in nullable for symbol in prod):
-                        if nt not in nullable:
-                            nullable.add(nt)
-                            changed = True
+        nullable = self._nullable()
 
         new_rules = {}
-        for nt in self.non_terminals:
+        for nt in self._non_terminals:
             new_productions = set()
-            for prod in self.rules.get(nt, []):
-                if prod == 'ε':
-                    continue
-
-                combinations = [""]
-                for symbol in prod:
-                    new_combinations = []
-                    for combination in combinations:
-                        new_combinations.append(combination + symbol)
-                        if symbol in nullable:
-                            new_combinations.append(combination)
-                    combinations = new_combinations
-
-                for combination in combinations:
-                    if combination:
-                        new_productions.add(combination)
-
+            for prod in self._rules.get(nt, []):
+                new_productions.update(self._epsilon_variants(prod, nullable))
             new_rules[nt] = list(new_productions)
 
-        self.rules = new_rules
+        self._rules = new_rules
+
+    def _epsilon_variants(self, prod, nullable):
+        # Yields the non-empty variants of `prod` without any subset of its nullable symbols, one at a time.
+        # A run of equal nullable symbols only varies in how many of them are kept, which skips the
+        # duplicates that choosing which ones to drop would produce. Still 2^k variants for k distinct
+        # nullable symbols; binarizing first (see to_cnf) keeps k <= 2.
+        runs = []
+        for symbol in prod:
+            if runs and runs[-1][0] == symbol:
+                runs[-1][1] += 1
+            else:
+                runs.append([symbol, 1])
+        choices = [range(count, -1, -1) if symbol in nullable else (count,) for symbol, count in runs]
+        for kept in product(*choices):
+            variant = tuple(chain.from_iterable((symbol,) * count for (symbol, _), count in zip(runs, kept)))
+            if variant:
+                yield variant
 
     def eliminate_renaming(self):
-        unit_pairs = {}
-        for nt in self.non_terminals:
-            unit_pairs[nt] = set()
-            queue = deque([nt])
-            while queue:
-                current = queue.popleft()
-                for prod in self.rules.get(current, []):
-                    if prod in self.non_terminals and prod not in unit_pairs[nt]:
-                        unit_pairs[nt].add(prod)
-                        queue.append(prod)
-
-        new_rules = {}
-        for nt in self.non_terminals:
-            new_productions = set()
-            for prod in self.rules.get(nt, []):
-                if prod not in self.non_terminals:
-                    new_productions.add(prod)
-
-            for unit_nt in unit_pairs[nt]:
-                for prod in self.rules.get(unit_nt, []):
-                    if prod not in self.non_terminals:
-                        new_productions.add(prod)
-
-            new_rules[nt] = list(new_productions)
-
-        self.rules = new_rules
+        # Unit closures are shared per strongly connected component of the unit graph; components come
+        # sinks first, so every successor's closure is complete before it is merged in
+        non_terminals = set(self._non_terminals)
+        closure = {}
+        for component in self._unit_components(non_terminals):
+            members = set(component)
+            productions = set()
+            successors = set()
+            for nt in component:
+                for prod in self._rules.get(nt, []):
+                    if len(prod) == 1 and prod[0] in non_terminals:
+                        successors.add(prod[0])
+                    else:
+                        productions.add(prod)
+            for successor in successors - members:
+                productions |= closure[successor]
+            for nt in component:
+                closure[nt] = productions
+
+        self._rules = {nt: list(closure[nt]) for nt in self._non_terminals}
+
+    def _unit_components(self, non_terminals):
+        # Tarjan's algorithm over A -> B edges, iterative so long unit chains don't hit the recursion limit
+        graph = {nt: [prod[0] for prod in self._rules.get(nt, []) if len(prod) == 1 and prod[0] in non_terminals]
+                 for nt in self._non_terminals}
+        index, low = {}, {}
+        stack, on_stack = [], set()
+        components = []
+        for root in self._non_terminals:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph[root]))]
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = low[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(graph[successor])))
+                        break
+                    if successor in on_stack:
+                        low[node] = min(low[node], index[successor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
 
     def eliminate_inaccessible_symbols(self):
+        non_terminals = set(self._non_terminals)
         accessible = set()
-        queue = deque([self.start_symbol])
-        accessible.add(self.start_symbol)
+        queue = deque([self._start])
+        accessible.add(self._start)
 
         while queue:
             current = queue.popleft()
-            for prod in self.rules.get(current, []):
+            for prod in self._rules.get(current, []):
                 for symbol in prod:
-                    if symbol in self.non_terminals and symbol not in accessible:
+                    if symbol in non_terminals and symbol not in accessible:
                         accessible.add(symbol)
                         queue.append(symbol)
 
-        self.non_terminals = [nt for nt in self.non_terminals if nt in accessible]
-        self.rules = {nt: prods for nt, prods in self.rules.items() if nt in accessible}
+        self._non_terminals = [nt for nt in self._non_terminals if nt in accessible]
+        self._rules = {nt: prods for nt, prods in self._rules.items() if nt in accessible}
 
     def eliminate_non_productive_symbols(self):
-        productive = set()
-        for nt in self.non_terminals:
-            for prod in self.rules.get(nt, []):
-                if all(symbol in self.terminals for symbol in prod):
-                    productive.add(nt)
-                    break
+        terminals = set(self._terminals)
+        productive = self._productive()
 
-        changed = True
-        while changed:
-            changed = False
-            for nt in self.non_terminals:
-                if nt not in productive:
-                    for prod in self.rules.get(nt, []):
-                        if all(symbol in productive or symbol in self.terminals for symbol in prod):
-                            productive.add(nt)
-                            changed = True
-                            break
-
-        self.non_terminals = [nt for nt in self.non_terminals if nt in productive]
+        self._non_terminals = [nt for nt in self._non_terminals if nt in productive]
         new_rules = {}
         for nt in productive:
             new_productions = []
-            for prod in self.rules.get(nt, []):
-                if all(symbol in productive or symbol in self.terminals for symbol in prod):
+            for prod in self._rules.get(nt, []):
+                if all(symbol in productive or symbol in terminals for symbol in prod):
                     new_productions.append(prod)
             new_rules[nt] = new_productions
 
-        self.rules = new_rules
+        self._rules = new_rules
+
+    def _nullable(self):
+        return self._propagate(lambda prod: prod)
+
+    def _productive(self):
+        terminals = set(self._terminals)
+        return self._propagate(lambda prod: [symbol for symbol in prod if symbol not in terminals])
+
+    def _propagate(self, unresolved):
+        # Worklist fixpoint behind the nullable and productive sets. `unresolved(prod)` lists the symbols
+        # (one entry per occurrence) that must be resolved before the production resolves its non-terminal.
+        # Each symbol indexes the productions it occurs in and each production counts what is left,
+        # so every occurrence is visited once instead of rescanning the grammar until nothing changes.
+        # Non-terminals resolved up front are not indexed at all.
+        resolved = set()
+        worklist = []
+        pending = []
+        for nt in self._non_terminals:
+            if nt in resolved:
+                continue
+            symbol_lists = []
+            for prod in self._rules.get(nt, []):
+                symbols = unresolved(prod)
+                if not symbols:
+                    resolved.add(nt)
+                    worklist.append(nt)
+                    break
+                symbol_lists.append(symbols)
+            else:
+                pending.append((nt, symbol_lists))
+
+        lhs_of, remaining, occurrences = [], [], {}
+        for nt, symbol_lists in pending:
+            for symbols in symbol_lists:
+                for symbol in symbols:
+                    occurrences.setdefault(symbol, []).append(len(lhs_of))
+                lhs_of.append(nt)
+                remaining.append(len(symbols))
+
+        while worklist:
+            for production in occurrences.get(worklist.pop(), ()):
+                remaining[production] -= 1
+                if not remaining[production]:
+                    nt = lhs_of[production]
+                    if nt not in resolved:
+                        resolved.add(nt)
+                        worklist.append(nt)
+        return resolved
 
     def _create_new_non_terminal(self):
         new_symbol = str(self._new_nt_counter)
         self._new_nt_counter += 1
-        while new_symbol in self.non_terminals:
+        while new_symbol in self.ids:
             new_symbol = str(self._new_nt_counter)
             self._new_nt_counter += 1
-        return new_symbol
+        new_nt = self._intern(new_symbol)
+        self._non_terminals.append(new_nt)
+        return new_nt
 
-    def to_cnf(self, print_steps=False):
-        if self.is_cnf():
-            if print_steps:
-                self.print_rules("Grammar is already in CNF")
-            return
-
-        self.eliminate_epsilon_productions()
-        if print_steps:
-            self.print_rules("1. After eliminating epsilon productions")
-
-        self.eliminate_renaming()
-        if print_steps:
-            self.print_rules("2. After eliminating renaming productions")
-
-        self.eliminate_inaccessible_symbols()
-        if print_steps:
-            self.print_rules("3. After eliminating inaccessible symbols")
-
-        self.eliminate_non_productive_symbols()
-        if print_steps:
-            self.print_rules("4. After eliminating non-productive symbols")
+    def _binarize(self):
+        # Splits productions longer than 2 symbols left to right, ABCD -> ((AB)C)D, sharing the
+        # non-terminal of every pair prefix that was already introduced
+        pair_replacements = {}
+        for nt in list(self._rules.keys()):
+            new_productions = []
+            for prod in self._rules[nt]:
+                if len(prod) > 2:
+                    head = prod[0]
+                    for i in range(1, len(prod) - 1):
+                        pair = (head, prod[i])
+                        head = pair_replacements.get(pair)
+                        if head is None:
+                            head = pair_replacements[pair] = self._create_new_non_terminal()
+                            self._rules[head] = [pair]
+                    prod = (head, prod[-1])
+                new_productions.append(prod)
+            self._rules[nt] = new_productions
 
-        # Step 1: Replace terminals in productions with length > 1
+    def _replace_terminals(self):
         terminal_replacements = {}
         new_rules = {}
-        for terminal in self.terminals:
+        for terminal in self._terminals:
             new_nt = self._create_new_non_terminal()
             terminal_replacements[terminal] = new_nt
-            new_rules[new_nt] = [terminal]
-            self.non_terminals.append(new_nt)
+            new_rules[new_nt] = [(terminal,)]
 
-        for nt in self.non_terminals:
+        for nt in self._non_terminals:
             if nt not in new_rules:
                 new_productions = []
-                for prod in self.rules.get(nt, []):
+                for prod in self._rules.get(nt, []):
                     if len(prod) == 1:
                         new_productions.append(prod)
                     else:
-                        new_prod = []
-                        for symbol in prod:
-                            if symbol in terminal_replacements:
-                                new_prod.append(terminal_replacements[symbol])
-                            else:
-                                new_prod.append(symbol)
-                        new_productions.append(''.join(new_prod))
+                        new_productions.append(tuple(terminal_replacements.get(symbol, symbol) for symbol in prod))
                 new_rules[nt] = new_productions
 
-        self.rules.update(new_rules)
-
-        # Step 2: Break down productions longer than 2 symbols
-        pair_replacements = {}
-        for nt in list(self.rules.keys()):
-            new_productions = []
-            for prod in self.rules[nt]:
-                while len(prod) > 2:
-                    first_two = prod[:2]
-                    if first_two not in pair_replacements:
-                        new_nt = self._create_new_non_terminal()
-                        pair_replacements[first_two] = new_nt
-                        self.rules[new_nt] = [first_two]
-                        self.non_terminals.append(new_nt)
-                    prod = pair_replacements[first_two] + prod[2:]
-                new_productions.append(prod)
-            self.rules[nt] = new_productions
-
-        if print_steps:
-            self.print_rules("5. Final CNF Form")
\ No newline at end of file
+        self._rules.update(new_rules)
+
+    def canonical(self, binarize_first=False):
+        # Exact description of the input to to_cnf; symbol and production order decide the new names
+        return repr((self.symbols, self._non_terminals, self._terminals, self._start,
+                     list(self._rules.items()), self._new_nt_counter, binarize_first))
+
+    def _pack(self):
+        # Rules are flattened as lhs, number of productions, then length and ids of every production
+        flat = array('i')
+        for nt, productions in self._rules.items():
+            flat.extend((nt, len(productions)))
+            for production in productions:
+                flat.append(len(production))
+                flat.extend(production)
+        return [self.symbols, array('i', self._non_terminals), array('i', self._terminals),
+                array('i', (self._start, self._new_nt_counter)), flat]
+
+    def _unpack(self, symbols, non_terminals, terminals, scalars, flat):
+        self.symbols = symbols
+        self.ids = {name: symbol for symbol, name in enumerate(symbols)}
+        self._non_terminals = non_terminals.tolist()
+        self._terminals = terminals.tolist()
+        self._start, self._new_nt_counter = scalars
+        flat = flat.tolist()
+        self._rules = {}
+        i = 0
+        while i < len(flat):
+            productions = self._rules[flat[i]] = []
+            count = flat[i + 1]
+            i += 2
+            for _ in range(count):
+                length = flat[i]
+                productions.append(tuple(flat[i + 1:i + 1 + length]))
+                i += 1 + length
+
+    def to_cnf(self, print_steps=False, binarize_first=False, report=None, cache=None):
+        # binarize_first splits long productions before removing ε, so a production with k nullable
+        # symbols turns into k - 1 pairs of at most 3 variants each instead of 2^k variants.
+        # A ConversionReport passed as `report` gets one entry per pass.
+        # With a TableCache as `cache`, the converted grammar is stored on disk and reloaded next time.
+        if self.is_cnf():
+            if print_steps:
+                self.print_rules("Grammar is already in CNF")
+            return report
+
+        if cache is not None:
+            key = cache.key('cnf', self.canonical(binarize_first))
+            sections = cache.load(key)
+            if sections is not None:
+                if report is None:
+                    self._unpack(*sections)
+                else:
+                    report.record('cache_load', lambda: self._unpack(*sections), self)
+                    report.conversions += 1
+                if print_steps:
+                    self.print_rules("Final CNF Form (from cache)")
+                return report
+            report = self.to_cnf(print_steps, binarize_first, report)
+            cache.store(key, self._pack())
+            return report
+
+        passes = [
+            ('epsilon', self.eliminate_epsilon_productions, "1. After eliminating epsilon productions"),
+            ('renaming', self.eliminate_renaming, "2. After eliminating renaming productions"),
+            ('inaccessible', self.eliminate_inaccessible_symbols, "3. After eliminating inaccessible symbols"),
+            ('non_productive', self.eliminate_non_productive_symbols, "4. After eliminating non-productive symbols"),
+            # Step 1: Replace terminals in productions with length > 1
+            ('replace_terminals', self._replace_terminals, None),
+            # Step 2: Break down productions longer than 2 symbols
+            ('binarize', self._binarize, "5. Final CNF Form"),
+        ]
+        if binarize_first:
+            passes.insert(0, ('binarize_first', self._binarize, "0. After binarizing long productions"))
+
+        tracing = report is not None and report.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        try:
+            for name, run, title in passes:
+                if report is None:
+                    run()
+                else:
+                    report.record(name, run, self)
+                if print_steps and title:
+                    self.print_rules(title)
+        finally:
+            if tracing:
+                tracemalloc.stop()
+        if report is not None:
+            report.conversions += 1
+        return report
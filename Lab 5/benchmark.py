@@ -0,0 +1,305 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque, namedtuple
+
+from ChomskyNormalForm import Grammar
+from cyk import CYKParser
+from table_cache import TableCache
+
+
+def sample_grammar():
+    # The grammar from test_chomsky.py
+    rules = {
+        'S': ['aB', 'bA', 'B'],
+        'A': ['b', 'aD', 'AS', 'bAB', 'ε'],
+        'B': ['a', 'bS'],
+        'C': ['AB'],
+        'D': ['BB']
+    }
+    return Grammar(['S', 'A', 'B', 'C', 'D'], ['a', 'b'], rules)
+
+
+def random_words(count, length, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice('ab') for _ in range(length)) for _ in range(count)]
+
+
+# --- CYK chart filling ---
+
+def bench_cyk(lengths=(100, 250, 500, 1000, 2000), batch=10_000, batch_length=20):
+    grammar = sample_grammar()
+    grammar.to_cnf()
+    parser = CYKParser(grammar)
+    print(f"CYK on the test_chomsky grammar ({len(parser.symbols)} non-terminals, {len(parser.pairs)} binary RHS)")
+    for length in lengths:
+        word = random_words(1, length, seed=length)[0]
+        start = time.perf_counter()
+        accepted = parser.recognize(word)
+        elapsed = time.perf_counter() - start
+        # (start, length, split) triples a cell-by-cell chart would visit
+        splits = (length ** 3 - length) // 6
+        print(f"length {length:>5}: chart filled in {elapsed:8.3f} s  ({splits / elapsed:>12.0f} cell splits/s, accepted={accepted})")
+
+    words = random_words(batch, batch_length, seed=1)
+    start = time.perf_counter()
+    single = [parser.recognize(word) for word in words]
+    one_by_one = time.perf_counter() - start
+    start = time.perf_counter()
+    batched = parser.recognize_many(words)
+    together = time.perf_counter() - start
+    assert single == batched
+    print(f"{batch} words of length {batch_length}: recognize {batch / one_by_one:.0f}/s, "
+          f"recognize_many {batch / together:.0f}/s")
+
+
+# --- Fixpoint passes: worklists and SCCs vs. rescanning loops ---
+
+# Grammar definitions with one-character symbols and string productions, readable both by Grammar
+# and by the string-based legacy passes below
+StringGrammar = namedtuple('StringGrammar', 'non_terminals terminals rules')
+
+
+def random_grammar(num_non_terminals, num_productions, seed=0, terminals='abc', epsilon=0.01):
+    # Unit productions point a few non-terminals ahead, so unit chains stay short as in hand-written grammars
+    rng = random.Random(seed)
+    non_terminals = ['S'] + [chr(0x4E00 + i) for i in range(num_non_terminals - 1)]
+    rules = {nt: [] for nt in non_terminals}
+    for _ in range(num_productions):
+        i = rng.randrange(num_non_terminals)
+        kind = rng.random()
+        if kind < epsilon:
+            prod = 'ε'
+        elif kind < 0.08:
+            prod = non_terminals[min(i + rng.randint(0, 8), num_non_terminals - 1)]
+        else:
+            prod = ''.join(rng.choice(non_terminals) if rng.random() < 0.5 else rng.choice(terminals)
+                           for _ in range(rng.randint(2, 4)))
+        rules[non_terminals[i]].append(prod)
+    return StringGrammar(non_terminals, list(terminals), rules)
+
+
+def chain_grammar(num_non_terminals):
+    # Each non-terminal depends on the next one, which a rescanning loop resolves one per pass
+    names = ['S'] + [chr(0x4E00 + i) for i in range(num_non_terminals - 1)]
+    rules = {a: ['a' + b, b + b] for a, b in zip(names, names[1:])}
+    rules[names[-1]] = ['a', 'ε']
+    return StringGrammar(names, ['a'], rules)
+
+
+def _legacy_nullable(grammar):
+    nullable = {nt for nt in grammar.non_terminals if 'ε' in grammar.rules.get(nt, [])}
+    changed = True
+    while changed:
+        changed = False
+        for nt in grammar.non_terminals:
+            for prod in grammar.rules.get(nt, []):
+                if all(symbol in nullable for symbol in prod):
+                    if nt not in nullable:
+                        nullable.add(nt)
+                        changed = True
+    return nullable
+
+
+def _legacy_productive(grammar):
+    productive = set()
+    for nt in grammar.non_terminals:
+        for prod in grammar.rules.get(nt, []):
+            if all(symbol in grammar.terminals for symbol in prod):
+                productive.add(nt)
+                break
+    changed = True
+    while changed:
+        changed = False
+        for nt in grammar.non_terminals:
+            if nt not in productive:
+                for prod in grammar.rules.get(nt, []):
+                    if all(symbol in productive or symbol in grammar.terminals for symbol in prod):
+                        productive.add(nt)
+                        changed = True
+                        break
+    return productive
+
+
+def _legacy_unit_pairs(grammar):
+    unit_pairs = {}
+    for nt in grammar.non_terminals:
+        unit_pairs[nt] = set()
+        queue = deque([nt])
+        while queue:
+            current = queue.popleft()
+            for prod in grammar.rules.get(current, []):
+                if prod in grammar.non_terminals and prod not in unit_pairs[nt]:
+                    unit_pairs[nt].add(prod)
+                    queue.append(prod)
+    return unit_pairs
+
+
+def _timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def bench_fixpoints(sizes=((500, 5_000), (2_000, 20_000), (10_000, 100_000)), legacy_units_limit=2_000, chain=2_000):
+    # Each pass starts from the generated grammar; chaining them would time the
+    # epsilon expansion's growth rather than the fixpoints
+    print(f"{'grammar':<22} {'pass':<12} {'legacy fixpoint':>16} {'worklist/SCC':>14}")
+    cases = [(f"{n} NT / {p} P", random_grammar(n, p)) for n, p in sizes]
+    cases.append((f"chain of {chain} NT", chain_grammar(chain)))
+    for label, spec in cases:
+        grammar = Grammar(*spec)
+        nullable = grammar._nullable()
+        legacy = _timed(lambda: _legacy_nullable(spec))
+        new = _timed(grammar._nullable)
+        print(f"{label:<22} {'nullable':<12} {legacy:>15.3f}s {new:>13.3f}s  ({len(nullable)} nullable)")
+
+        productive = grammar._productive()
+        legacy = _timed(lambda: _legacy_productive(spec))
+        new = _timed(grammar._productive)
+        print(f"{label:<22} {'productive':<12} {legacy:>15.3f}s {new:>13.3f}s  ({len(productive)} productive)")
+
+        if len(spec.non_terminals) <= legacy_units_limit:
+            legacy = f"{_timed(lambda: _legacy_unit_pairs(spec)):>15.3f}s"
+        else:
+            legacy = f"{'(skipped)':>16}"
+        new = _timed(grammar.eliminate_renaming)
+        print(f"{label:<22} {'unit closure':<12} {legacy} {new:>13.3f}s")
+
+
+# --- to_cnf: interned integer tuples vs. string productions ---
+
+def _legacy_to_cnf(spec):
+    # The string-based pipeline: productions are str, symbols are single characters, and fresh
+    # non-terminals are minted as single characters too so its output stays correct
+    non_terminals = list(spec.non_terminals)
+    terminals = spec.terminals
+    rules = spec.rules
+    fresh = iter(chr(0x20000 + i) for i in range(40_000))
+
+    nullable = _legacy_nullable(spec)
+    new_rules = {}
+    for nt in non_terminals:
+        new_productions = set()
+        for prod in rules.get(nt, []):
+            if prod == 'ε':
+                continue
+            combinations = [""]
+            for symbol in prod:
+                combinations = [c + symbol for c in combinations] + (combinations if symbol in nullable else [])
+            new_productions.update(c for c in combinations if c)
+        new_rules[nt] = list(new_productions)
+
+    unit_pairs = _legacy_unit_pairs(StringGrammar(non_terminals, terminals, new_rules))
+    rules = {}
+    for nt in non_terminals:
+        rules[nt] = list({prod for unit in unit_pairs[nt] | {nt} for prod in new_rules.get(unit, [])
+                          if prod not in non_terminals})
+
+    accessible = {'S'}
+    queue = deque(['S'])
+    while queue:
+        for prod in rules.get(queue.popleft(), []):
+            for symbol in prod:
+                if symbol in non_terminals and symbol not in accessible:
+                    accessible.add(symbol)
+                    queue.append(symbol)
+    non_terminals = [nt for nt in non_terminals if nt in accessible]
+    rules = {nt: prods for nt, prods in rules.items() if nt in accessible}
+
+    productive = _legacy_productive(StringGrammar(non_terminals, terminals, rules))
+    non_terminals = [nt for nt in non_terminals if nt in productive]
+    rules = {nt: [prod for prod in rules.get(nt, []) if all(s in productive or s in terminals for s in prod)]
+             for nt in productive}
+
+    terminal_replacements = {}
+    for terminal in terminals:
+        terminal_replacements[terminal] = new_nt = next(fresh)
+        rules[new_nt] = [terminal]
+    for nt in non_terminals:
+        rules[nt] = [prod if len(prod) == 1 else ''.join(terminal_replacements.get(s, s) for s in prod)
+                     for prod in rules.get(nt, [])]
+
+    pair_replacements = {}
+    for nt in list(rules.keys()):
+        new_productions = []
+        for prod in rules[nt]:
+            while len(prod) > 2:
+                first_two = prod[:2]
+                if first_two not in pair_replacements:
+                    pair_replacements[first_two] = new_nt = next(fresh)
+                    rules[new_nt] = [first_two]
+                prod = pair_replacements[first_two] + prod[2:]
+            new_productions.append(prod)
+        rules[nt] = new_productions
+    return rules
+
+
+def bench_cnf(sizes=((1_000, 5_000), (3_000, 15_000), (6_000, 30_000))):
+    print(f"{'grammar':<22} {'string productions':>19} {'interned tuples':>16} {'CNF productions':>16}")
+    for num_non_terminals, num_productions in sizes:
+        spec = random_grammar(num_non_terminals, num_productions, epsilon=0.002)
+        result = {}
+        legacy = _timed(lambda: result.update(legacy=_legacy_to_cnf(spec)))
+        grammar = Grammar(*spec)
+        new = _timed(grammar.to_cnf)
+        size = sum(map(len, grammar._rules.values()))
+        assert size == sum(map(len, result['legacy'].values()))
+        print(f"{num_non_terminals} NT / {num_productions} P".ljust(22) + f" {legacy:>18.3f}s {new:>15.3f}s {size:>16}")
+
+# --- ε-removal on long nullable productions ---
+
+def long_nullable_grammar(k):
+    # S -> N0 N1 ... N(k-1) with every Ni -> a | ε
+    names = [f'N{i}' for i in range(k)]
+    rules = {'S': [names]}
+    rules.update({name: ['a', 'ε'] for name in names})
+    return Grammar(['S'] + names, ['a'], rules)
+
+
+def bench_epsilon(default_sizes=(8, 12, 16), binarized_sizes=(8, 12, 16, 30, 200)):
+    import tracemalloc
+    print(f"{'mode':<16} {'k':>4} {'to_cnf':>10} {'peak memory':>14} {'CNF productions':>16}")
+    for mode, sizes in (('subsets', default_sizes), ('binarize_first', binarized_sizes)):
+        for k in sizes:
+            grammar = long_nullable_grammar(k)
+            tracemalloc.start()
+            elapsed = _timed(lambda: grammar.to_cnf(binarize_first=mode == 'binarize_first'))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = sum(map(len, grammar._rules.values()))
+            print(f"{mode:<16} {k:>4} {elapsed:>9.3f}s {peak / 2 ** 20:>11.1f} MiB {size:>16}")
+
+
+# --- On-disk CNF cache ---
+
+def bench_cache(sizes=((1_000, 5_000), (3_000, 15_000), (6_000, 30_000))):
+    # Cold conversions run every pass and store the result, warm ones load it from the same directory
+    print(f"{'grammar':<22} {'cold':>10} {'warm':>10} {'entry size':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TableCache(directory)
+        for num_non_terminals, num_productions in sizes:
+            spec = random_grammar(num_non_terminals, num_productions, epsilon=0.002)
+            timings = []
+            for _ in ('cold', 'warm'):
+                grammar = Grammar(*spec)
+                timings.append(_timed(lambda: grammar.to_cnf(cache=cache)))
+            size = os.path.getsize(cache.path(cache.key('cnf', Grammar(*spec).canonical())))
+            print(f"{num_non_terminals} NT / {num_productions} P".ljust(22) +
+                  f" {timings[0]:>9.3f}s {timings[1]:>9.3f}s {size / 1024:>8.0f} KiB")
+        print(cache.stats())
+
+
+BENCHMARKS = {
+    'cyk': bench_cyk,
+    'fixpoints': bench_fixpoints,
+    'cnf': bench_cnf,
+    'epsilon': bench_epsilon,
+    'cache': bench_cache,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,203 @@
+class CYKParser:
+    """
+    CYK recognizer and parse-forest builder for a grammar in Chomsky Normal Form.
+
+    Binary productions are indexed by right-hand side, (B, C) -> LHS indices, and grouped by B so a
+    chart step only looks at pairs whose left symbol actually occurs. The chart is kept transposed:
+    for every span length and non-terminal there is one integer bitset over start positions, so a
+    single AND/shift combines a split point for all starts at once. `cell()` reads it back as the
+    usual bitset of non-terminals for one (start, length) cell.
+    """
+
+    def __init__(self, grammar):
+        if not grammar.is_cnf():
+            raise ValueError("CYKParser needs a grammar in Chomsky Normal Form; call to_cnf() first")
+        rules = grammar.rules
+        self.start_symbol = grammar.start_symbol
+        self.symbols = sorted(rules, key=str)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.accepts_empty = () in rules.get(grammar.start_symbol, [])
+
+        self.terminal_rules = {}   # terminal -> LHS indices
+        self.pairs = {}            # (B, C) -> LHS indices
+        for lhs, productions in rules.items():
+            for production in productions:
+                if len(production) == 1:
+                    self.terminal_rules.setdefault(production[0], []).append(self.index[lhs])
+                elif len(production) == 2:
+                    key = (self.index[production[0]], self.index[production[1]])
+                    self.pairs.setdefault(key, []).append(self.index[lhs])
+
+        self.by_left = {}
+        for (left, right), lhs in self.pairs.items():
+            self.by_left.setdefault(left, []).append((right, tuple(lhs)))
+        self.by_left = list(self.by_left.items())
+        self.by_lhs = {}
+        for (left, right), lhs in self.pairs.items():
+            for a in lhs:
+                self.by_lhs.setdefault(a, []).append((left, right))
+
+    def _fill(self, text, ends, max_length):
+        # layers[length][A]: bitset of start positions i such that A derives text[i:i + length].
+        # `ends` marks the last position of every word packed into `text`; spans crossing one are dropped.
+        count = len(self.symbols)
+        everything = (1 << len(text)) - 1
+        first = [0] * count
+        for terminal, lhs in self.terminal_rules.items():
+            positions = int(''.join('1' if char == terminal else '0' for char in reversed(text)) or '0', 2)
+            if positions:
+                for a in lhs:
+                    first[a] |= positions
+        layers = [None, first]
+
+        valid = everything
+        for length in range(2, max_length + 1):
+            valid &= ~(ends >> (length - 2)) & everything
+            row = [0] * count
+            for split in range(1, length):
+                left = layers[split]
+                right = layers[length - split]
+                shifted = {}
+                for b, entries in self.by_left:
+                    starts = left[b]
+                    if not starts:
+                        continue
+                    for c, lhs in entries:
+                        tail = shifted.get(c)
+                        if tail is None:
+                            tail = shifted[c] = right[c] >> split
+                        both = starts & tail
+                        if both:
+                            for a in lhs:
+                                row[a] |= both
+            layers.append([bits & valid for bits in row])
+        return layers
+
+    def chart(self, string):
+        """Returns the filled chart for `string`: chart[length][A] is a bitset over start positions."""
+        return self._fill(string, 1 << len(string) - 1 if string else 0, len(string))
+
+    def cell(self, chart, start, length):
+        """Bitset of the non-terminals (bit i is self.symbols[i]) deriving string[start:start + length]."""
+        mask = 0
+        for a, starts in enumerate(chart[length]):
+            if starts >> start & 1:
+                mask |= 1 << a
+        return mask
+
+    def recognize(self, string):
+        if not string:
+            return self.accepts_empty
+        start = self.index.get(self.start_symbol)
+        return start is not None and bool(self.chart(string)[len(string)][start] & 1)
+
+    def recognize_many(self, strings):
+        """
+        Recognizes a batch of strings with one chart over their concatenation.
+
+        Every chart step then works on bitsets covering the whole batch, and only span lengths up to
+        the longest string are filled, so many short strings cost about as much as one long one.
+        """
+        strings = list(strings)
+        start = self.index.get(self.start_symbol)
+        results = [self.accepts_empty if not string else False for string in strings]
+        words = [(i, string) for i, string in enumerate(strings) if string]
+        if start is None or not words:
+            return results
+
+        offsets = []
+        ends = 0
+        position = 0
+        for _, string in words:
+            offsets.append(position)
+            position += len(string)
+            ends |= 1 << position - 1
+        layers = self._fill(''.join(string for _, string in words), ends, max(len(string) for _, string in words))
+        for (i, string), offset in zip(words, offsets):
+            results[i] = bool(layers[len(string)][start] >> offset & 1)
+        return results
+
+    def _alternatives(self, chart, string, node, ends, starts):
+        # Yields the children of `node`. Split points come from two cached bitsets: the end positions of
+        # B's spans from `start`, and the start positions of C's spans up to `end`; their AND is every split.
+        symbol, start, length = node
+        a = self.index[symbol]
+        if length == 1:
+            if a in self.terminal_rules.get(string[start], ()):
+                yield (string[start],)
+            return
+        end = start + length
+        inside = ((1 << end) - 1) & ~((1 << start + 1) - 1)
+        for b, c in self.by_lhs.get(a, ()):
+            left = ends.get((b, start))
+            if left is None:
+                left = ends[(b, start)] = sum(1 << start + k for k in range(1, len(string) - start + 1)
+                                              if chart[k][b] >> start & 1)
+            right = starts.get((c, end))
+            if right is None:
+                right = starts[(c, end)] = sum(1 << end - k for k in range(1, end + 1) if chart[k][c] >> end - k & 1)
+            middles = left & right & inside
+            while middles:
+                lowest = middles & -middles
+                middle = lowest.bit_length() - 1
+                middles ^= lowest
+                yield (self.symbols[b], self.symbols[c], middle - start)
+
+    def parse_forest(self, string):
+        """
+        Returns the shared parse forest of `string`, or None when it is not in the language.
+
+        The forest maps (non-terminal, start, length) to its alternatives: (terminal,) for A -> a and
+        (B, C, split) for A -> BC with B spanning the first `split` characters. Only nodes reachable
+        from the root are included, so each shared sub-derivation appears once.
+        """
+        if not string or not self.recognize(string):
+            return None
+        chart = self.chart(string)
+        ends, starts = {}, {}
+        forest = {}
+        pending = [(self.start_symbol, 0, len(string))]
+        while pending:
+            node = pending.pop()
+            if node in forest:
+                continue
+            alternatives = forest[node] = list(self._alternatives(chart, string, node, ends, starts))
+            start = node[1]
+            for alternative in alternatives:
+                if len(alternative) == 3:
+                    left, right, split = alternative
+                    pending.append((left, start, split))
+                    pending.append((right, start + split, node[2] - split))
+        return forest
+
+    def parse_tree(self, string):
+        """Returns one derivation of `string` as nested (non-terminal, children...) tuples, or None."""
+        if not string or not self.recognize(string):
+            return None
+        chart = self.chart(string)
+        ends, starts = {}, {}
+
+        # Built bottom-up from an explicit stack; long strings give derivations deeper than the recursion limit
+        chosen = {}
+        built = {}
+        root = (self.start_symbol, 0, len(string))
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            symbol, start, length = node
+            alternative = chosen.get(node)
+            if alternative is None:
+                alternative = chosen[node] = next(self._alternatives(chart, string, node, ends, starts))
+            if len(alternative) == 1:
+                built[node] = (symbol, alternative[0])
+                stack.pop()
+                continue
+            left, right, split = alternative
+            children = ((left, start, split), (right, start + split, length - split))
+            missing = [child for child in children if child not in built]
+            if missing:
+                stack.extend(missing)
+            else:
+                built[node] = (symbol, built[children[0]], built[children[1]])
+                stack.pop()
+        return built[root]
@@ -0,0 +1,51 @@
+import argparse
+import sys
+
+from benchmark import long_nullable_grammar, random_grammar
+from ChomskyNormalForm import ConversionReport, Grammar
+
+SUITES = {
+    'small': [(200, 1_000), (500, 2_500)],
+    'medium': [(1_000, 5_000), (2_000, 10_000), (4_000, 20_000)],
+    'large': [(5_000, 25_000), (10_000, 50_000)],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile Grammar.to_cnf pass by pass on generated grammars")
+    parser.add_argument('suite', nargs='?', default='medium', choices=SUITES)
+    parser.add_argument('--seeds', type=int, default=3, help="grammars generated per size")
+    parser.add_argument('--nullable', type=int, default=0,
+                        help="also convert a production with this many nullable symbols")
+    parser.add_argument('--binarize-first', action='store_true', help="binarize before removing ε")
+    parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc (faster, timings only)")
+    parser.add_argument('--json', metavar='PATH', help="write the aggregated report as JSON")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for num_non_terminals, num_productions in SUITES[args.suite]:
+        report = ConversionReport(trace_memory=not args.no_memory)
+        for seed in range(args.seeds):
+            grammar = Grammar(*random_grammar(num_non_terminals, num_productions, seed, epsilon=0.002))
+            grammar.to_cnf(binarize_first=args.binarize_first, report=report)
+        print(f"\n{num_non_terminals} non-terminals / {num_productions} productions, {report.conversions} grammars")
+        print(ConversionReport.aggregate([report]).format_table())
+        reports.append(report)
+
+    if args.nullable:
+        report = ConversionReport(trace_memory=not args.no_memory)
+        long_nullable_grammar(args.nullable).to_cnf(binarize_first=args.binarize_first, report=report)
+        print(f"\nOne production with {args.nullable} nullable symbols")
+        print(report.format_table())
+        reports.append(report)
+
+    total = ConversionReport.aggregate(reports)
+    print(f"\nAll {total.conversions} conversions")
+    print(total.format_table())
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            file.write(total.to_json(indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,79 @@
+import itertools
+import json
+import random
+import tempfile
+import tracemalloc
 import unittest
-from ChomskyNormalForm import Grammar
+from collections import deque
+
+from ChomskyNormalForm import ConversionReport, Grammar
+from table_cache import TableCache
+from cyk import CYKParser
+
+
+def random_grammar(num_non_terminals, num_productions, seed=0, terminals='abc'):
+    # Unit productions point a few non-terminals ahead, so unit chains stay short as in hand-written grammars
+    rng = random.Random(seed)
+    non_terminals = ['S'] + [f'N{i}' for i in range(1, num_non_terminals)]
+    rules = {nt: [] for nt in non_terminals}
+    for _ in range(num_productions):
+        i = rng.randrange(num_non_terminals)
+        kind = rng.random()
+        if kind < 0.01:
+            prod = 'ε'
+        elif kind < 0.08:
+            prod = [non_terminals[min(i + rng.randint(0, 8), num_non_terminals - 1)]]
+        else:
+            prod = [rng.choice(non_terminals) if rng.random() < 0.5 else rng.choice(terminals)
+                    for _ in range(rng.randint(2, 4))]
+        rules[non_terminals[i]].append(prod)
+    return Grammar(non_terminals, list(terminals), rules)
+
+
+def fixpoint_nullable(grammar):
+    rules = grammar.rules
+    nullable = {nt for nt in grammar.non_terminals if () in rules.get(nt, [])}
+    changed = True
+    while changed:
+        changed = False
+        for nt in grammar.non_terminals:
+            for prod in rules.get(nt, []):
+                if nt not in nullable and all(symbol in nullable for symbol in prod):
+                    nullable.add(nt)
+                    changed = True
+    return nullable
+
+
+def fixpoint_productive(grammar):
+    rules = grammar.rules
+    terminals = set(grammar.terminals)
+    productive = set()
+    changed = True
+    while changed:
+        changed = False
+        for nt in grammar.non_terminals:
+            for prod in rules.get(nt, []):
+                if nt not in productive and all(s in productive or s in terminals for s in prod):
+                    productive.add(nt)
+                    changed = True
+    return productive
+
+
+def bfs_unit_closure(grammar):
+    non_terminals = set(grammar.non_terminals)
+    productions = grammar.rules
+    rules = {}
+    for nt in grammar.non_terminals:
+        reached = set()
+        queue = deque([nt])
+        while queue:
+            for prod in productions.get(queue.popleft(), []):
+                if len(prod) == 1 and prod[0] in non_terminals and prod[0] not in reached:
+                    reached.add(prod[0])
+                    queue.append(prod[0])
+        rules[nt] = {prod for unit in reached | {nt} for prod in productions.get(unit, [])
+                     if not (len(prod) == 1 and prod[0] in non_terminals)}
+    return rules
 
 class TestGrammar(unittest.TestCase):
     def setUp(self):
@@ -23,14 +97,14 @@ class TestGrammar(unittest.TestCase):
     def test_eliminate_epsilon_productions(self):
         self.grammar.eliminate_epsilon_productions()
         for prods in self.grammar.rules.values():
-            self.assertNotIn('ε', prods)
+            self.assertNotIn((), prods)
 
     def test_eliminate_renaming_productions(self):
         self.grammar.eliminate_epsilon_productions()
         self.grammar.eliminate_renaming()
         for prods in self.grammar.rules.values():
             for prod in prods:
-                self.assertNotIn(prod, self.grammar.non_terminals)
+                self.assertFalse(len(prod) == 1 and prod[0] in self.grammar.non_terminals)
 
     def test_eliminate_inaccessible_symbols(self):
         self.grammar.eliminate_epsilon_productions()
@@ -61,9 +135,205 @@ class TestGrammar(unittest.TestCase):
             for prod in prods:
                 self.assertTrue(1 <= len(prod) <= 2)
                 if len(prod) == 1:
-                    self.assertTrue(prod in self.grammar.terminals)
+                    self.assertTrue(prod[0] in self.grammar.terminals)
                 if len(prod) == 2:
                     self.assertTrue(all(symbol in self.grammar.non_terminals for symbol in prod))
 
+
+class TestFixpoints(unittest.TestCase):
+    def setUp(self):
+        self.grammars = [random_grammar(n, 4 * n, seed) for seed, n in enumerate((5, 20, 60, 200))]
+
+    def test_epsilon_elimination_matches_fixpoint(self):
+        for grammar in self.grammars:
+            nullable = fixpoint_nullable(grammar)
+            expected = {}
+            rules = grammar.rules
+            for nt in grammar.non_terminals:
+                expected[nt] = set()
+                for prod in rules[nt]:
+                    combinations = {()}
+                    for symbol in prod:
+                        combinations = {c + (symbol,) for c in combinations} | (combinations if symbol in nullable else set())
+                    expected[nt] |= combinations - {()}
+            grammar.eliminate_epsilon_productions()
+            self.assertEqual({nt: set(prods) for nt, prods in grammar.rules.items()}, expected)
+
+    def test_productive_matches_fixpoint(self):
+        for grammar in self.grammars:
+            expected = fixpoint_productive(grammar)
+            grammar.eliminate_non_productive_symbols()
+            self.assertEqual(set(grammar.non_terminals), expected)
+            self.assertEqual(set(grammar.rules), expected)
+
+    def test_unit_closure_matches_bfs(self):
+        for grammar in self.grammars:
+            grammar.eliminate_epsilon_productions()
+            expected = bfs_unit_closure(grammar)
+            grammar.eliminate_renaming()
+            self.assertEqual({nt: set(prods) for nt, prods in grammar.rules.items()}, expected)
+
+    def test_long_unit_chain(self):
+        names = ['S'] + [f'N{i}' for i in range(5000)]
+        rules = {a: [[b]] for a, b in zip(names, names[1:])}
+        rules[names[-1]] = ['a', 'S']
+        grammar = Grammar(list(names), ['a'], rules)
+        grammar.eliminate_renaming()
+        self.assertTrue(all(prods == [('a',)] for prods in grammar.rules.values()))
+
+
+class TestSymbols(unittest.TestCase):
+    def test_multi_character_symbols(self):
+        rules = {
+            'Expr': [['Expr', '+', 'Term'], ['Term']],
+            'Term': [['Term', '*', 'Factor'], ['Factor']],
+            'Factor': [['(', 'Expr', ')'], ['id']],
+        }
+        grammar = Grammar(['Expr', 'Term', 'Factor'], ['+', '*', '(', ')', 'id'], rules, start_symbol='Expr')
+        grammar.to_cnf()
+        self.assertTrue(grammar.is_cnf())
+        parser = CYKParser(grammar)
+        self.assertTrue(parser.recognize(['id', '+', 'id', '*', '(', 'id', ')']))
+        self.assertFalse(parser.recognize(['id', '+', '*', 'id']))
+
+    def test_many_fresh_non_terminals(self):
+        # Twelve terminals and a long production need well over ten fresh names ('10', '11', ...)
+        word = 'abcdefghijkl'
+        grammar = Grammar(['S', 'A'], list(word), {'S': [word, 'A'], 'A': ['a', 'ε']})
+        grammar.to_cnf()
+        self.assertTrue(grammar.is_cnf())
+        self.assertIn('10', grammar.non_terminals)
+        parser = CYKParser(grammar)
+        self.assertTrue(parser.recognize(word))
+        self.assertTrue(parser.recognize('a'))
+        self.assertFalse(parser.recognize(word[:-1]))
+        self.assertFalse(parser.recognize('ab'))
+
+    def test_symbol_table(self):
+        grammar = Grammar(['S', 'Long'], ['x'], {'S': [['Long', 'x']], 'Long': ['x', 'ε']})
+        self.assertEqual(grammar.rules, {'S': [('Long', 'x')], 'Long': [('x',), ()]})
+        self.assertEqual(grammar.symbols[grammar.ids['Long']], 'Long')
+        self.assertEqual(grammar.format_production(grammar._rules[grammar.ids['S']][0]), 'Long x')
+        self.assertEqual(grammar.format_production(()), 'ε')
+
+
+class TestEpsilonBlowup(unittest.TestCase):
+    MEMORY_LIMIT = 4 * 2 ** 20
+
+    def long_nullable_grammar(self, k):
+        # S -> N0 N1 ... N(k-1) with every Ni -> a | ε, so S derives a^1 .. a^k
+        names = [f'N{i}' for i in range(k)]
+        rules = {'S': [names]}
+        rules.update({name: ['a', 'ε'] for name in names})
+        return Grammar(['S'] + names, ['a'], rules)
+
+    def peak_memory(self, run):
+        tracemalloc.start()
+        try:
+            run()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_binarize_first_keeps_thirty_nullable_symbols_small(self):
+        grammar = self.long_nullable_grammar(30)
+        peak = self.peak_memory(lambda: grammar.to_cnf(binarize_first=True))
+        self.assertLess(peak, self.MEMORY_LIMIT)
+        self.assertTrue(grammar.is_cnf())
+        parser = CYKParser(grammar)
+        self.assertEqual(parser.recognize_many(['a' * n for n in range(1, 33)]), [True] * 30 + [False] * 2)
+
+    def test_variants_stream_without_materializing(self):
+        grammar = self.long_nullable_grammar(30)
+        prod = grammar._rules[grammar.ids['S']][0]
+        nullable = grammar._nullable()
+        peak = self.peak_memory(lambda: sum(1 for _ in itertools.islice(grammar._epsilon_variants(prod, nullable), 10_000)))
+        self.assertLess(peak, self.MEMORY_LIMIT)
+
+    def test_runs_of_equal_symbols_are_not_duplicated(self):
+        grammar = Grammar(['S', 'A'], ['a'], {'S': ['AAAA'], 'A': ['a', 'ε']})
+        variants = list(grammar._epsilon_variants(grammar._rules[grammar.ids['S']][0], grammar._nullable()))
+        self.assertEqual(len(variants), len(set(variants)))
+        self.assertEqual(len(variants), 4)
+
+    def test_binarize_first_preserves_language(self):
+        words = [''.join(letters) for length in range(1, 7) for letters in itertools.product('abc', repeat=length)]
+        for seed in range(8):
+            default = random_grammar(6, 30, seed)
+            binarized = random_grammar(6, 30, seed)
+            default.to_cnf()
+            binarized.to_cnf(binarize_first=True)
+            self.assertTrue(binarized.is_cnf())
+            self.assertEqual(CYKParser(binarized).recognize_many(words), CYKParser(default).recognize_many(words))
+
+
+class TestConversionReport(unittest.TestCase):
+    def test_passes_chain_sizes(self):
+        grammar = random_grammar(30, 120, seed=1)
+        report = grammar.to_cnf(report=ConversionReport())
+        self.assertEqual([entry['pass'] for entry in report.passes],
+                         ['epsilon', 'renaming', 'inaccessible', 'non_productive', 'replace_terminals', 'binarize'])
+        for previous, entry in zip(report.passes, report.passes[1:]):
+            self.assertEqual(previous['after'], entry['before'])
+        self.assertEqual(report.passes[-1]['after'], grammar.size_stats())
+        self.assertTrue(all(entry['seconds'] >= 0 and entry['memory_peak'] >= 0 for entry in report.passes))
+
+    def test_binarize_first_pass_and_no_memory(self):
+        report = random_grammar(10, 40).to_cnf(binarize_first=True, report=ConversionReport(trace_memory=False))
+        self.assertEqual(report.passes[0]['pass'], 'binarize_first')
+        self.assertNotIn('memory_delta', report.passes[0])
+
+    def test_aggregate_and_json(self):
+        reports = [random_grammar(20, 80, seed).to_cnf(report=ConversionReport()) for seed in range(3)]
+        total = ConversionReport.aggregate(reports)
+        self.assertEqual(total.conversions, 3)
+        epsilon = total.passes[0]
+        self.assertEqual(epsilon['before']['productions'], sum(r.passes[0]['before']['productions'] for r in reports))
+        self.assertAlmostEqual(epsilon['seconds'], sum(r.passes[0]['seconds'] for r in reports))
+        data = json.loads(total.to_json())
+        self.assertEqual(data['conversions'], 3)
+        self.assertEqual(len(data['passes']), 6)
+        self.assertIn('average_length', data['passes'][0]['after'])
+        self.assertEqual(len(total.format_table().splitlines()), 7)
+
+
+class TestTableCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = TableCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cached_conversion_matches_fresh_one(self):
+        expected = random_grammar(40, 160, seed=2)
+        expected.to_cnf()
+        for _ in range(2):
+            grammar = random_grammar(40, 160, seed=2)
+            grammar.to_cnf(cache=self.cache)
+            self.assertEqual(grammar.rules, expected.rules)
+            self.assertEqual(grammar.non_terminals, expected.non_terminals)
+            self.assertEqual(grammar.terminals, expected.terminals)
+            self.assertTrue(grammar.is_cnf())
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'entries': 1})
+
+        # Fresh names continue after a cached conversion exactly as after a computed one
+        self.assertEqual(grammar.symbols[grammar._create_new_non_terminal()],
+                         expected.symbols[expected._create_new_non_terminal()])
+
+    def test_key_covers_grammar_and_options(self):
+        random_grammar(20, 80, seed=3).to_cnf(cache=self.cache)
+        random_grammar(20, 80, seed=3).to_cnf(binarize_first=True, cache=self.cache)
+        random_grammar(20, 80, seed=4).to_cnf(cache=self.cache)
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 3, 'entries': 3})
+
+    def test_report_records_cache_load(self):
+        random_grammar(20, 80, seed=5).to_cnf(cache=self.cache)
+        grammar = random_grammar(20, 80, seed=5)
+        report = grammar.to_cnf(report=ConversionReport(trace_memory=False), cache=self.cache)
+        self.assertEqual([entry['pass'] for entry in report.passes], ['cache_load'])
+        self.assertEqual(report.passes[0]['after'], grammar.size_stats())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,124 @@
+import itertools
+import random
+import unittest
+
+from ChomskyNormalForm import Grammar
+from cyk import CYKParser
+
+
+def sample_grammar():
+    # The grammar from test_chomsky.py
+    non_terminals = ['S', 'A', 'B', 'C', 'D']
+    terminals = ['a', 'b']
+    rules = {
+        'S': ['aB', 'bA', 'B'],
+        'A': ['b', 'aD', 'AS', 'bAB', 'ε'],
+        'B': ['a', 'bS'],
+        'C': ['AB'],
+        'D': ['BB']
+    }
+    return Grammar(non_terminals, terminals, rules)
+
+
+def naive_chart(grammar, string):
+    # Set-based CYK straight from the textbook, used as the reference
+    n = len(string)
+    rules = grammar.rules
+    table = {}
+    for i, char in enumerate(string):
+        table[i, 1] = {nt for nt, prods in rules.items() if (char,) in prods}
+    for length in range(2, n + 1):
+        for i in range(n - length + 1):
+            cell = set()
+            for split in range(1, length):
+                for nt, prods in rules.items():
+                    for prod in prods:
+                        if len(prod) == 2 and prod[0] in table[i, split] and prod[1] in table[i + split, length - split]:
+                            cell.add(nt)
+            table[i, length] = cell
+    return table
+
+
+def naive_cyk(grammar, string):
+    return grammar.start_symbol in naive_chart(grammar, string)[0, len(string)]
+
+
+def random_derivation(grammar, rng, max_steps=40):
+    # Leftmost derivation in the original grammar
+    form = [grammar.start_symbol]
+    for _ in range(max_steps):
+        positions = [i for i, symbol in enumerate(form) if symbol in grammar.non_terminals]
+        if not positions:
+            return ''.join(form)
+        i = positions[0]
+        form[i:i + 1] = rng.choice(grammar.rules[form[i]])
+    return None
+
+
+class TestCYKParser(unittest.TestCase):
+    def setUp(self):
+        self.original = sample_grammar()
+        self.grammar = sample_grammar()
+        self.grammar.to_cnf()
+        self.parser = CYKParser(self.grammar)
+        self.words = [''.join(letters) for length in range(1, 9) for letters in itertools.product('ab', repeat=length)]
+
+    def test_requires_cnf(self):
+        with self.assertRaises(ValueError):
+            CYKParser(sample_grammar())
+
+    def test_recognize_agrees_with_naive_cyk(self):
+        expected = [naive_cyk(self.grammar, word) for word in self.words]
+        self.assertEqual([self.parser.recognize(word) for word in self.words], expected)
+        self.assertEqual(self.parser.recognize_many(self.words), expected)
+
+    def test_derivations_of_the_original_grammar_are_recognized(self):
+        rng = random.Random(5)
+        derived = [random_derivation(self.original, rng) for _ in range(300)]
+        derived = [word for word in derived if word]
+        self.assertTrue(derived)
+        self.assertTrue(all(self.parser.recognize_many(derived)))
+
+    def test_recognize_many_mixed_lengths(self):
+        rng = random.Random(6)
+        strings = [''.join(rng.choice('ab') for _ in range(rng.randint(0, 30))) for _ in range(200)]
+        self.assertEqual(self.parser.recognize_many(strings), [self.parser.recognize(s) for s in strings])
+
+    def test_cell_matches_naive_chart(self):
+        for word in ('abbaab', 'babab', 'aabba'):
+            chart = self.parser.chart(word)
+            expected = naive_chart(self.grammar, word)
+            for (start, length), cell in expected.items():
+                mask = self.parser.cell(chart, start, length)
+                self.assertEqual({self.parser.symbols[i] for i in range(len(self.parser.symbols)) if mask >> i & 1}, cell)
+
+    def test_parse_forest_and_tree(self):
+        for word in self.words:
+            forest = self.parser.parse_forest(word)
+            tree = self.parser.parse_tree(word)
+            if not self.parser.recognize(word):
+                self.assertIsNone(forest)
+                self.assertIsNone(tree)
+                continue
+            self.assertTrue(all(forest.values()))
+            self.assertEqual(self._leaves(tree), word)
+            self.assertEqual(tree[0], self.grammar.start_symbol)
+
+    def test_long_derivation_tree(self):
+        word = 'b' * 1100
+        self.assertEqual(self._leaves(self.parser.parse_tree(word)), word)
+
+    def _leaves(self, tree):
+        leaves = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if len(node) == 2 and isinstance(node[1], str):
+                leaves.append(node[1])
+            else:
+                stack.extend(reversed(node[1:]))
+        return ''.join(leaves)
+
+
+if __name__ == '__main__':
+    unittest.main()
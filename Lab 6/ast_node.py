@@ -1,9 +1,15 @@
 class ASTNode:
+    __slots__ = ('kind', 'value', 'children')
+
     def __init__(self, kind, value=None, children=None):
         self.kind = kind
         self.value = value
         self.children = children or []
 
+    def __reduce__(self):
+        # Compact pickling for trees sent back from worker processes
+        return ASTNode, (self.kind, self.value, self.children)
+
     def add_child(self, node):
         self.children.append(node)
 
@@ -0,0 +1,454 @@
+import contextlib
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from operator import itemgetter
+
+import numpy as np
+
+from ast_node import ASTNode
+from executor import Executor, Table
+from external_sort import external_sort, row_size
+from incremental import IncrementalDocument
+from parallel import parse_parallel
+from lexer import Lexer, Token
+from ll1 import sql_parser
+from parser import Parser
+from statement_cache import StatementCache
+from token_type import TokenType
+
+
+def random_statement(rng):
+    columns = ', '.join(f"col{rng.randint(1, 50)}" for _ in range(rng.randint(1, 5)))
+    statement = f"SELECT {columns} FROM table{rng.randint(1, 20)}"
+    if rng.random() < 0.7:
+        statement += f" WHERE col{rng.randint(1, 50)} {rng.choice(['==', '>=', '<=', '<>', '>', '<'])} {rng.randint(0, 1000)}"
+    if rng.random() < 0.5:
+        statement += f" ORDER_BY col{rng.randint(1, 50)}"
+    return statement + ';'
+
+
+def generate_sql(n_statements, seed=0):
+    rng = random.Random(seed)
+    return '\n'.join(random_statement(rng) for _ in range(n_statements)) + '\n'
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# --- Streaming lexer (iter_tokens) vs. printing tokenize() ---
+
+def _streaming_child(mode, path):
+    start = time.perf_counter()
+    if mode == 'tokenize':
+        with open(path) as f:
+            code = f.read()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            tokens = Lexer(code).tokenize()
+        count = len(tokens)
+        statements = len(Parser(tokens).parse())
+    else:
+        with open(path) as f:
+            lexer = Lexer(f)
+            count = 0
+
+            def counted():
+                nonlocal count
+                for token in lexer.iter_tokens():
+                    count += 1
+                    yield token
+
+            statements = sum(1 for _ in Parser(counted()).iter_parse())
+    elapsed = time.perf_counter() - start
+    print(count, statements, elapsed, peak_rss_kb())
+
+
+def bench_streaming(n_statements=300_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.sql')
+        with open(path, 'w') as f:
+            f.write(generate_sql(n_statements))
+        size_mb = os.path.getsize(path) / 2 ** 20
+        print(f"Streaming benchmark: {n_statements} statements, {size_mb:.1f} MiB")
+        print(f"{'mode':<12} {'tokens':>10} {'tokens/s':>12} {'peak RSS':>12}")
+        for mode in ('tokenize', 'iter_tokens'):
+            # Each mode runs in a fresh process so that peak RSS is not shared
+            out = subprocess.run([sys.executable, __file__, '--child', 'streaming', mode, path],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            count, _, elapsed, rss = int(out[0]), int(out[1]), float(out[2]), int(out[3])
+            print(f"{mode:<12} {count:>10} {count / elapsed:>12.0f} {rss / 1024:>9.1f} MiB")
+
+
+# --- Shared compiled lexer spec vs. per-call setup ---
+
+def _legacy_tokenize(code):
+    # The lexer as it was before the spec was hoisted to module level, minus the printing
+    keywords = {"SELECT", "FROM", "WHERE", "ORDER_BY"}
+    token_specification = [
+        ('NUMBER', r'\d+(\.\d*)?'),
+        ('ALL', r'\*'),
+        ('COMPARATOR', r'(==|>=|<=|<>|>|<)'),
+        ('COMMA', r','),
+        ('END', r';'),
+        ('ID', r'[a-zA-Z][a-zA-Z_$0-9]*'),
+        ('NEWLINE', r'\n'),
+        ('SKIP', r'[ \t]+'),
+        ('MISMATCH', r'.'),
+    ]
+    tok_regex = '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in token_specification)
+    line_num = 1
+    line_start = 0
+    tokens = []
+    for mo in re.finditer(tok_regex, code):
+        kind = mo.lastgroup
+        value = mo.group()
+        column = mo.start() - line_start
+        if kind == 'NUMBER':
+            value = float(value) if '.' in value else int(value)
+            kind_enum = TokenType.NUMBER
+        elif kind == 'ID':
+            kind_enum = TokenType[value] if value in keywords else TokenType.ID
+        elif kind == 'ALL':
+            kind_enum = TokenType.ALL
+        elif kind == 'COMPARATOR':
+            kind_enum = TokenType.COMPARATOR
+        elif kind == 'COMMA':
+            kind_enum = TokenType.COMMA
+        elif kind == 'END':
+            kind_enum = TokenType.END
+        elif kind == 'NEWLINE':
+            line_start = mo.end()
+            line_num += 1
+            continue
+        elif kind == 'SKIP':
+            continue
+        else:
+            raise RuntimeError(f'{value!r} unexpected on line {line_num}')
+        tokens.append(Token(kind_enum, value, line_num, column))
+    return tokens
+
+
+def bench_small_statements(n_statements=20_000):
+    rng = random.Random(1)
+    statements = [random_statement(rng) for _ in range(n_statements)]
+    print(f"Small statement benchmark: {n_statements} statements, one Lexer each")
+    runs = [
+        ('per-call spec', _legacy_tokenize),
+        ('compiled spec', lambda code: list(Lexer(code).iter_tokens())),
+    ]
+    for name, tokenize in runs:
+        start = time.perf_counter()
+        for statement in statements:
+            tokenize(statement)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14} {elapsed / n_statements * 1e6:8.2f} us/statement")
+
+
+# --- Memory footprint of tokens and AST nodes ---
+
+class _DictToken:
+    def __init__(self, kind, value, line, column):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self.column = column
+
+
+class _DictASTNode:
+    def __init__(self, kind, value=None, children=None):
+        self.kind = kind
+        self.value = value
+        self.children = children or []
+
+
+def _traced(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def _copy_tree(node, node_class):
+    return node_class(node.kind, node.value, [_copy_tree(child, node_class) for child in node.children])
+
+
+def bench_memory(n_tokens=1_000_000):
+    # ~12.8 tokens per generated statement
+    code = generate_sql(n_tokens * 10 // 128)
+    tokens = list(Lexer(code).iter_tokens())
+    print(f"Memory benchmark: {len(tokens)} tokens")
+    runs = [
+        ('dict Token list', lambda: [_DictToken(t.kind, t.value, t.line, t.column) for t in tokens]),
+        ('slots Token list', lambda: [Token(t.kind, t.value, t.line, t.column) for t in tokens]),
+        ('TokenBuffer', lambda: Lexer(code).to_buffer()),
+    ]
+    for name, build in runs:
+        result, size = _traced(build)
+        print(f"{name:<18} {size / 2 ** 20:8.1f} MiB  {size / len(tokens):6.1f} B/token")
+        del result
+
+    asts = Parser(tokens).parse()
+    del tokens
+    nodes = sum(1 for _ in _walk_all(asts))
+    for name, node_class in (('dict ASTNode', _DictASTNode), ('slots ASTNode', ASTNode)):
+        result, size = _traced(lambda: [_copy_tree(ast, node_class) for ast in asts])
+        print(f"{name:<18} {size / 2 ** 20:8.1f} MiB  {size / nodes:6.1f} B/node")
+        del result
+
+
+def _walk_all(asts):
+    stack = list(asts)
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+
+# --- Incremental re-lexing/re-parsing per keystroke ---
+
+def bench_incremental(n_statements=10_000, n_edits=200):
+    code = generate_sql(n_statements)
+    rng = random.Random(2)
+    spaces = [i for i, char in enumerate(code) if char == ' ']
+    # Insert next to existing spaces; offsets are ascending and each earlier insertion shifts them by one
+    offsets = [offset + shift for shift, offset in enumerate(sorted(rng.sample(spaces, n_edits)))]
+    print(f"Incremental benchmark: {n_statements} statements, {n_edits} single-space insertions")
+
+    full_code = code
+    start = time.perf_counter()
+    for offset in offsets[:20]:
+        full_code = full_code[:offset] + ' ' + full_code[offset:]
+        Parser(list(Lexer(full_code).iter_tokens())).parse()
+    full = (time.perf_counter() - start) / 20
+
+    document = IncrementalDocument(code)
+    start = time.perf_counter()
+    for offset in offsets:
+        document.edit(offset, 0, ' ')
+    incremental = (time.perf_counter() - start) / n_edits
+    print(f"{'full reparse':<14} {full * 1e3:8.2f} ms/edit")
+    print(f"{'incremental':<14} {incremental * 1e3:8.2f} ms/edit ({full / incremental:.0f}x)")
+
+
+# --- Process pool scaling ---
+
+def bench_parallel(n_statements=50_000):
+    code = generate_sql(n_statements)
+    print(f"Parallel benchmark: {n_statements} statements, {len(code) / 2 ** 20:.1f} MiB, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in (1, 2, 4, 8):
+        start = time.perf_counter()
+        parse_parallel(code, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers} workers {elapsed:8.2f} s  speedup {baseline / elapsed:5.2f}x")
+
+    small = generate_sql(100)
+    for workers, threshold in ((1, None), (4, 0)):
+        start = time.perf_counter()
+        for _ in range(5):
+            if threshold is None:
+                parse_parallel(small, workers=workers)
+            else:
+                parse_parallel(small, workers=workers, serial_threshold=threshold)
+        elapsed = (time.perf_counter() - start) / 5
+        print(f"100 statements, {'serial fallback' if threshold is None else 'forced pool':<15} {elapsed * 1e3:8.2f} ms")
+
+
+# --- Columnar executor vs. row-at-a-time interpreter ---
+
+_ROW_COMPARISONS = {
+    '==': lambda a, b: a == b, '<>': lambda a, b: a != b, '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b, '>': lambda a, b: a > b, '<': lambda a, b: a < b,
+}
+
+
+def _row_execute(names, rows, ast):
+    # Walks a list of row tuples, the way a straightforward interpreter of the AST would
+    clauses = {child.kind: child for child in ast.children}
+    position = {name: i for i, name in enumerate(names)}
+    if 'WHERE' in clauses:
+        operands = {child.kind: child.value for child in clauses['WHERE'].children}
+        compare = _ROW_COMPARISONS[operands['OP']]
+        left, right = operands['LEFT'], operands['RIGHT']
+        rows = [row for row in rows
+                if compare(row[position[left]] if isinstance(left, str) else left,
+                           row[position[right]] if isinstance(right, str) else right)]
+    if 'ORDER_BY' in clauses:
+        key = position[clauses['ORDER_BY'].value]
+        rows = sorted(rows, key=lambda row: row[key])
+    selected = [position[child.value] for child in clauses['COLUMN_LIST'].children if child.kind == 'COLUMN']
+    selected = selected or list(range(len(names)))
+    return [tuple(row[i] for i in selected) for row in rows]
+
+
+EXECUTE_QUERIES = [
+    "SELECT * FROM events;",
+    "SELECT id, value FROM events WHERE value > 900;",
+    "SELECT id FROM events WHERE price <= value;",
+    "SELECT id, user FROM events WHERE user == 42 ORDER_BY value;",
+    "SELECT id, price FROM events WHERE value < 500 ORDER_BY price;",
+]
+
+
+def bench_execute(sizes=(1_000_000, 10_000_000), row_limit=1_000_000, csv_rows=1_000_000):
+    print(f"{'rows':>10}  {'query':<62} {'columnar':>10} {'row-at-a-time':>14} {'result rows':>12}")
+    asts = [Parser(Lexer(sql).iter_tokens()).select_statement() for sql in EXECUTE_QUERIES]
+    for num_rows in sizes:
+        rng = np.random.default_rng(0)
+        table = Table('events', {
+            'id': np.arange(num_rows),
+            'user': rng.integers(0, 10_000, num_rows),
+            'value': rng.integers(0, 1000, num_rows),
+            'price': rng.random(num_rows) * 1000,
+        })
+        executor = Executor([table])
+        rows = list(table.rows()) if num_rows <= row_limit else None
+        for sql, ast in zip(EXECUTE_QUERIES, asts):
+            start = time.perf_counter()
+            result = executor.execute(ast)
+            columnar = time.perf_counter() - start
+            row_time = '-'
+            if rows is not None:
+                start = time.perf_counter()
+                _row_execute(table.names, rows, ast)
+                row_time = f"{time.perf_counter() - start:.3f}s"
+            print(f"{num_rows:>10}  {sql:<62} {columnar:>9.3f}s {row_time:>14} {len(result):>12}")
+        del rows
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.csv')
+        rng = np.random.default_rng(1)
+        data = np.column_stack([np.arange(csv_rows), rng.integers(0, 1000, (csv_rows, 2))])
+        np.savetxt(path, data, fmt='%d', delimiter=',', header='id,user,value', comments='')
+        start = time.perf_counter()
+        Table.from_csv(path, name='events')
+        elapsed = time.perf_counter() - start
+        print(f"Table.from_csv: {csv_rows} rows in {elapsed:.2f} s ({csv_rows / elapsed:.0f} rows/s)")
+
+
+# --- External sort and top-k for ORDER_BY ---
+
+def _sort_rows(count, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield rng.randrange(1_000_000), i, rng.random()
+
+
+def bench_external_sort(count=2_000_000, memory_limit=16 * 2 ** 20, top=100):
+    input_size = count * row_size(next(_sort_rows(1)))
+    print(f"External sort: {count} rows, ~{input_size / 2 ** 20:.0f} MiB of tuples, "
+          f"budget {memory_limit / 2 ** 20:.0f} MiB ({input_size / memory_limit:.1f}x)")
+    print(f"{'mode':<22} {'rows/s':>12} {'peak RSS':>12}")
+    for mode in ('sorted', 'external_sort', 'top_k'):
+        # Each mode runs in a fresh process so that peak RSS is not shared
+        out = subprocess.run([sys.executable, __file__, '--child', 'external_sort', mode, str(count),
+                              str(memory_limit), str(top)], capture_output=True, text=True, check=True).stdout.split()
+        elapsed, rss = float(out[0]), int(out[1])
+        label = f'top-{top}' if mode == 'top_k' else mode
+        print(f"{label:<22} {count / elapsed:>12.0f} {rss / 1024:>9.1f} MiB")
+
+
+def _external_sort_child(mode, count, memory_limit, top):
+    count, memory_limit, top = int(count), int(memory_limit), int(top)
+    key = itemgetter(0)
+    start = time.perf_counter()
+    if mode == 'sorted':
+        result = sorted(_sort_rows(count), key=key)
+    else:
+        result = external_sort(_sort_rows(count), key, memory_limit, limit=top if mode == 'top_k' else None)
+    previous = None
+    for row in result:
+        assert previous is None or previous <= row[0]
+        previous = row[0]
+    print(time.perf_counter() - start, peak_rss_kb())
+
+# --- Fingerprint cache for repeated query shapes ---
+
+def replay_log(n_statements, n_shapes=30, seed=0):
+    # A log dominated by a few query shapes (Zipf-like weights) with fresh literals on every line
+    rng = random.Random(seed)
+    shapes = []
+    for _ in range(n_shapes):
+        columns = rng.randint(1, 5)
+        where = rng.choice([None, '==', '>=', '<=', '<>', '>', '<'])
+        shapes.append((columns, where, rng.random() < 0.5))
+    weights = [1 / (rank + 1) for rank in range(n_shapes)]
+    log = []
+    for columns, where, order_by in rng.choices(shapes, weights, k=n_statements):
+        statement = f"SELECT {', '.join(f'col{rng.randint(1, 50)}' for _ in range(columns))} FROM table{rng.randint(1, 20)}"
+        if where:
+            statement += f" WHERE col{rng.randint(1, 50)} {where} {rng.randint(0, 1000)}"
+        if order_by:
+            statement += f" ORDER_BY col{rng.randint(1, 50)}"
+        log.append(statement + ';')
+    return log
+
+
+def bench_statement_cache(n_statements=300_000):
+    log = replay_log(n_statements)
+    print(f"Statement cache benchmark: {n_statements} statements, 30 shapes")
+    start = time.perf_counter()
+    for sql in log:
+        Parser(Lexer(sql).iter_tokens()).parse()
+    baseline = time.perf_counter() - start
+    print(f"{'lexer + parser':<20} {baseline / n_statements * 1e6:8.2f} us/statement")
+    for cache_size in (8, 1024):
+        cache = StatementCache(cache_size)
+        start = time.perf_counter()
+        for sql in log:
+            cache.parse(sql)
+        elapsed = time.perf_counter() - start
+        stats = cache.cache_stats()
+        print(f"{f'cache ({cache_size})':<20} {elapsed / n_statements * 1e6:8.2f} us/statement "
+              f"({baseline / elapsed:.2f}x), hit rate {stats['hit_rate']:.1%}, {stats['evictions']} evictions")
+
+
+# --- Generated LL(1) parser vs. hand-written recursive descent ---
+
+def bench_ll1(n_statements=100_000, repeats=3):
+    tokens = list(Lexer(generate_sql(n_statements)).iter_tokens())
+    start = time.perf_counter()
+    generated = sql_parser()
+    print(f"LL(1) benchmark: {n_statements} statements, {len(tokens)} tokens; "
+          f"table built in {(time.perf_counter() - start) * 1e3:.2f} ms")
+    for name, parse in (('recursive descent', lambda: Parser(tokens).parse()), ('LL(1) table', lambda: generated.parse(tokens))):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            parse()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<18} {best:8.3f} s  {len(tokens) / best:12.0f} tokens/s")
+
+
+BENCHMARKS = {
+    'streaming': bench_streaming,
+    'small_statements': bench_small_statements,
+    'memory': bench_memory,
+    'incremental': bench_incremental,
+    'parallel': bench_parallel,
+    'execute': bench_execute,
+    'external_sort': bench_external_sort,
+    'statement_cache': bench_statement_cache,
+    'll1': bench_ll1,
+}
+
+CHILDREN = {
+    'streaming': _streaming_child,
+    'external_sort': _external_sort_child,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        CHILDREN[sys.argv[2]](*sys.argv[3:])
+    else:
+        for name in sys.argv[1:] or BENCHMARKS:
+            BENCHMARKS[name]()
@@ -0,0 +1,204 @@
+import csv
+import operator
+from itertools import islice
+
+import numpy as np
+
+from external_sort import DEFAULT_MEMORY_LIMIT, external_sort
+from lexer import Lexer
+from parser import Parser
+
+COMPARISONS = {
+    '==': np.equal,
+    '<>': np.not_equal,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '<': np.less,
+}
+ROW_COMPARISONS = {
+    '==': operator.eq,
+    '<>': operator.ne,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+
+
+class Table:
+    """A named table stored column by column, one NumPy array per column, all of the same length."""
+
+    def __init__(self, name, columns):
+        # `columns` is a dict or a list of (name, values) pairs; the order is kept for SELECT *
+        self.name = name
+        self.names = []
+        self.columns = []
+        for column, values in (columns.items() if isinstance(columns, dict) else columns):
+            self.names.append(column)
+            self.columns.append(np.asarray(values))
+        self.index = {column: i for i, column in enumerate(self.names)}
+        lengths = {len(values) for values in self.columns}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns of table {name!r} have different lengths")
+        self.num_rows = lengths.pop() if lengths else 0
+
+    def __len__(self):
+        return self.num_rows
+
+    def column(self, name):
+        i = self.index.get(name)
+        if i is None:
+            raise ValueError(f"Table {self.name!r} has no column {name!r}")
+        return self.columns[i]
+
+    def rows(self):
+        return zip(*(values.tolist() for values in self.columns)) if self.columns else iter(())
+
+    @classmethod
+    def from_csv(cls, source, name=None):
+        # `source` is a path or a file object with a header row; each column becomes int64, float64 or str
+        if hasattr(source, 'read'):
+            return cls._read_csv(source, name)
+        with open(source, newline='') as file:
+            return cls._read_csv(file, name)
+
+    @classmethod
+    def _read_csv(cls, file, name):
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("CSV input has no header row")
+        values = [[] for _ in header]
+        for line, row in enumerate(reader, start=2):
+            if len(row) != len(header):
+                raise ValueError(f"CSV row on line {line} has {len(row)} fields, expected {len(header)}")
+            for column, field in zip(values, row):
+                column.append(field)
+        return cls(name, [(column, _typed(fields)) for column, fields in zip(header, values)])
+
+
+def _typed(fields):
+    for dtype in (np.int64, np.float64):
+        try:
+            return np.array(fields, dtype=dtype)
+        except ValueError:
+            pass
+    return np.array(fields, dtype=str)
+
+
+class Executor:
+    """
+    Runs SELECT_STATEMENT ASTs from parser.Parser against in-memory columnar tables.
+
+    The WHERE comparison is evaluated as one NumPy boolean mask over whole columns and ORDER_BY as
+    a stable argsort of the surviving rows, so no Python code runs per row. Only the selected columns
+    are gathered; without WHERE and ORDER_BY the result shares the table's arrays.
+    """
+
+    def __init__(self, tables=()):
+        self.tables = {}
+        for table in tables:
+            self.add_table(table)
+
+    def add_table(self, table):
+        self.tables[table.name] = table
+
+    def query(self, sql):
+        return [self.execute(ast) for ast in Parser(Lexer(sql).iter_tokens()).iter_parse()]
+
+    def execute(self, ast):
+        if ast.kind != 'SELECT_STATEMENT':
+            raise ValueError(f"Can only execute SELECT_STATEMENT nodes, got {ast.kind}")
+        clauses = {child.kind: child for child in ast.children}
+        table = self.tables.get(clauses['FROM'].value)
+        if table is None:
+            raise ValueError(f"Unknown table {clauses['FROM'].value!r}")
+
+        names = [child.value for child in clauses['COLUMN_LIST'].children if child.kind == 'COLUMN']
+        if not names:
+            names = list(table.names)  # SELECT * (or an empty column list)
+        columns = [table.column(name) for name in names]
+
+        rows = None  # row indices to gather, None for every row in table order
+        if 'WHERE' in clauses:
+            mask = self._where_mask(table, clauses['WHERE'])
+            rows = np.flatnonzero(mask)
+        if 'ORDER_BY' in clauses:
+            key = table.column(clauses['ORDER_BY'].value)
+            if rows is None:
+                rows = np.argsort(key, kind='stable')
+            else:
+                rows = rows[np.argsort(key[rows], kind='stable')]
+        if rows is not None:
+            columns = [values[rows] for values in columns]
+        return Table(table.name, list(zip(names, columns)))
+
+    def _where_mask(self, table, where):
+        operands = {child.kind: child.value for child in where.children}
+        compare = COMPARISONS[operands['OP']]
+        left = self._operand(table, operands['LEFT'])
+        right = self._operand(table, operands['RIGHT'])
+        mask = compare(left, right)
+        if np.ndim(mask) == 0:
+            # Both sides are literals, e.g. WHERE 1 == 1
+            return np.full(len(table), bool(mask))
+        return mask
+
+    def _operand(self, table, value):
+        # ID tokens name columns, NUMBER tokens are literals
+        return table.column(value) if isinstance(value, str) else value
+
+
+def select_rows(ast, names, rows, memory_limit=DEFAULT_MEMORY_LIMIT, limit=None, directory=None):
+    """
+    Runs a SELECT_STATEMENT over a stream of row tuples with columns `names`, yielding result rows.
+
+    For tables that do not fit in memory: WHERE and the projection are applied row by row, and ORDER_BY
+    goes through external_sort with `memory_limit`, spilling to `directory`. A known `limit` lets
+    ORDER_BY keep only the first rows in a heap.
+    """
+    clauses = {child.kind: child for child in ast.children}
+    position = {name: i for i, name in enumerate(names)}
+
+    def column(name):
+        i = position.get(name)
+        if i is None:
+            raise ValueError(f"Table {clauses['FROM'].value!r} has no column {name!r}")
+        return i
+
+    selected = [column(child.value) for child in clauses['COLUMN_LIST'].children if child.kind == 'COLUMN']
+    if 'WHERE' in clauses:
+        operands = {child.kind: child.value for child in clauses['WHERE'].children}
+        compare = ROW_COMPARISONS[operands['OP']]
+        left, right = operands['LEFT'], operands['RIGHT']
+        if isinstance(left, str) and isinstance(right, str):
+            i, j = column(left), column(right)
+            rows = (row for row in rows if compare(row[i], row[j]))
+        elif isinstance(left, str):
+            i = column(left)
+            rows = (row for row in rows if compare(row[i], right))
+        elif isinstance(right, str):
+            j = column(right)
+            rows = (row for row in rows if compare(left, row[j]))
+        elif not compare(left, right):
+            rows = iter(())
+
+    if 'ORDER_BY' in clauses:
+        key = column(clauses['ORDER_BY'].value)
+        if selected:
+            # Sort only the selected columns, with the sort column appended when it is not one of them
+            extra = key not in selected
+            width = len(selected)
+            projection = selected + [key] if extra else selected
+            rows = (tuple(row[i] for i in projection) for row in rows)
+            rows = external_sort(rows, operator.itemgetter(width if extra else selected.index(key)),
+                                 memory_limit, limit, directory)
+            return (row[:width] for row in rows) if extra else rows
+        return external_sort(rows, operator.itemgetter(key), memory_limit, limit, directory)
+
+    if limit is not None:
+        rows = islice(rows, limit)
+    if selected:
+        return (tuple(row[i] for i in selected) for row in rows)
+    return iter(rows)
@@ -0,0 +1,183 @@
+import heapq
+import os
+import struct
+import sys
+import tempfile
+from itertools import chain, islice
+
+DEFAULT_MEMORY_LIMIT = 64 * 2 ** 20
+BLOCK_SIZE = 64 * 1024  # read size per run while merging, lowered to fit small memory limits
+FAN_IN = 64             # runs merged at once; more runs are merged in several passes
+
+_FIELD_FORMATS = {int: 'q', float: 'd', str: 'I'}  # str fields store their UTF-8 length, then the bytes
+
+
+def row_size(row):
+    # Rough bytes held by a buffered row tuple: the tuple, its values and a list slot
+    return sys.getsizeof(row) + sum(map(sys.getsizeof, row)) + 8
+
+
+class RunCodec:
+    """
+    Binary layout of one spilled run: a little-endian struct of int64/float64 fields per row, with str
+    fields stored as a uint32 UTF-8 length in the struct followed by the bytes. Runs without strings
+    are read back with Struct.iter_unpack over whole blocks.
+    """
+
+    def __init__(self, types):
+        self.types = types
+        self.struct = struct.Struct('<' + ''.join(_FIELD_FORMATS[kind] for kind in types))
+        self.strings = [i for i, kind in enumerate(types) if kind is str]
+
+    @classmethod
+    def for_rows(cls, rows):
+        # Every column must hold one of int, float or str in all rows of the run
+        types = [type(value) for value in rows[0]]
+        for i, kind in enumerate(types):
+            if kind not in _FIELD_FORMATS or any(type(row[i]) is not kind for row in rows):
+                raise TypeError(f"Column {i} must hold only int, float or str values to be spilled")
+        return cls(types)
+
+    def write(self, file, rows):
+        pack = self.struct.pack
+        if not self.strings:
+            file.write(b''.join(pack(*row) for row in rows))
+            return
+        parts = []
+        for row in rows:
+            encoded = {i: row[i].encode('utf-8') for i in self.strings}
+            fields = [len(encoded[i]) if i in encoded else value for i, value in enumerate(row)]
+            parts.append(pack(*fields))
+            parts.extend(encoded[i] for i in self.strings)
+        file.write(b''.join(parts))
+
+    def read(self, file, block_size=BLOCK_SIZE):
+        if not self.strings:
+            size = self.struct.size
+            block_size = max(1, block_size // size) * size
+            while True:
+                block = file.read(block_size)
+                if len(block) % size:
+                    raise ValueError("Truncated spill run")
+                if not block:
+                    return
+                yield from self.struct.iter_unpack(block)
+
+        head = self.struct
+        buffer, pos = b'', 0
+        while True:
+            block = file.read(block_size)
+            buffer, pos = buffer[pos:] + block, 0
+            while len(buffer) - pos >= head.size:
+                fields = list(head.unpack_from(buffer, pos))
+                end = pos + head.size + sum(fields[i] for i in self.strings)
+                if end > len(buffer):
+                    break
+                offset = pos + head.size
+                for i in self.strings:
+                    length = fields[i]
+                    fields[i] = buffer[offset:offset + length].decode('utf-8')
+                    offset += length
+                pos = end
+                yield tuple(fields)
+            if not block:
+                if pos != len(buffer):
+                    raise ValueError("Truncated spill run")
+                return
+
+
+def external_sort(rows, key=None, memory_limit=DEFAULT_MEMORY_LIMIT, limit=None, directory=None,
+                  fan_in=FAN_IN, block_size=BLOCK_SIZE):
+    """
+    Sorts an iterable of row tuples like sorted(rows, key=key) while buffering about `memory_limit`
+    bytes of rows; returns an iterator.
+
+    Buffered rows are sorted in runs, spilled to temporary files under `directory` and merged with
+    heapq.merge, in several passes when there are more than `fan_in` runs. The sort is stable. With a
+    `limit` whose rows fit in the budget, a heap keeps only the first `limit` rows and nothing is spilled.
+    """
+    if limit is not None and limit < 0:
+        raise ValueError("limit must be non-negative")
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None or limit == 0:
+        return iter(())
+    rows = chain((first,), rows)
+    if limit is not None and limit * row_size(first) <= memory_limit:
+        return iter(heapq.nsmallest(limit, rows, key=key))
+    merged = _sorted_runs(rows, key, memory_limit, directory, fan_in, block_size)
+    return merged if limit is None else islice(merged, limit)
+
+
+def _sorted_runs(rows, key, memory_limit, directory, fan_in, block_size):
+    buffer, used = [], 0
+    runs = []
+    with tempfile.TemporaryDirectory(dir=directory, prefix='sort-') as spill_dir:
+        for row in rows:
+            buffer.append(row)
+            used += row_size(row)
+            if used >= memory_limit:
+                buffer.sort(key=key)
+                runs.append(_spill(spill_dir, len(runs), buffer, runs[0][1].types if runs else None))
+                buffer, used = [], 0
+        buffer.sort(key=key)
+        if not runs:
+            # Everything fit in memory
+            yield from buffer
+            return
+        if buffer:
+            runs.append(_spill(spill_dir, len(runs), buffer, runs[0][1].types))
+        del buffer
+
+        # Consecutive runs are merged so equal keys keep their input order
+        count = len(runs)
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                group = runs[i:i + fan_in]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = os.path.join(spill_dir, f'run{count}.bin')
+                count += 1
+                codec = group[0][1]
+                with open(path, 'wb') as file:
+                    batch = []
+                    for row in _merge(group, key, _read_size(memory_limit, block_size, len(group))):
+                        batch.append(row)
+                        if len(batch) == 4096:
+                            codec.write(file, batch)
+                            batch = []
+                    codec.write(file, batch)
+                for run_path, _ in group:
+                    os.unlink(run_path)
+                merged.append((path, codec))
+            runs = merged
+        yield from _merge(runs, key, _read_size(memory_limit, block_size, len(runs)))
+
+
+def _read_size(memory_limit, block_size, runs):
+    # Keeps the read buffers of all merged runs within about half the memory limit
+    return max(4096, min(block_size, memory_limit // (2 * runs)))
+
+
+def _spill(spill_dir, number, rows, types=None):
+    codec = RunCodec.for_rows(rows)
+    if types is not None and codec.types != types:
+        raise TypeError(f"Spill run {number} has column types {codec.types}, earlier runs have {types}")
+    path = os.path.join(spill_dir, f'run{number}.bin')
+    with open(path, 'wb') as file:
+        codec.write(file, rows)
+    return path, codec
+
+
+def _merge(runs, key, read_size):
+    files = [open(path, 'rb', buffering=0) for path, _ in runs]
+    try:
+        readers = [codec.read(file, read_size) for file, (_, codec) in zip(files, runs)]
+        yield from heapq.merge(*readers, key=key)
+    finally:
+        for file in files:
+            file.close()
@@ -0,0 +1,126 @@
+from bisect import bisect_left
+
+from lexer import Lexer
+from parser import Parser
+from token_type import TokenType
+
+
+class IncrementalDocument:
+    """
+    Keeps the tokens and SELECT_STATEMENT ASTs of a SQL buffer up to date across text edits.
+
+    An edit re-lexes from the token before the damaged region until the new tokens line up with
+    the old ones again, and re-parses only the statements that touch re-lexed tokens; the ASTNode
+    objects of all other statements are reused. The document owns its tokens and shifts the
+    positions of the reused ones in place.
+    """
+
+    def __init__(self, code):
+        self.code = code
+        self._full_parse()
+
+    def _full_parse(self):
+        self.tokens = list(Lexer(self.code).iter_tokens())
+        self.asts, self.starts, self.stops = [], [], []
+        self._parse_from(0, self.asts, self.starts, self.stops)
+        self._stale = False
+
+    def _parse_from(self, index, asts, starts, stops, resync_at=None):
+        # Parses statements from token `index` onwards. With `resync_at` (new_stop, delta), stops at the
+        # first statement starting at or after `new_stop` that the previous parse also started at,
+        # and returns that old statement's number.
+        tokens = self.tokens
+        parser = Parser(tokens[i] for i in range(index, len(tokens)))
+        while parser.peek():
+            position = index + parser.current
+            if parser.peek().kind == TokenType.SELECT:
+                if resync_at is not None and position >= resync_at[0]:
+                    old_position = position - resync_at[1]
+                    old = bisect_left(self.starts, old_position)
+                    if old < len(self.starts) and self.starts[old] == old_position:
+                        return old
+                asts.append(parser.select_statement())
+                starts.append(position)
+                stops.append(index + parser.current)
+            else:
+                parser.advance()
+        return None
+
+    def edit(self, offset, deleted, inserted):
+        """Replaces `deleted` characters at `offset` with `inserted` and returns the updated AST list."""
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.code):
+            raise ValueError(f"Edit ({offset}, {deleted}) is outside the document")
+        self.code = self.code[:offset] + inserted + self.code[offset + deleted:]
+        if self._stale:
+            # The previous edit failed to lex or parse, so the tokens and statement spans can't be trusted
+            self._full_parse()
+            return self.asts
+
+        try:
+            first, old_stop, new_stop = self._relex(offset, deleted, len(inserted) - deleted)
+            self._reparse(first, old_stop, new_stop)
+        except RuntimeError:
+            self._stale = True
+            raise
+        return self.asts
+
+    def _relex(self, offset, deleted, delta):
+        tokens = self.tokens
+        # Tokens ending at the edit may merge with inserted text, so damage starts at the first of them
+        first = bisect_left(tokens, offset, key=lambda token: token.end)
+        if first:
+            previous = tokens[first - 1]
+            pos, line, line_start = previous.end, previous.line, previous.start - previous.column
+        else:
+            pos, line, line_start = 0, 1, 0
+
+        damaged_end = offset + deleted
+        new_tokens = []
+        old = first
+        resync = None
+        for token in Lexer(self.code).iter_tokens(pos, line, line_start):
+            while old < len(tokens) and (tokens[old].start < damaged_end or tokens[old].start + delta < token.start):
+                old += 1
+            if old < len(tokens) and tokens[old].start + delta == token.start:
+                # Lexing depends only on the text from a token's start, so the rest of the stream is unchanged
+                resync = token
+                break
+            new_tokens.append(token)
+
+        tokens[first:old] = new_tokens
+        new_stop = first + len(new_tokens)
+        if resync is not None:
+            self._shift(new_stop, resync, delta)
+        return first, old, new_stop
+
+    def _shift(self, index, resync, delta):
+        tokens = self.tokens
+        same_line = tokens[index].line
+        line_delta = resync.line - same_line
+        column_delta = resync.column - tokens[index].column
+        if not (delta or line_delta or column_delta):
+            return
+        for i in range(index, len(tokens)):
+            token = tokens[i]
+            if token.line == same_line:
+                token.column += column_delta
+            token.line += line_delta
+            token.start += delta
+            token.end += delta
+
+    def _reparse(self, first, old_stop, new_stop):
+        index_delta = new_stop - old_stop
+        # The statement that ends right at the damage may continue into it (the `;` is optional)
+        affected = bisect_left(self.stops, first)
+        restart = first
+        if affected < len(self.starts):
+            restart = min(restart, self.starts[affected])
+
+        asts, starts, stops = [], [], []
+        resync = self._parse_from(restart, asts, starts, stops, (new_stop, index_delta))
+        if resync is None:
+            resync = len(self.asts)
+
+        self.asts[affected:resync] = asts
+        self.starts[affected:] = starts + [start + index_delta for start in self.starts[resync:]]
+        self.stops[affected:] = stops + [stop + index_delta for stop in self.stops[resync:]]
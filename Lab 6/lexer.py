@@ -1,13 +1,58 @@
 import re
+from array import array
 from token_type import TokenType
 
+KEYWORDS = {"SELECT", "FROM", "WHERE", "ORDER_BY"}
+TOKEN_SPECIFICATION = [
+    ('NUMBER', r'\d+(\.\d*)?'),
+    ('ALL', r'\*'),
+    ('COMPARATOR', r'(==|>=|<=|<>|>|<)'),
+    ('COMMA', r','),
+    ('END', r';'),
+    ('ID', r'[a-zA-Z][a-zA-Z_$0-9]*'),
+    ('NEWLINE', r'\n'),
+    ('SKIP', r'[ \t]+'),
+    ('MISMATCH', r'.'),
+]
+# Compiled once at import and shared by every Lexer instance
+TOKEN_REGEX = re.compile('|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in TOKEN_SPECIFICATION))
+
+# Groups whose text is emitted unchanged as a token of a fixed type
+TOKEN_TYPES = {
+    'ALL': TokenType.ALL,
+    'COMPARATOR': TokenType.COMPARATOR,
+    'COMMA': TokenType.COMMA,
+    'END': TokenType.END,
+}
+KEYWORD_TYPES = {keyword: TokenType[keyword] for keyword in KEYWORDS}
+
+
+def _number(value):
+    return TokenType.NUMBER, float(value) if '.' in value else int(value)
+
+
+def _identifier(value):
+    return KEYWORD_TYPES.get(value, TokenType.ID), value
+
+
+# Groups whose token type or value depends on the matched text
+TOKEN_HANDLERS = {
+    'NUMBER': _number,
+    'ID': _identifier,
+}
+
 
 class Token:
-    def __init__(self, kind, value, line, column):
+    __slots__ = ('kind', 'value', 'line', 'column', 'start', 'end')
+
+    def __init__(self, kind, value, line, column, start=None, end=None):
         self.kind = kind
         self.value = value
         self.line = line
         self.column = column
+        # Absolute source offsets of the token text, when known
+        self.start = start
+        self.end = end
 
     def __repr__(self):
         return f"Token({self.kind}, {repr(self.value)}, line={self.line}, column={self.column})"
@@ -16,63 +61,128 @@ class Token:
         print(f"Token(type={self.kind}, value='{self.value}', line={self.line}, column={self.column})")
 
 
+TOKEN_KINDS = list(TokenType)
+KIND_CODES = {kind: code for code, kind in enumerate(TOKEN_KINDS)}
+
+
+class TokenBuffer:
+    """Columnar token storage: one small int and four unsigned ints per token, values sliced from the source."""
+
+    def __init__(self, source):
+        if not isinstance(source, str):
+            raise TypeError("TokenBuffer needs the source string to slice token values from")
+        self.source = source
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.columns = array('I')
+
+    def append(self, kind, start, end, line, column):
+        self.kinds.append(KIND_CODES[kind])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, index):
+        return TOKEN_KINDS[self.kinds[index]]
+
+    def value(self, index):
+        text = self.source[self.starts[index]:self.ends[index]]
+        if self.kinds[index] == KIND_CODES[TokenType.NUMBER]:
+            return float(text) if '.' in text else int(text)
+        return text
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        return Token(self.kind(index), self.value(index), self.lines[index], self.columns[index],
+                     self.starts[index], self.ends[index])
+
+    def __iter__(self):
+        # Tokens are materialized one at a time so Parser can run over the buffer without a token list
+        for index in range(len(self)):
+            yield self[index]
+
+
 class Lexer:
-    def __init__(self, code):
+    def __init__(self, code, chunk_size=65536):
+        # `code` is either a string, a file object or an iterable of string chunks
         self.code = code
+        self.chunk_size = chunk_size
 
     def tokenize(self):
-        code = self.code
-        keywords = {"SELECT", "FROM", "WHERE", "ORDER_BY"}
-        token_specification = [
-            ('NUMBER', r'\d+(\.\d*)?'),
-            ('ALL', r'\*'),
-            ('COMPARATOR', r'(==|>=|<=|<>|>|<)'),
-            ('COMMA', r','),
-            ('END', r';'),
-            ('ID', r'[a-zA-Z][a-zA-Z_$0-9]*'),
-            ('NEWLINE', r'\n'),
-            ('SKIP', r'[ \t]+'),
-            ('MISMATCH', r'.'),
-        ]
-        tok_regex = '|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in token_specification)
-        line_num = 1
-        line_start = 0
         tokens = []
+        for token in self.iter_tokens():
+            tokens.append(token)
+            token.print_token()
+        return tokens
+
+    def _chunks(self):
+        source = self.code
+        if hasattr(source, 'read'):
+            return iter(lambda: source.read(self.chunk_size), '')
+        return iter(source)
+
+    def iter_tokens(self, pos=0, line=1, line_start=0):
+        # A string source can be lexed from offset `pos`, given the line number and line start offset there
+        for kind, value, start, end, line, column in self._scan(pos, line, line_start):
+            yield Token(kind, value, line, column, start, end)
 
-        for mo in re.finditer(tok_regex, code):
-            kind = mo.lastgroup
-            value = mo.group()
-            column = mo.start() - line_start
-
-            if kind == 'NUMBER':
-                value = float(value) if '.' in value else int(value)
-                kind_enum = TokenType.NUMBER
-            elif kind == 'ID':
-                if value in keywords:
-                    kind_enum = TokenType[value]
+    def to_buffer(self):
+        buffer = TokenBuffer(self.code)
+        append = buffer.append
+        for kind, _, start, end, line, column in self._scan():
+            append(kind, start, end, line, column)
+        return buffer
+
+    def _scan(self, pos=0, line_num=1, line_start=0):
+        # Yields (kind, value, start, end, line, column) with absolute source offsets
+        base = 0  # absolute offset of buffer[0]
+        if isinstance(self.code, str):
+            chunks, buffer, eof = iter(()), self.code, True
+        else:
+            chunks, buffer, eof = self._chunks(), '', False
+
+        while True:
+            end = len(buffer)
+            for mo in TOKEN_REGEX.finditer(buffer, pos):
+                if not eof and mo.end() == end:
+                    # The token may continue in the next chunk, lex it again once more input arrives
+                    break
+                pos = mo.end()
+                kind = mo.lastgroup
+                kind_enum = TOKEN_TYPES.get(kind)
+
+                if kind_enum is not None:
+                    value = mo.group()
+                elif kind == 'SKIP':
+                    continue
+                elif kind in TOKEN_HANDLERS:
+                    kind_enum, value = TOKEN_HANDLERS[kind](mo.group())
+                elif kind == 'NEWLINE':
+                    line_start = base + pos
+                    line_num += 1
+                    continue
+                elif kind == 'MISMATCH':
+                    raise RuntimeError(f'{mo.group()!r} unexpected on line {line_num}')
                 else:
-                    kind_enum = TokenType.ID
-            elif kind == 'ALL':
-                kind_enum = TokenType.ALL
-            elif kind == 'COMPARATOR':
-                kind_enum = TokenType.COMPARATOR
-            elif kind == 'COMMA':
-                kind_enum = TokenType.COMMA
-            elif kind == 'END':
-                kind_enum = TokenType.END
-            elif kind == 'NEWLINE':
-                line_start = mo.end()
-                line_num += 1
-                continue
-            elif kind == 'SKIP':
-                continue
-            elif kind == 'MISMATCH':
-                raise RuntimeError(f'{value!r} unexpected on line {line_num}')
-            else:
-                raise RuntimeError(f"Unhandled token type: {kind}")
+                    raise RuntimeError(f"Unhandled token type: {kind}")
 
-            token = Token(kind_enum, value, line_num, column)
-            tokens.append(token)
-            token.print_token()
+                start = base + mo.start()
+                yield kind_enum, value, start, base + pos, line_num, start - line_start
 
-        return tokens
+            if eof:
+                return
+            buffer = buffer[pos:]
+            base += pos
+            pos = 0
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                buffer += chunk
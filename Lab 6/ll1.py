@@ -0,0 +1,300 @@
+from collections import namedtuple
+
+from ast_node import ASTNode
+from token_type import TokenType
+
+END_MARKER = '$'
+
+# Same shape as the public side of Lab 5's Grammar: rules map a non-terminal to a list of
+# productions, each a tuple of symbol names, with () for ε
+GrammarDefinition = namedtuple('GrammarDefinition', 'non_terminals terminals rules start_symbol')
+
+
+def nullable_symbols(grammar):
+    # Worklist: a production becomes nullable once its count of not-yet-nullable symbols drops to 0
+    remaining = []
+    uses = {}
+    nullable = set()
+    pending = []
+    for lhs, productions in grammar.rules.items():
+        for production in productions:
+            remaining.append([lhs, len(production)])
+            for symbol in production:
+                uses.setdefault(symbol, []).append(len(remaining) - 1)
+            if not production and lhs not in nullable:
+                nullable.add(lhs)
+                pending.append(lhs)
+    while pending:
+        symbol = pending.pop()
+        for i in uses.get(symbol, ()):
+            entry = remaining[i]
+            entry[1] -= 1
+            if entry[1] == 0 and entry[0] not in nullable:
+                nullable.add(entry[0])
+                pending.append(entry[0])
+    return nullable
+
+
+def _propagate(sets, edges):
+    # Makes sets[target] a superset of sets[source] for every edge source -> target
+    pending = list(sets)
+    while pending:
+        source = pending.pop()
+        for target in edges.get(source, ()):
+            missing = sets[source] - sets[target]
+            if missing:
+                sets[target] |= missing
+                pending.append(target)
+    return sets
+
+
+def sequence_first(symbols, first, nullable):
+    # FIRST of a symbol sequence, and whether the whole sequence is nullable
+    result = set()
+    for symbol in symbols:
+        result |= first[symbol]
+        if symbol not in nullable:
+            return result, False
+    return result, True
+
+
+def first_sets(grammar, nullable=None):
+    nullable = nullable_symbols(grammar) if nullable is None else nullable
+    first = {terminal: {terminal} for terminal in grammar.terminals}
+    first.update({nt: set() for nt in grammar.non_terminals})
+    edges = {}
+    for lhs, productions in grammar.rules.items():
+        for production in productions:
+            for symbol in production:
+                edges.setdefault(symbol, set()).add(lhs)
+                if symbol not in nullable:
+                    break
+    return _propagate(first, edges)
+
+
+def follow_sets(grammar, first=None, nullable=None):
+    nullable = nullable_symbols(grammar) if nullable is None else nullable
+    first = first_sets(grammar, nullable) if first is None else first
+    follow = {nt: set() for nt in grammar.non_terminals}
+    follow[grammar.start_symbol].add(END_MARKER)
+    edges = {}
+    for lhs, productions in grammar.rules.items():
+        for production in productions:
+            for i, symbol in enumerate(production):
+                if symbol not in follow:
+                    continue
+                rest, rest_nullable = sequence_first(production[i + 1:], first, nullable)
+                follow[symbol] |= rest
+                if rest_nullable:
+                    edges.setdefault(lhs, set()).add(symbol)
+    return _propagate(follow, edges)
+
+
+def ll1_table(grammar):
+    """
+    Builds the LL(1) table of `grammar`: table[A][terminal] is the production of A to expand on that
+    lookahead. Returns (table, conflicts), with a conflict (A, terminal, productions) for every cell
+    claimed by more than one production; the first of them is kept in the table.
+    """
+    nullable = nullable_symbols(grammar)
+    first = first_sets(grammar, nullable)
+    follow = follow_sets(grammar, first, nullable)
+    table = {nt: {} for nt in grammar.non_terminals}
+    claims = {}
+    for lhs, productions in grammar.rules.items():
+        for production in productions:
+            lookaheads, production_nullable = sequence_first(production, first, nullable)
+            if production_nullable:
+                lookaheads = lookaheads | follow[lhs]
+            for terminal in lookaheads:
+                claims.setdefault((lhs, terminal), []).append(production)
+                table[lhs].setdefault(terminal, production)
+    conflicts = [(lhs, terminal, productions) for (lhs, terminal), productions in claims.items() if len(productions) > 1]
+    return table, conflicts
+
+
+class LL1Parser:
+    """
+    Table-driven LL(1) parser generated from a grammar definition.
+
+    `grammar` is any object with non_terminals, terminals, rules and start_symbol like Lab 5's Grammar;
+    terminals are TokenType names. `actions` maps (non-terminal, production) to a function that gets
+    the values of the production's symbols (Token objects for terminals) and returns the node's value;
+    productions without one produce a tuple of those values. Parsing runs one loop over an explicit
+    stack of integer symbol codes, with a marker under each expansion that applies its action.
+
+    When a non-terminal has no table entry for the lookahead but a production that derives ε, that
+    production is taken. Parsing a start symbol then stops at any token that cannot continue it, and
+    errors surface at the next terminal, as in the hand-written Parser, instead of at FOLLOW checks.
+    """
+
+    def __init__(self, grammar, actions=None):
+        table, conflicts = ll1_table(grammar)
+        if conflicts:
+            details = '; '.join(f"{lhs} on {terminal}: " + ' | '.join(' '.join(p) or 'ε' for p in productions)
+                                for lhs, terminal, productions in conflicts)
+            raise ValueError(f"Grammar is not LL(1): {details}")
+        actions = actions or {}
+        self.grammar = grammar
+
+        # Codes: terminals and the end marker, one code for token kinds outside the grammar, then
+        # non-terminals; ~rule marks a finished expansion. Table rows are lists indexed by lookahead code.
+        self.terminals = list(grammar.terminals) + [END_MARKER]
+        self.non_terminals = list(grammar.non_terminals)
+        self.num_terminals = len(self.terminals)
+        codes = {symbol: i for i, symbol in enumerate(self.terminals)}
+        codes.update({nt: self.num_terminals + 1 + i for i, nt in enumerate(self.non_terminals)})
+        # Keyed by TokenType name, read from the member's _name_ to keep Enum hashing out of the loop
+        self.kind_codes = {kind.name: codes.get(kind.name, self.num_terminals) for kind in TokenType}
+        self.end_code = codes[END_MARKER]
+        self.start = codes[grammar.start_symbol]
+
+        self.rules = []  # (action, number of symbols)
+        rule_ids = {}
+        for lhs, productions in grammar.rules.items():
+            for production in productions:
+                rule_ids[(lhs, production)] = len(self.rules)
+                self.rules.append((actions.get((lhs, production), _collect), len(production)))
+
+        def expansion(lhs, production):
+            # Stack entries pushed for A -> X1..Xn: the rule marker, then the symbols in reverse
+            return [~rule_ids[(lhs, production)]] + [codes[symbol] for symbol in reversed(production)]
+
+        nullable = nullable_symbols(grammar)
+        self.table = [None] * (self.num_terminals + 1 + len(self.non_terminals))
+        self.defaults = list(self.table)
+        for nt in self.non_terminals:
+            row = [None] * (self.num_terminals + 1)
+            for terminal, production in table[nt].items():
+                row[codes[terminal]] = expansion(nt, production)
+            self.table[codes[nt]] = row
+            default = next((production for production in grammar.rules.get(nt, ())
+                            if all(symbol in nullable for symbol in production)), None)
+            if default is not None:
+                self.defaults[codes[nt]] = expansion(nt, default)
+
+    def parse(self, tokens):
+        return list(self.iter_parse(tokens))
+
+    def iter_parse(self, tokens):
+        # Like Parser.iter_parse: tokens that cannot start the start symbol are skipped between statements
+        stream = iter(tokens)
+        token = next(stream, None)
+        start_row = self.table[self.start]
+        kind_codes = self.kind_codes
+        while token is not None:
+            if start_row[kind_codes[token.kind._name_]] is None:
+                token = next(stream, None)
+                continue
+            value, token = self.parse_one(token, stream)
+            yield value
+
+    def parse_one(self, token, stream):
+        """Parses one start symbol from `token` onwards; returns its value and the first unused token."""
+        table, defaults, rules = self.table, self.defaults, self.rules
+        kind_codes = self.kind_codes
+        num_terminals = self.num_terminals
+        end_code = self.end_code
+        lookahead = end_code if token is None else kind_codes[token.kind._name_]
+        stack = [self.start]
+        values = []
+        pop, push, extend = stack.pop, values.append, stack.extend
+        while stack:
+            top = pop()
+            if top > num_terminals:
+                entries = table[top][lookahead]
+                if entries is None:
+                    entries = defaults[top]
+                    if entries is None:
+                        raise RuntimeError(self._error(table[top], token))
+                extend(entries)
+            elif top >= 0:
+                if top != lookahead:
+                    raise RuntimeError(self._error([None] * top + [True], token))
+                push(token)
+                token = next(stream, None)
+                lookahead = end_code if token is None else kind_codes[token.kind._name_]
+            else:
+                action, count = rules[~top]
+                if count:
+                    arguments = values[-count:]
+                    del values[-count:]
+                    push(action(*arguments))
+                else:
+                    push(action())
+        return values[0], token
+
+    def _error(self, row, token):
+        # `row` holds a non-None entry at the code of every terminal that was expected
+        expected = ', '.join(self.terminals[code] for code, entry in enumerate(row) if entry is not None)
+        actual = token.kind.name if token is not None else "EOF"
+        return f"Expected {expected}, but got {actual}"
+
+
+def _collect(*values):
+    return values
+
+
+# The SQL subset of parser.Parser as a declarative grammar
+SQL_GRAMMAR = GrammarDefinition(
+    non_terminals=['statement', 'columns', 'column_list', 'column_rest', 'where', 'operand', 'order_by', 'end'],
+    terminals=['SELECT', 'ALL', 'ID', 'COMMA', 'FROM', 'WHERE', 'COMPARATOR', 'NUMBER', 'ORDER_BY', 'END'],
+    rules={
+        'statement': [('SELECT', 'columns', 'FROM', 'ID', 'where', 'order_by', 'end')],
+        'columns': [('ALL',), ('column_list',)],
+        # A trailing comma is accepted, as in the hand-written parser
+        'column_list': [('ID', 'column_rest'), ()],
+        'column_rest': [('COMMA', 'column_list'), ()],
+        'where': [('WHERE', 'operand', 'COMPARATOR', 'operand'), ()],
+        'operand': [('ID',), ('NUMBER',)],
+        'order_by': [('ORDER_BY', 'ID'), ()],
+        'end': [('END',), ()],
+    },
+    start_symbol='statement',
+)
+
+
+def _statement(select, columns, from_, table, where, order_by, end):
+    node = ASTNode('SELECT_STATEMENT')
+    node.add_child(ASTNode('SELECT'))
+    node.add_child(columns)
+    node.add_child(ASTNode('FROM', table.value))
+    if where is not None:
+        node.add_child(where)
+    if order_by is not None:
+        node.add_child(order_by)
+    return node
+
+
+def _column(column, rest):
+    # The list is built back to front, since the rest of it is finished first; `columns` reverses it
+    rest.append(ASTNode('COLUMN', column.value))
+    return rest
+
+
+def _where(where, left, comparator, right):
+    return ASTNode('WHERE', children=[ASTNode('LEFT', left.value), ASTNode('OP', comparator.value),
+                                      ASTNode('RIGHT', right.value)])
+
+
+SQL_ACTIONS = {
+    ('statement', SQL_GRAMMAR.rules['statement'][0]): _statement,
+    ('columns', ('ALL',)): lambda all_: ASTNode('COLUMN_LIST', children=[ASTNode('ALL')]),
+    ('columns', ('column_list',)): lambda columns: ASTNode('COLUMN_LIST', children=columns[::-1]),
+    ('column_list', ('ID', 'column_rest')): _column,
+    ('column_list', ()): lambda: [],
+    ('column_rest', ('COMMA', 'column_list')): lambda comma, columns: columns,
+    ('column_rest', ()): lambda: [],
+    ('where', SQL_GRAMMAR.rules['where'][0]): _where,
+    ('where', ()): lambda: None,
+    ('operand', ('ID',)): lambda token: token,
+    ('operand', ('NUMBER',)): lambda token: token,
+    ('order_by', ('ORDER_BY', 'ID')): lambda order_by, column: ASTNode('ORDER_BY', column.value),
+    ('order_by', ()): lambda: None,
+    ('end', ('END',)): lambda end: None,
+    ('end', ()): lambda: None,
+}
+
+
+def sql_parser():
+    return LL1Parser(SQL_GRAMMAR, SQL_ACTIONS)
@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import time
+
+from server import SQLServer
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def _client(host, port, path, statements, window, latencies, errors):
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    slots = asyncio.Semaphore(window)
+    sent = []
+
+    async def send():
+        for statement in statements:
+            await slots.acquire()
+            sent.append(time.perf_counter())
+            writer.write(statement.encode('utf-8') + b'\n')
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    for i in range(len(statements)):
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection early")
+        latencies.append(time.perf_counter() - sent[i])
+        if line.startswith(b'{"error"'):
+            errors.append(json.loads(line)['error'])
+        slots.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(statements, concurrency, window=1, host='127.0.0.1', port=5433, path=None):
+    """
+    Replays `statements` over `concurrency` connections, each keeping at most `window` statements
+    unanswered, and returns throughput with p50/p99 latency. Each statement goes out as one line and
+    is timed from its write to the matching response line, so it must not contain `;` before its end.
+    """
+    latencies = []
+    errors = []
+    shares = [statements[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, path, share, window, latencies, errors) for share in shares if share))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'concurrency': concurrency, 'statements': len(latencies), 'errors': len(errors), 'seconds': elapsed,
+            'throughput': len(latencies) / elapsed, 'p50': percentile(latencies, 0.5), 'p99': percentile(latencies, 0.99)}
+
+
+def format_result(result):
+    return (f"{result['concurrency']:>11} {result['throughput']:12.0f} stmt/s "
+            f"p50 {result['p50'] * 1e3:8.3f} ms  p99 {result['p99'] * 1e3:8.3f} ms  errors {result['errors']}"
+            + (f"  batch {result['average_batch']:.1f}" if 'average_batch' in result else ''))
+
+
+async def sweep(statements, levels, window=1, host='127.0.0.1', port=5433, path=None, server=None):
+    # Runs one load per concurrency level; with `server`, starts it here and reports its batching
+    if server is not None:
+        await server.start(host, port, path)
+        if path is None:
+            host, port = server.address[:2]
+    try:
+        results = []
+        for concurrency in levels:
+            before = server.stats() if server is not None else None
+            result = await run_load(statements, concurrency, window, host, port, path)
+            if server is not None:
+                after = server.stats()
+                result['average_batch'] = ((after['statements'] - before['statements'])
+                                           / max(1, after['batches'] - before['batches']))
+            print(format_result(result), flush=True)
+            results.append(result)
+        return results
+    finally:
+        if server is not None:
+            await server.close()
+
+
+def main(argv=None):
+    from benchmark import replay_log
+
+    parser = argparse.ArgumentParser(description="Load generator for server.py; reports throughput and p50/p99 latency.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5433)
+    parser.add_argument('--unix', metavar='PATH', help="connect to a Unix socket instead of TCP")
+    parser.add_argument('--concurrency', default='1,8,32,128', help="comma-separated connection counts")
+    parser.add_argument('--statements', type=int, default=20_000, help="statements per concurrency level")
+    parser.add_argument('--window', type=int, default=1, help="unanswered statements allowed per connection")
+    parser.add_argument('--spawn', action='store_true', help="start a server in this process instead of connecting")
+    parser.add_argument('--workers', type=int, help="worker processes of the spawned server")
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(',')]
+    statements = replay_log(args.statements)
+    server = SQLServer(args.workers) if args.spawn else None
+    print(f"{'connections':>11} {'throughput':>19} {'latency':>20}")
+    asyncio.run(sweep(statements, levels, args.window, args.host, 0 if args.spawn and not args.unix else args.port,
+                      args.unix, server))
+
+
+if __name__ == "__main__":
+    main()
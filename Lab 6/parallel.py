@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import Lexer
+from parser import Parser
+
+# Below this many characters a process pool costs more than it saves
+SERIAL_THRESHOLD = 200_000
+
+
+def split_statements(source, parts):
+    """
+    Splits `source` into at most `parts` chunks that end right after a `;`.
+
+    Returns (start, end, line, line_start) for each chunk so it can be lexed with absolute positions.
+    A `;` can only ever be an END token in this SQL subset, so cutting after one never splits a token.
+    """
+    target = max(1, len(source) // parts)
+    chunks = []
+    start, line, line_start = 0, 1, 0
+    while start < len(source):
+        cut = source.find(';', start + target)
+        end = len(source) if cut < 0 else cut + 1
+        chunks.append((start, end, line, line_start))
+        newlines = source.count('\n', start, end)
+        if newlines:
+            line += newlines
+            line_start = source.rfind('\n', start, end) + 1
+        start = end
+    return chunks
+
+
+def _parse_chunk(text, line, line_start):
+    # `line_start` is relative to the chunk (negative when its first line began earlier),
+    # so token lines and columns come out absolute
+    return Parser(Lexer(text).iter_tokens(0, line, line_start)).parse()
+
+
+def parse_parallel(source, workers=4, serial_threshold=SERIAL_THRESHOLD):
+    """Lexes and parses independent `;`-terminated statements in a process pool, keeping their order."""
+    if workers <= 1 or len(source) < serial_threshold:
+        return Parser(Lexer(source).iter_tokens()).parse()
+
+    chunks = split_statements(source, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_chunk, source[start:end], line, line_start - start)
+                   for start, end, line, line_start in chunks]
+        asts = []
+        for future in futures:
+            asts.extend(future.result())
+    return asts
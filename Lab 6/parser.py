@@ -4,13 +4,17 @@ from ast_node import ASTNode
 
 class Parser:
     def __init__(self, tokens):
+        # `tokens` may be a list or any iterable, e.g. the generator returned by Lexer.iter_tokens()
         self.tokens = tokens
+        self._stream = iter(tokens)
+        self._lookahead = next(self._stream, None)
         self.current = 0
 
     def peek(self):
-        return self.tokens[self.current] if self.current < len(self.tokens) else None
+        return self._lookahead
 
     def advance(self):
+        self._lookahead = next(self._stream, None)
         self.current += 1
 
     def match(self, *token_types):
@@ -29,13 +33,14 @@ class Parser:
         return tok
 
     def parse(self):
-        nodes = []
+        return list(self.iter_parse())
+
+    def iter_parse(self):
         while self.peek():
             if self.peek().kind == TokenType.SELECT:
-                nodes.append(self.select_statement())
+                yield self.select_statement()
             else:
                 self.advance()
-        return nodes
 
     def select_statement(self):
         node = ASTNode('SELECT_STATEMENT')
@@ -43,13 +48,16 @@ class Parser:
         node.add_child(ASTNode('SELECT'))
 
         column_list = ASTNode('COLUMN_LIST')
-        while True:
-            token = self.match(TokenType.ID)
-            if not token:
-                break
-            column_list.add_child(ASTNode('COLUMN', token.value))
-            if not self.match(TokenType.COMMA):
-                break
+        if self.match(TokenType.ALL):
+            column_list.add_child(ASTNode('ALL'))
+        else:
+            while True:
+                token = self.match(TokenType.ID)
+                if not token:
+                    break
+                column_list.add_child(ASTNode('COLUMN', token.value))
+                if not self.match(TokenType.COMMA):
+                    break
         node.add_child(column_list)
 
         self.expect(TokenType.FROM)
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from statement_cache import StatementCache
+
+# A statement ends at `;` or at the end of a line
+DELIMITERS = re.compile(r'[;\n]')
+
+# One StatementCache per worker process or thread, so repeated query shapes skip the parser
+_local = threading.local()
+
+
+def serialize(ast):
+    # [kind, value, children] lists, the most compact JSON form of an ASTNode tree
+    return [ast.kind, ast.value, [serialize(child) for child in ast.children]]
+
+
+def parse_batch(statements):
+    """Parses each statement on its own and returns one JSON response line per statement."""
+    cache = getattr(_local, 'cache', None)
+    if cache is None:
+        cache = _local.cache = StatementCache()
+    responses = []
+    for statement in statements:
+        try:
+            asts = cache.parse(statement)
+        except RuntimeError as error:
+            responses.append(json.dumps({'error': str(error)}))
+        else:
+            responses.append(json.dumps({'asts': [serialize(ast) for ast in asts]}))
+    return responses
+
+
+class SQLServer:
+    """
+    Asyncio server that parses `;`- or newline-delimited SQL and answers one JSON line per statement.
+
+    Statements from all connections go into one bounded queue. A batcher task takes up to
+    `batch_size` of them, waiting at most `batch_delay` seconds after the first, and hands the
+    batch to a worker pool; at most `workers` batches are in flight. Each connection also bounds its
+    unanswered statements, so a full queue stops the server from reading that socket and TCP
+    backpressure reaches the client. Responses come back in request order per connection.
+    """
+
+    def __init__(self, workers=None, batch_size=64, batch_delay=0.001, queue_size=1024, pending_limit=256,
+                 use_processes=True):
+        if batch_size < 1 or queue_size < 1 or pending_limit < 1:
+            raise ValueError("batch_size, queue_size and pending_limit must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.queue_size = queue_size
+        self.pending_limit = pending_limit
+        self.use_processes = use_processes
+        self.server = None
+        self.batches = 0
+        self.statements = 0
+        self.largest_batch = 0
+
+    def stats(self):
+        return {'batches': self.batches, 'statements': self.statements, 'largest_batch': self.largest_batch,
+                'average_batch': self.statements / self.batches if self.batches else 0.0}
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        # Listens on a Unix socket when `path` is given, otherwise on TCP (port 0 picks a free port)
+        self.queue = asyncio.Queue(self.queue_size)
+        self.in_flight = asyncio.Semaphore(self.workers)
+        self.pool = (ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor)(max_workers=self.workers)
+        self.batcher = asyncio.create_task(self._batcher())
+        self.running = set()
+        self.connections = set()
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        # Stops listening, drops open connections, then stops the batcher and the worker pool
+        self.server.close()
+        for connection in self.connections:
+            connection.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        await asyncio.gather(self.batcher, *self.running, return_exceptions=True)
+        self.pool.shutdown()
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+            await self.in_flight.acquire()
+            task = asyncio.create_task(self._run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, batch):
+        try:
+            self.batches += 1
+            self.statements += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            loop = asyncio.get_running_loop()
+            try:
+                responses = await loop.run_in_executor(self.pool, parse_batch, [statement for statement, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+        finally:
+            self.in_flight.release()
+
+    async def _handle(self, reader, writer):
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(self.pending_limit)  # response futures in request order
+        sender = asyncio.create_task(self._send(pending, writer))
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = ''
+        try:
+            while True:
+                data = await reader.read(65536)
+                buffer += decoder.decode(data, final=not data)
+                *statements, buffer = DELIMITERS.split(buffer)
+                if not data:
+                    statements.append(buffer)
+                for statement in statements:
+                    statement = statement.strip()
+                    if not statement:
+                        continue
+                    future = loop.create_future()
+                    await pending.put(future)
+                    await self.queue.put((statement, future))
+                if not data:
+                    break
+            await pending.put(None)
+            await sender
+        except ConnectionError:
+            sender.cancel()
+        except asyncio.CancelledError:
+            # Shutdown: handlers end normally, since asyncio logs a handler task that ends cancelled
+            sender.cancel()
+        finally:
+            self.connections.discard(connection)
+            writer.close()
+
+    async def _send(self, pending, writer):
+        connected = True
+        while True:
+            future = await pending.get()
+            if future is None:
+                return
+            try:
+                response = await future
+            except Exception as error:
+                response = json.dumps({'error': f"Server error: {error!r}"})
+            if not connected:
+                continue  # keep draining so the reader never blocks on a full queue
+            try:
+                writer.write(response.encode('utf-8') + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+
+async def serve(args):
+    server = SQLServer(args.workers, args.batch_size, args.batch_delay, args.queue_size, args.pending_limit,
+                       use_processes=not args.threads)
+    await server.start(args.host, args.port, args.unix)
+    print(f"Listening on {args.unix or server.address}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Lab 6 SQL parser over TCP or a Unix socket.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5433)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--threads', action='store_true', help="use worker threads instead of processes")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--batch-delay', type=float, default=0.001, help="seconds to wait for a batch to fill")
+    parser.add_argument('--queue-size', type=int, default=1024, help="statements waiting for a worker")
+    parser.add_argument('--pending-limit', type=int, default=256, help="unanswered statements per connection")
+    try:
+        asyncio.run(serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
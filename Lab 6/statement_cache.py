@@ -0,0 +1,101 @@
+import re
+from collections import OrderedDict
+
+from ast_node import ASTNode
+from lexer import KEYWORDS, Lexer
+from parser import Parser
+from token_type import TokenType
+
+# Splits SQL around keywords, NUMBER and ID literals with the lexer's patterns. Keywords are listed
+# first and must not continue as an identifier, as in the lexer where a keyword is a whole ID token.
+LITERAL_REGEX = re.compile(r'((?:{})(?![a-zA-Z_$0-9]))|(\d+(?:\.\d*)?)|([a-zA-Z][a-zA-Z_$0-9]*)'.format(
+    '|'.join(sorted(KEYWORDS, key=len, reverse=True))))
+
+
+def fingerprint(sql):
+    """
+    Returns (key, literals) for a SQL string.
+
+    `key` is the text with every ID and NUMBER literal replaced by a placeholder of its kind; keywords,
+    punctuation and whitespace are kept as written. `literals` holds the literal values in order,
+    converted like the lexer does. The parser only looks at token kinds, so statements with the same
+    key parse into the same tree up to these values. Nothing is validated here; only text that once
+    lexed and parsed without errors ever gets a cached template.
+    """
+    pieces = LITERAL_REGEX.split(sql)
+    keywords = pieces[1::4]
+    numbers = pieces[2::4]
+    key = (tuple(pieces[0::4]), tuple(keywords), tuple(map(bool, numbers)))
+    literals = [(float(number) if '.' in number else int(number)) if identifier is None else identifier
+                for keyword, number, identifier in zip(keywords, numbers, pieces[3::4]) if keyword is None]
+    return key, literals
+
+
+class _Slot:
+    # Stands in for the literal with this index while a template is parsed
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+
+def _template(sql):
+    # Parses `sql` with its literal values replaced by slots and compiles every tree into a function
+    # of the literal list that rebuilds it with plain ASTNode calls
+    slots = 0
+    tokens = []
+    for token in Lexer(sql).iter_tokens():
+        if token.kind in (TokenType.ID, TokenType.NUMBER):
+            token.value = _Slot(slots)
+            slots += 1
+        tokens.append(token)
+    return [eval(f'lambda literals: {_source(ast)}', {'ASTNode': ASTNode}) for ast in Parser(tokens).parse()]
+
+
+def _source(node):
+    value = node.value
+    value = f'literals[{value.index}]' if type(value) is _Slot else repr(value)
+    children = ', '.join(_source(child) for child in node.children)
+    return f'ASTNode({node.kind!r}, {value}, [{children}])'
+
+
+class StatementCache:
+    """
+    Parses SQL through an LRU cache of AST templates keyed by statement fingerprint.
+
+    A hit splits the text once with a regex instead of building Token objects and running the parser,
+    then rebuilds the cached template with the new literals. Every call returns fresh ASTNode trees.
+    """
+
+    def __init__(self, cache_size=1024):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # fingerprint key -> template builders, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cache_stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.cache), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def parse(self, sql):
+        # Same result as Parser(Lexer(sql).iter_tokens()).parse()
+        key, literals = fingerprint(sql)
+        templates = self.cache.get(key)
+        if templates is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        else:
+            self.misses += 1
+            templates = _template(sql)
+            if self.cache_size > 0:
+                self.cache[key] = templates
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                    self.evictions += 1
+        return [build(literals) for build in templates]
+
+    def parse_many(self, statements):
+        parse = self.parse
+        return [parse(sql) for sql in statements]
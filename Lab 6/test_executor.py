@@ -0,0 +1,109 @@
+import io
+import operator
+import unittest
+
+import numpy as np
+
+from benchmark import generate_sql
+from executor import Executor, Table
+from lexer import Lexer
+from parser import Parser
+
+OPERATORS = {'==': operator.eq, '<>': operator.ne, '>=': operator.ge, '<=': operator.le, '>': operator.gt, '<': operator.lt}
+
+
+def random_tables(num_rows, seed=0):
+    # The tables and columns named by benchmark.generate_sql, with few distinct values so ties are common
+    rng = np.random.default_rng(seed)
+    return [Table(f'table{t}', {f'col{c}': rng.integers(0, 1000, num_rows) for c in range(1, 51)}) for t in range(1, 21)]
+
+
+def naive_execute(tables, ast):
+    # Row-at-a-time reference
+    clauses = {child.kind: child for child in ast.children}
+    table = tables[clauses['FROM'].value]
+    rows = [dict(zip(table.names, row)) for row in table.rows()]
+    if 'WHERE' in clauses:
+        operands = {child.kind: child.value for child in clauses['WHERE'].children}
+
+        def value(row, operand):
+            return row[operand] if isinstance(operand, str) else operand
+
+        compare = OPERATORS[operands['OP']]
+        rows = [row for row in rows if compare(value(row, operands['LEFT']), value(row, operands['RIGHT']))]
+    if 'ORDER_BY' in clauses:
+        rows.sort(key=lambda row: row[clauses['ORDER_BY'].value])
+    names = [child.value for child in clauses['COLUMN_LIST'].children if child.kind == 'COLUMN'] or table.names
+    return names, [tuple(row[name] for name in names) for row in rows]
+
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.people = Table('people', {
+            'id': [1, 2, 3, 4, 5],
+            'age': [31, 25, 40, 25, 19],
+            'score': [2.5, 9.0, 7.5, 9.0, 1.0],
+        })
+        self.executor = Executor([self.people])
+
+    def run_one(self, sql):
+        [result] = self.executor.query(sql)
+        return result
+
+    def test_projection_and_all(self):
+        result = self.run_one("SELECT age, id FROM people;")
+        self.assertEqual(result.names, ['age', 'id'])
+        self.assertEqual(list(result.rows())[0], (31, 1))
+        # Without WHERE or ORDER_BY the columns are the table's own arrays
+        self.assertIs(result.column('id'), self.people.column('id'))
+        result = self.run_one("SELECT * FROM people;")
+        self.assertEqual(result.names, ['id', 'age', 'score'])
+        self.assertEqual(len(result), 5)
+
+    def test_where_operands(self):
+        self.assertEqual(self.run_one("SELECT id FROM people WHERE age >= 25").column('id').tolist(), [1, 2, 3, 4])
+        self.assertEqual(self.run_one("SELECT id FROM people WHERE 25 == age").column('id').tolist(), [2, 4])
+        self.assertEqual(self.run_one("SELECT id FROM people WHERE score < age").column('id').tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(self.run_one("SELECT id FROM people WHERE score > 7.5").column('id').tolist(), [2, 4])
+        self.assertEqual(len(self.run_one("SELECT id FROM people WHERE 1 == 1")), 5)
+        self.assertEqual(len(self.run_one("SELECT id FROM people WHERE 1 <> 1")), 0)
+
+    def test_order_by_is_stable(self):
+        result = self.run_one("SELECT id, score FROM people WHERE id > 1 ORDER_BY age;")
+        self.assertEqual(result.column('id').tolist(), [5, 2, 4, 3])
+        self.assertEqual(self.run_one("SELECT id FROM people ORDER_BY score").column('id').tolist(), [5, 1, 3, 2, 4])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.run_one("SELECT id FROM nobody")
+        with self.assertRaises(ValueError):
+            self.run_one("SELECT height FROM people")
+        with self.assertRaises(ValueError):
+            self.run_one("SELECT id FROM people WHERE height > 3")
+        with self.assertRaises(ValueError):
+            Table('bad', {'a': [1, 2], 'b': [1]})
+
+    def test_from_csv(self):
+        table = Table.from_csv(io.StringIO("id,name,weight\n1,ann,50.5\n2,bob,72\n"), name='pets')
+        self.assertEqual(table.names, ['id', 'name', 'weight'])
+        self.assertEqual(table.column('id').dtype, np.int64)
+        self.assertEqual(table.column('weight').dtype, np.float64)
+        self.assertEqual(table.column('name').tolist(), ['ann', 'bob'])
+        [result] = Executor([table]).query("SELECT name FROM pets WHERE weight > 60;")
+        self.assertEqual(result.column('name').tolist(), ['bob'])
+        with self.assertRaises(ValueError):
+            Table.from_csv(io.StringIO("a,b\n1\n"))
+
+    def test_generated_statements_match_row_interpreter(self):
+        tables = random_tables(300, seed=1)
+        executor = Executor(tables)
+        by_name = {table.name: table for table in tables}
+        for ast in Parser(Lexer(generate_sql(300, seed=4)).iter_tokens()).iter_parse():
+            result = executor.execute(ast)
+            names, rows = naive_execute(by_name, ast)
+            self.assertEqual(result.names, names)
+            self.assertEqual(list(result.rows()), rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
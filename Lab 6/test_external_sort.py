@@ -0,0 +1,132 @@
+import io
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from operator import itemgetter
+
+import numpy as np
+
+from benchmark import generate_sql
+from executor import Executor, Table, select_rows
+from external_sort import RunCodec, external_sort
+from lexer import Lexer
+from parser import Parser
+
+
+def random_rows(count, seed=0, distinct=1000):
+    # (key, sequence number, float, str) with repeated keys, generated lazily
+    rng = random.Random(seed)
+    for i in range(count):
+        yield rng.randrange(distinct), i, rng.random(), f"row{i}"
+
+
+class TestExternalSort(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def spill_files(self):
+        return [name for _, _, files in os.walk(self.directory.name) for name in files]
+
+    def test_matches_sorted_and_is_stable(self):
+        rows = list(random_rows(20_000, distinct=50))
+        result = list(external_sort(rows, itemgetter(0), memory_limit=200_000, directory=self.directory.name))
+        self.assertEqual(result, sorted(rows, key=itemgetter(0)))
+
+    def test_runs_are_spilled_and_removed(self):
+        rows = external_sort(random_rows(20_000), itemgetter(0), memory_limit=100_000, directory=self.directory.name)
+        first = next(rows)
+        self.assertGreater(len(self.spill_files()), 10)
+        self.assertEqual(first[0], 0)
+        self.assertEqual(sum(1 for _ in rows), 19_999)
+        self.assertEqual(self.spill_files(), [])
+
+    def test_multi_pass_merge(self):
+        rows = list(random_rows(5_000, distinct=20))
+        result = external_sort(rows, itemgetter(0), memory_limit=20_000, directory=self.directory.name, fan_in=2)
+        self.assertEqual(list(result), sorted(rows, key=itemgetter(0)))
+
+    def test_default_key_and_numeric_rows(self):
+        rows = [(key, -i) for i, (key, _, _, _) in enumerate(random_rows(10_000))]
+        self.assertEqual(list(external_sort(rows, memory_limit=50_000, directory=self.directory.name)), sorted(rows))
+        self.assertEqual(list(external_sort([], memory_limit=50_000)), [])
+
+    def test_top_k(self):
+        rows = list(random_rows(10_000, distinct=100))
+        expected = sorted(rows, key=itemgetter(0))
+        for limit in (0, 1, 10, 500):
+            result = external_sort(iter(rows), itemgetter(0), memory_limit=100_000, limit=limit,
+                                   directory=self.directory.name)
+            self.assertEqual(list(result), expected[:limit])
+            self.assertEqual(self.spill_files(), [])
+        # A limit too large for the budget falls back to spilling runs
+        result = external_sort(iter(rows), itemgetter(0), memory_limit=100_000, limit=5000, directory=self.directory.name)
+        self.assertEqual(list(result), expected[:5000])
+        with self.assertRaises(ValueError):
+            external_sort(rows, limit=-1)
+
+    def test_memory_stays_near_the_limit(self):
+        limit = 2 ** 19
+        tracemalloc.start()
+        try:
+            count = 0
+            previous = -1
+            rows = ((key, i) for key, i, _, _ in random_rows(100_000))
+            for row in external_sort(rows, itemgetter(0), memory_limit=limit, directory=self.directory.name):
+                self.assertLessEqual(previous, row[0])
+                previous = row[0]
+                count += 1
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, 100_000)
+        # Holding every row would take about 12 MiB
+        self.assertLess(peak, 3 * limit)
+
+    def test_codec_round_trip_and_types(self):
+        rows = [(1, 2.5, 'plain'), (-2 ** 63, float('inf'), 'ünïcødé ✓'), (2 ** 63 - 1, -0.0, '')]
+        codec = RunCodec.for_rows(rows)
+        file = io.BytesIO()
+        codec.write(file, rows)
+        for block_size in (1, 7, 4096):
+            file.seek(0)
+            self.assertEqual(list(codec.read(file, block_size)), rows)
+        file = io.BytesIO(file.getvalue()[:-1])
+        with self.assertRaises(ValueError):
+            list(codec.read(file))
+        with self.assertRaises(TypeError):
+            RunCodec.for_rows([(1, 'a'), (1.5, 'b')])
+        with self.assertRaises(TypeError):
+            list(external_sort([(i % 7, None) for i in range(5000)], memory_limit=10_000))
+
+
+class TestSelectRows(unittest.TestCase):
+    def test_matches_columnar_executor(self):
+        rng = np.random.default_rng(2)
+        tables = [Table(f'table{t}', {f'col{c}': rng.integers(0, 50, 400) for c in range(1, 51)}) for t in range(1, 21)]
+        executor = Executor(tables)
+        by_name = {table.name: table for table in tables}
+        with tempfile.TemporaryDirectory() as directory:
+            for ast in Parser(Lexer(generate_sql(200, seed=5)).iter_tokens()).iter_parse():
+                table = by_name[ast.children[2].value]
+                expected = list(executor.execute(ast).rows())
+                result = select_rows(ast, table.names, table.rows(), memory_limit=4096, directory=directory)
+                self.assertEqual(list(result), expected)
+                result = select_rows(ast, table.names, table.rows(), memory_limit=4096, limit=7, directory=directory)
+                self.assertEqual(list(result), expected[:7])
+
+    def test_select_all_and_literal_where(self):
+        ast = Parser(Lexer("SELECT * FROM t WHERE 1 == 2 ORDER_BY b;").iter_tokens()).select_statement()
+        self.assertEqual(list(select_rows(ast, ['a', 'b'], [(1, 2)])), [])
+        ast = Parser(Lexer("SELECT * FROM t ORDER_BY b;").iter_tokens()).select_statement()
+        self.assertEqual(list(select_rows(ast, ['a', 'b'], [(1, 2), (0, 1)])), [(0, 1), (1, 2)])
+        with self.assertRaises(ValueError):
+            select_rows(ast, ['a'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
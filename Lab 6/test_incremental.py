@@ -0,0 +1,90 @@
+import random
+import unittest
+
+from benchmark import generate_sql
+from incremental import IncrementalDocument
+from lexer import Lexer
+from parser import Parser
+
+
+def token_positions(tokens):
+    return [(t.kind, t.value, t.line, t.column, t.start, t.end) for t in tokens]
+
+
+class TestIncrementalDocument(unittest.TestCase):
+    def assertMatchesFullParse(self, document):
+        tokens = list(Lexer(document.code).iter_tokens())
+        self.assertEqual(token_positions(document.tokens), token_positions(tokens))
+        self.assertEqual([str(ast) for ast in document.asts], [str(ast) for ast in Parser(tokens).parse()])
+
+    def test_initial_parse(self):
+        document = IncrementalDocument(generate_sql(20))
+        self.assertMatchesFullParse(document)
+        self.assertEqual(len(document.asts), 20)
+
+    def test_edit_inside_identifier(self):
+        document = IncrementalDocument("SELECT col1 FROM t1;\nSELECT col2 FROM t2;\n")
+        document.edit(10, 1, "umn9")
+        self.assertMatchesFullParse(document)
+        self.assertEqual(document.asts[0].children[1].children[0].value, "column9")
+
+    def test_untouched_statements_are_reused(self):
+        document = IncrementalDocument(generate_sql(50))
+        before = list(document.asts)
+        offset = document.code.index('SELECT', len(document.code) // 2) + len('SELECT ')
+        document.edit(offset, 0, "extra, ")
+        self.assertMatchesFullParse(document)
+        changed = [i for i, (old, new) in enumerate(zip(before, document.asts)) if old is not new]
+        self.assertEqual(len(changed), 1)
+
+    def test_edits_across_lines_and_statements(self):
+        document = IncrementalDocument("SELECT a FROM t;\nSELECT b FROM u;\nSELECT c FROM v;\n")
+        document.edit(15, 2, "\n\n WHERE a > 1\n;")
+        self.assertMatchesFullParse(document)
+        document.edit(0, document.code.index('SELECT c'), "")
+        self.assertMatchesFullParse(document)
+        document.edit(len(document.code), 0, "SELECT d FROM w ORDER_BY d")
+        self.assertMatchesFullParse(document)
+
+    def test_random_edits_match_full_reparse(self):
+        rng = random.Random(7)
+        document = IncrementalDocument(generate_sql(40, seed=3))
+        for _ in range(300):
+            if not document.tokens:
+                document.edit(0, 0, 'SELECT a FROM t;')
+            token = rng.choice(document.tokens)
+            choice = rng.random()
+            if choice < 0.3 and token.kind.name in ('ID', 'NUMBER'):
+                # Retype a name or literal, possibly changing its length
+                text = rng.choice(['x', 'col42', 'longer_name']) if token.kind.name == 'ID' else rng.choice(['7', '12.5', '100000'])
+                document.edit(token.start, token.end - token.start, text)
+            elif choice < 0.6:
+                document.edit(token.start, 0, rng.choice([' ', '\n', '\t\n  ']))
+            else:
+                start = document.code.rfind(';', 0, token.start) + 1
+                if choice < 0.8:
+                    document.edit(start, 0, 'SELECT a, b FROM t WHERE a <> 2;\n')
+                else:
+                    # Drop the whole statement this token belongs to
+                    end = document.code.find(';', token.start)
+                    end = len(document.code) if end < 0 else end + 1
+                    document.edit(start, end - start, '')
+            self.assertMatchesFullParse(document)
+
+    def test_failed_edit_recovers(self):
+        document = IncrementalDocument("SELECT a FROM t;\nSELECT b FROM u;\n")
+        with self.assertRaises(RuntimeError):
+            document.edit(7, 1, "?")
+        with self.assertRaises(RuntimeError):
+            document.edit(7, 1, ",")
+        document.edit(7, 1, "c")
+        self.assertMatchesFullParse(document)
+
+    def test_edit_outside_document(self):
+        document = IncrementalDocument("SELECT a FROM t;")
+        with self.assertRaises(ValueError):
+            document.edit(10, 20, "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import random
+import unittest
+
+from benchmark import generate_sql
+from lexer import Lexer, Token
+from ll1 import (END_MARKER, SQL_GRAMMAR, GrammarDefinition, LL1Parser, first_sets, follow_sets, ll1_table,
+                 nullable_symbols, sql_parser)
+from parser import Parser
+from token_type import TokenType
+
+# The textbook expression grammar, with TokenType names as terminals: ID for operands,
+# COMPARATOR for the operator and ALL for '*' so that the sets below read like the usual ones
+EXPRESSIONS = GrammarDefinition(
+    non_terminals=['E', 'E2', 'T', 'T2', 'F'],
+    terminals=['COMPARATOR', 'ALL', 'SELECT', 'END', 'ID'],
+    rules={
+        'E': [('T', 'E2')],
+        'E2': [('COMPARATOR', 'T', 'E2'), ()],
+        'T': [('F', 'T2')],
+        'T2': [('ALL', 'F', 'T2'), ()],
+        'F': [('SELECT', 'E', 'END'), ('ID',)],
+    },
+    start_symbol='E',
+)
+
+SAMPLE_VALUES = {TokenType.ID: 'x', TokenType.NUMBER: 7, TokenType.COMPARATOR: '>=', TokenType.ALL: '*',
+                 TokenType.COMMA: ',', TokenType.END: ';'}
+
+
+def dump(node):
+    return node.kind, node.value, [dump(child) for child in node.children]
+
+
+def random_tokens(rng, count):
+    # Mostly well-formed statements with some tokens dropped or swapped in
+    tokens = list(Lexer(generate_sql(count // 10 + 1, seed=rng.randrange(1000))).iter_tokens())
+    for _ in range(rng.randint(0, 4)):
+        kind = rng.choice(list(TokenType))
+        position = rng.randrange(len(tokens))
+        token = Token(kind, SAMPLE_VALUES.get(kind, kind.name), 1, 0)
+        if rng.random() < 0.5:
+            tokens[position] = token
+        elif rng.random() < 0.5:
+            del tokens[position]
+        else:
+            tokens.insert(position, token)
+    return tokens
+
+
+def outcome(parse, tokens):
+    try:
+        return [dump(ast) for ast in parse(tokens)]
+    except RuntimeError as error:
+        return str(error)
+
+
+class TestSets(unittest.TestCase):
+    def test_expression_grammar(self):
+        self.assertEqual(nullable_symbols(EXPRESSIONS), {'E2', 'T2'})
+        first = first_sets(EXPRESSIONS)
+        self.assertEqual(first['E'], {'SELECT', 'ID'})
+        self.assertEqual(first['E2'], {'COMPARATOR'})
+        self.assertEqual(first['T2'], {'ALL'})
+        follow = follow_sets(EXPRESSIONS)
+        self.assertEqual(follow['E'], {'END', END_MARKER})
+        self.assertEqual(follow['E2'], {'END', END_MARKER})
+        self.assertEqual(follow['T'], {'COMPARATOR', 'END', END_MARKER})
+        self.assertEqual(follow['F'], {'ALL', 'COMPARATOR', 'END', END_MARKER})
+        table, conflicts = ll1_table(EXPRESSIONS)
+        self.assertEqual(conflicts, [])
+        self.assertEqual(table['T2']['COMPARATOR'], ())
+        self.assertEqual(table['F']['SELECT'], ('SELECT', 'E', 'END'))
+
+    def test_sql_grammar(self):
+        first = first_sets(SQL_GRAMMAR)
+        self.assertEqual(first['columns'], {'ALL', 'ID'})
+        self.assertEqual(follow_sets(SQL_GRAMMAR)['column_list'], {'FROM'})
+        self.assertEqual(ll1_table(SQL_GRAMMAR)[1], [])
+
+    def test_conflicts_are_reported(self):
+        grammar = GrammarDefinition(['S', 'A'], ['ID', 'COMMA'], {
+            'S': [('ID', 'A'), ('ID', 'COMMA')],
+            'A': [('COMMA',), ()],
+        }, 'S')
+        _, conflicts = ll1_table(grammar)
+        self.assertEqual(conflicts, [('S', 'ID', [('ID', 'A'), ('ID', 'COMMA')])])
+        with self.assertRaisesRegex(ValueError, "S on ID: ID A | ID COMMA"):
+            LL1Parser(grammar)
+        left_recursive = GrammarDefinition(['L'], ['ID', 'COMMA'], {'L': [('L', 'COMMA', 'ID'), ('ID',)]}, 'L')
+        self.assertEqual(len(ll1_table(left_recursive)[1]), 1)
+
+
+class TestLL1Parser(unittest.TestCase):
+    def setUp(self):
+        self.parser = sql_parser()
+
+    def test_matches_hand_written_parser(self):
+        tokens = list(Lexer(generate_sql(2000, seed=7) + "SELECT * FROM t; SELECT a, FROM b").iter_tokens())
+        expected = [dump(ast) for ast in Parser(tokens).parse()]
+        self.assertEqual([dump(ast) for ast in self.parser.parse(tokens)], expected)
+
+    def test_errors_match_hand_written_parser(self):
+        for sql in ("SELECT a b FROM t", "SELECT a FROM", "SELECT a FROM t WHERE a >", "SELECT a FROM t WHERE , > 1",
+                    "SELECT * , a FROM t", "SELECT a FROM t ORDER_BY 5"):
+            tokens = list(Lexer(sql).iter_tokens())
+            with self.assertRaises(RuntimeError) as expected:
+                Parser(tokens).parse()
+            with self.assertRaises(RuntimeError) as actual:
+                self.parser.parse(tokens)
+            self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_fuzzed_token_streams(self):
+        rng = random.Random(11)
+        for _ in range(300):
+            tokens = random_tokens(rng, rng.randint(1, 60))
+            self.assertEqual(outcome(self.parser.parse, tokens), outcome(lambda t: Parser(t).parse(), tokens))
+
+    def test_default_action_collects_values(self):
+        grammar = GrammarDefinition(['list', 'rest'], ['NUMBER', 'COMMA'], {
+            'list': [('NUMBER', 'rest')],
+            'rest': [('COMMA', 'NUMBER', 'rest'), ()],
+        }, 'list')
+        [value] = LL1Parser(grammar).parse(Lexer("1, 2").iter_tokens())
+        number, rest = value
+        self.assertEqual(number.value, 1)
+        comma, second, tail = rest
+        self.assertEqual((comma.kind, second.value, tail), (TokenType.COMMA, 2, ()))
+
+
+if __name__ == '__main__':
+    unittest.main()
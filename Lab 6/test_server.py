@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from benchmark import replay_log
+from lexer import Lexer
+from load_client import run_load
+from parser import Parser
+from server import SQLServer, parse_batch, serialize
+
+
+def expected(statement):
+    try:
+        return {'asts': [json.loads(json.dumps(serialize(ast))) for ast in Parser(Lexer(statement).iter_tokens()).parse()]}
+    except RuntimeError as error:
+        return {'error': str(error)}
+
+
+async def exchange(server, chunks, count, path=None):
+    # Writes `chunks` one at a time, then reads `count` response lines
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(*server.address[:2])
+    for chunk in chunks:
+        writer.write(chunk)
+        await writer.drain()
+    writer.write_eof()
+    responses = [json.loads(await reader.readline()) for _ in range(count)]
+    assert await reader.read() == b''
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+class TestSerialize(unittest.TestCase):
+    def test_parse_batch(self):
+        responses = parse_batch(["SELECT a, b FROM t WHERE a >= 30", "SELECT * FROM t ORDER_BY x", "SELECT a WHERE"])
+        self.assertEqual(json.loads(responses[0]), {'asts': [
+            ['SELECT_STATEMENT', None, [['SELECT', None, []],
+                                        ['COLUMN_LIST', None, [['COLUMN', 'a', []], ['COLUMN', 'b', []]]],
+                                        ['FROM', 't', []],
+                                        ['WHERE', None, [['LEFT', 'a', []], ['OP', '>=', []], ['RIGHT', 30, []]]]]]]})
+        self.assertEqual(json.loads(responses[1]), expected("SELECT * FROM t ORDER_BY x"))
+        self.assertEqual(json.loads(responses[2]), {'error': "Expected FROM, but got WHERE"})
+
+
+class TestSQLServer(unittest.IsolatedAsyncioTestCase):
+    async def start(self, path=None, **options):
+        server = SQLServer(**{'workers': 2, 'use_processes': False, **options})
+        await server.start(path=path)
+        self.addAsyncCleanup(server.close)
+        return server
+
+    async def test_delimiters_and_chunking(self):
+        server = await self.start()
+        statements = ["SELECT a FROM t", "SELECT b, c FROM u WHERE b < 2.5", "SELECT * FROM café", "SELECT FROM",
+                      "SELECT x FROM y ORDER_BY x"]
+        text = "SELECT a FROM t;SELECT b, c FROM u WHERE b < 2.5\n\n  SELECT * FROM café ;SELECT FROM\nSELECT x FROM y ORDER_BY x"
+        data = text.encode('utf-8')
+        # One byte at a time splits statements, delimiters and the two-byte 'é'
+        for chunks in ([data], [data[i:i + 1] for i in range(len(data))]):
+            responses = await exchange(server, chunks, len(statements))
+            self.assertEqual(responses, [expected(statement) for statement in statements])
+
+    async def test_pipelined_responses_keep_order(self):
+        server = await self.start(batch_size=16)
+        log = replay_log(2000, seed=5)
+        responses = await exchange(server, [('\n'.join(log)).encode()], len(log))
+        self.assertEqual(responses, [expected(statement.rstrip(';')) for statement in log])
+        self.assertGreater(server.stats()['largest_batch'], 1)
+        self.assertLessEqual(server.stats()['largest_batch'], 16)
+
+    async def test_backpressure_with_tiny_queues(self):
+        server = await self.start(queue_size=1, pending_limit=1, batch_size=1)
+        log = replay_log(300, seed=6)
+        results = await asyncio.gather(*(exchange(server, [''.join(log).encode()], len(log)) for _ in range(4)))
+        for responses in results:
+            self.assertEqual(responses, [expected(statement.rstrip(';')) for statement in log])
+        self.assertEqual(server.stats()['largest_batch'], 1)
+
+    async def test_client_that_never_reads(self):
+        server = await self.start(pending_limit=4)
+        _, writer = await asyncio.open_connection(*server.address[:2])
+        writer.write(b"SELECT a FROM t;" * 10000)
+        await asyncio.sleep(0.05)
+        writer.transport.abort()
+        self.assertEqual(await exchange(server, [b"SELECT a FROM t"], 1), [expected("SELECT a FROM t")])
+
+    async def test_unix_socket_and_load_client(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sql.sock')
+            server = await self.start(path=path)
+            self.assertEqual(await exchange(server, [b"SELECT a FROM t"], 1, path), [expected("SELECT a FROM t")])
+            result = await run_load(replay_log(400) + ["SELECT a WHERE"], 8, window=4, path=path)
+            self.assertEqual((result['statements'], result['errors']), (401, 1))
+            self.assertLessEqual(result['p50'], result['p99'])
+
+    async def test_process_pool(self):
+        server = await self.start(workers=1, use_processes=True)
+        log = replay_log(200, seed=7)
+        responses = await exchange(server, [''.join(log).encode()], len(log))
+        self.assertEqual(responses, [expected(statement.rstrip(';')) for statement in log])
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            SQLServer(batch_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
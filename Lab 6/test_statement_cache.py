@@ -0,0 +1,90 @@
+import random
+import unittest
+
+from benchmark import random_statement
+from lexer import Lexer
+from parser import Parser
+from statement_cache import StatementCache, fingerprint
+
+
+def dump(asts):
+    # ASTNode.__str__ hides falsy values such as 0, so compare values and kinds explicitly
+    def walk(node):
+        return (node.kind, type(node.value), node.value, [walk(child) for child in node.children])
+    return [walk(ast) for ast in asts]
+
+
+def reparse(sql):
+    return Parser(Lexer(sql).iter_tokens()).parse()
+
+
+class TestStatementCache(unittest.TestCase):
+    def test_fingerprint_parameterizes_literals(self):
+        key, literals = fingerprint("SELECT a, b FROM t WHERE a >= 30 ORDER_BY b;")
+        other_key, other_literals = fingerprint("SELECT x, SELECTED FROM users WHERE x >= 2.5 ORDER_BY z;")
+        self.assertEqual(literals, ['a', 'b', 't', 'a', 30, 'b'])
+        self.assertEqual(other_literals, ['x', 'SELECTED', 'users', 'x', 2.5, 'z'])
+        self.assertEqual(key, other_key)
+        self.assertNotEqual(fingerprint("SELECT a FROM t WHERE a > 1")[0], fingerprint("SELECT a FROM t WHERE a < 1")[0])
+        self.assertNotEqual(fingerprint("SELECT a FROM t WHERE a > 1")[0], fingerprint("SELECT a FROM t WHERE a > b")[0])
+        self.assertNotEqual(fingerprint("SELECT a FROM t")[0], fingerprint("SELECT aFROM t")[0])
+        self.assertEqual(fingerprint("SELECT a1 FROM t$2")[1], ['a1', 't$2'])
+        self.assertEqual(fingerprint("1SELECT")[1], [1])
+
+    def test_invalid_statements_never_hit(self):
+        cache = StatementCache()
+        cache.parse("SELECT a FROM t WHERE a > 1")
+        for sql in ("SELECT 5 FROM t WHERE a > 1", "SELECT a FROM 5 WHERE a > 1", "SELECT a FROM t WHERE a = 1",
+                    "SELECT a FROM t WHERE a > 1.5.1"):
+            with self.assertRaises(RuntimeError):
+                cache.parse(sql)
+        self.assertEqual(cache.cache_stats()['hits'], 0)
+
+    def test_matches_parser_on_random_statements(self):
+        rng = random.Random(3)
+        cache = StatementCache()
+        for _ in range(2000):
+            sql = random_statement(rng)
+            self.assertEqual(dump(cache.parse(sql)), dump(reparse(sql)))
+        stats = cache.cache_stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 2000)
+        self.assertEqual(stats['size'], stats['misses'])
+        self.assertGreater(stats['hit_rate'], 0.5)
+
+    def test_select_all_and_multiple_statements(self):
+        cache = StatementCache()
+        sql = "SELECT * FROM t; SELECT a FROM u WHERE 1 == 1"
+        for _ in range(2):
+            self.assertEqual(dump(cache.parse(sql)), dump(reparse(sql)))
+        self.assertEqual(cache.cache_stats()['hits'], 1)
+
+    def test_results_are_independent_trees(self):
+        cache = StatementCache()
+        first = cache.parse("SELECT a FROM t")[0]
+        first.children[1].children[0].value = 'changed'
+        first.children[1].add_child(first)
+        second = cache.parse("SELECT a FROM t")[0]
+        self.assertEqual(dump([second]), dump(reparse("SELECT a FROM t")))
+
+    def test_lru_eviction(self):
+        cache = StatementCache(cache_size=2)
+        cache.parse("SELECT a FROM t")
+        cache.parse("SELECT a, b FROM t")
+        cache.parse("SELECT x FROM y")  # hit, refreshes the first shape
+        cache.parse("SELECT a, b, c FROM t")  # evicts the two-column shape
+        cache.parse("SELECT b FROM u")
+        self.assertEqual(cache.cache_stats(), {'size': 2, 'hits': 2, 'misses': 3, 'evictions': 1, 'hit_rate': 0.4})
+        cache = StatementCache(cache_size=0)
+        cache.parse("SELECT a FROM t")
+        self.assertEqual(cache.cache_stats()['size'], 0)
+
+    def test_parse_errors_are_not_cached(self):
+        cache = StatementCache()
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                cache.parse("SELECT a WHERE b > 1")
+        self.assertEqual(cache.cache_stats()['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()